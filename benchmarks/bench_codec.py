@@ -0,0 +1,57 @@
+"""Compares the binary node encoding with pickle on a synthetic corpus.
+
+Run from the repository root: python3 benchmarks/bench_codec.py [--blocks N]
+
+Both the LeafNode trees of markdown_to_html_node and the SpanNode trees of
+text_to_span_children are measured. "to html" is what a consumer of the stored
+tree pays to get the page back: pickle has to load the objects and serialize
+them, the encoding is rendered straight from the bytes.
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "src"))
+
+from corpus import CorpusSpec, generate_markdown
+from node_codec import decode_node, encode_node, encoded_to_html
+from node_utils import markdown_to_html_node, parse_markdown, text_to_span_children
+
+
+def best_of(function, repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=2000, help="blocks in the synthetic page")
+    args = parser.parse_args()
+
+    markdown = generate_markdown(CorpusSpec(blocks=args.blocks))
+    trees = {
+        "leaf nodes": markdown_to_html_node(markdown),
+        "span nodes": parse_markdown(markdown, text_to_span_children)[0],
+    }
+    print(f"{len(markdown) // 1024} KiB of markdown, times in ms (best of 5)\n")
+    print(f"{'tree':<12}{'format':<8}{'size (KiB)':>12}{'encode':>10}{'decode':>10}{'to html':>10}")
+    for name, tree in trees.items():
+        data = encode_node(tree)
+        pickled = pickle.dumps(tree, protocol=pickle.HIGHEST_PROTOCOL)
+        rows = [
+            ("codec", len(data), best_of(lambda: encode_node(tree)), best_of(lambda: decode_node(data)), best_of(lambda: encoded_to_html(data))),
+            ("pickle", len(pickled), best_of(lambda: pickle.dumps(tree, protocol=pickle.HIGHEST_PROTOCOL)),
+             best_of(lambda: pickle.loads(pickled)), best_of(lambda: pickle.loads(pickled).to_html())),
+        ]
+        for format, size, encode, decode, to_html in rows:
+            print(f"{name:<12}{format:<8}{size / 1024:>12.0f}{encode:>10.1f}{decode:>10.1f}{to_html:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Per-node memory footprint of the node classes, before and after __slots__.
+
+The "before" classes replicate the original dict-based TextNode and HTMLNode.
+Run from the repository root: python3 benchmarks/bench_node_memory.py
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "src"))
+
+from htmlnode import LeafNode, ParentNode
+from node_utils import markdown_to_html_node
+from textnode import TextNode, TextType
+
+
+class DictTextNode():
+    def __init__(self, text: str, text_type: TextType, url: str = None) -> None:
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+class DictHTMLNode():
+    def __init__(self, tag: str, value: str, props: dict = None) -> None:
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
+
+
+def bytes_per_object(factory, count: int = 100_000) -> float:
+    # the strings are created up front so only the node objects are measured
+    values = [f"value {n}" for n in range(count)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory(value) for value in values]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # the list holding the objects costs one pointer each
+    return (after - before) / len(objects) - 8
+
+
+def tree_footprint(markdown: str) -> tuple[int, int]:
+    tracemalloc.start()
+    node = markdown_to_html_node(markdown)
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del node
+    return size, peak
+
+
+def main() -> None:
+    rows = [
+        ("TextNode", lambda value: DictTextNode(value, TextType.TEXT), lambda value: TextNode(value, TextType.TEXT)),
+        ("LeafNode", lambda value: DictHTMLNode("b", value), lambda value: LeafNode("b", value)),
+        ("ParentNode", lambda value: DictHTMLNode("p", None), lambda value: ParentNode("p", None)),
+    ]
+    print(f"{'node':<12}{'before (B)':>12}{'after (B)':>12}{'saved':>8}")
+    for name, before, after in rows:
+        old = bytes_per_object(before)
+        new = bytes_per_object(after)
+        print(f"{name:<12}{old:>12.1f}{new:>12.1f}{1 - new / old:>8.0%}")
+
+    paragraph = "Some **bold** text, a [link](/page) and *emphasis*, then more text and words. "
+    markdown = "# Title\n\n" + "\n\n".join(paragraph * 4 for _ in range(5000))
+    size, peak = tree_footprint(markdown)
+    print(f"\ntree for a {len(markdown) // 1024} KiB page: {size / 1024:.0f} KiB retained, {peak / 1024:.0f} KiB peak")
+
+
+if __name__ == "__main__":
+    main()
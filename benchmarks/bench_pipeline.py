@@ -0,0 +1,133 @@
+"""Times each stage of the markdown pipeline on a synthetic corpus.
+
+Run from the repository root:
+    python3 benchmarks/bench_pipeline.py --output bench.json
+    python3 benchmarks/bench_pipeline.py --compare bench.json
+
+Every stage reports ops/sec (one op is one pass over the corpus), the peak
+memory traced while running one op and the number of memory blocks its result
+keeps allocated. Results are written as JSON so runs from different commits can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "src"))
+
+from corpus import CorpusSpec, generate_markdown
+from node_utils import markdown_to_html_node, split_nodes_imagelink, text_to_textnodes
+from text_utils import BlockType, block_to_block_type, markdown_to_blocks
+from textnode import TextNode, TextType
+
+
+def prepare(markdown: str) -> dict:
+    blocks = markdown_to_blocks(markdown)
+    typed = [(block, block_to_block_type(block)) for block in blocks]
+    inline = [" ".join(block.split("\n")) for block, block_type in typed if block_type == BlockType.PARAGRAPH]
+    return {
+        "markdown": markdown,
+        "blocks": blocks,
+        "inline": inline,
+        "text_nodes": [TextNode(text, TextType.TEXT) for text in inline],
+        "tree": markdown_to_html_node(markdown),
+    }
+
+
+def stages(data: dict) -> dict:
+    return {
+        "markdown_to_blocks": lambda: markdown_to_blocks(data["markdown"]),
+        "block_to_block_type": lambda: [block_to_block_type(block) for block in data["blocks"]],
+        "text_to_textnodes": lambda: [text_to_textnodes(text) for text in data["inline"]],
+        "split_nodes_imagelink": lambda: split_nodes_imagelink(split_nodes_imagelink(data["text_nodes"], TextType.LINK), TextType.IMAGE),
+        "markdown_to_html_node": lambda: markdown_to_html_node(data["markdown"]),
+        "to_html": lambda: data["tree"].to_html(),
+    }
+
+
+def time_stage(function, min_time: float) -> dict:
+    function() # warm up caches before timing
+    runs = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time or runs < 3:
+        function()
+        runs += 1
+        elapsed = time.perf_counter() - start
+
+    # allocations are measured on a separate run, tracing slows everything down
+    tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    result = function()
+    blocks_after = sys.getallocatedblocks()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return {
+        "ops_per_sec": runs / elapsed,
+        "seconds_per_op": elapsed / runs,
+        "peak_bytes": peak,
+        "allocated_blocks": blocks_after - blocks_before,
+    }
+
+
+def compare(results: dict, baseline: dict) -> None:
+    print(f"\n{'stage':<24}{'baseline ops/s':>16}{'now ops/s':>12}{'change':>9}")
+    for name, stage in results["stages"].items():
+        old = baseline["stages"].get(name)
+        if old is None:
+            print(f"{name:<24}{'-':>16}{stage['ops_per_sec']:>12.1f}")
+            continue
+        change = stage["ops_per_sec"] / old["ops_per_sec"] - 1
+        flag = "  <- slower" if change < -0.1 else ""
+        print(f"{name:<24}{old['ops_per_sec']:>16.1f}{stage['ops_per_sec']:>12.1f}{change:>+9.0%}{flag}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=200)
+    parser.add_argument("--paragraph-words", type=int, default=80)
+    parser.add_argument("--link-density", type=float, default=0.05)
+    parser.add_argument("--emphasis-density", type=float, default=0.05)
+    parser.add_argument("--list-items", type=int, default=6)
+    parser.add_argument("--code-lines", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to spend timing each stage")
+    parser.add_argument("--stage", action="append", help="only run these stages")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    spec = CorpusSpec(args.blocks, args.paragraph_words, args.link_density, args.emphasis_density, args.list_items, args.code_lines, args.seed)
+    markdown = generate_markdown(spec)
+    data = prepare(markdown)
+
+    results = {
+        "python": platform.python_version(),
+        "corpus": spec.to_dict(),
+        "corpus_bytes": len(markdown.encode()),
+        "stages": {},
+    }
+    print(f"corpus: {results['corpus_bytes'] / 1024:.0f} KiB, {len(data['blocks'])} blocks")
+    print(f"{'stage':<24}{'ops/s':>10}{'ms/op':>10}{'peak KiB':>10}{'blocks':>10}")
+    for name, function in stages(data).items():
+        if args.stage and name not in args.stage:
+            continue
+        stage = time_stage(function, args.min_time)
+        results["stages"][name] = stage
+        print(f"{name:<24}{stage['ops_per_sec']:>10.1f}{stage['seconds_per_op'] * 1000:>10.2f}{stage['peak_bytes'] / 1024:>10.0f}{stage['allocated_blocks']:>10}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Full-build scaling benchmark across site sizes.
+
+For every size a synthetic site is generated in a temporary directory:
+content/ with that many pages, static/ with as many assets and a template.
+Then main() builds it. Each size records wall time, pages/sec, peak traced
+memory and bytes written. With --jobs the traced memory only covers the
+parent process. 100k pages is left out of the default sizes, since it takes a
+while to generate and build.
+
+Run from the repository root:
+    python3 benchmarks/bench_scaling.py --save baseline.json
+    python3 benchmarks/bench_scaling.py --compare baseline.json
+    python3 benchmarks/bench_scaling.py --sizes 10 1000 10000 100000
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "src"))
+
+from corpus import CorpusSpec, generate_markdown
+from main import main as build
+
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <meta charset="utf-8" />
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+# pages per directory, so big sites do not end up with 100k entries in one directory
+FANOUT = 100
+
+
+def write_file(path: str, content: str | bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb" if isinstance(content, bytes) else "w") as file:
+        file.write(content)
+
+
+def generate_site(root_dir: str, pages: int, blocks: int, seed: int) -> None:
+    rng = random.Random(seed)
+    write_file(os.path.join(root_dir, "template.html"), TEMPLATE)
+    # a handful of distinct documents reused across pages keeps generation fast
+    documents = [generate_markdown(CorpusSpec(blocks=blocks, seed=seed + n)) for n in range(16)]
+    for page in range(pages):
+        path = os.path.join(root_dir, "content", f"section{page // FANOUT}", f"page{page}", "index.md")
+        write_file(path, documents[page % len(documents)])
+    write_file(os.path.join(root_dir, "static", "index.css"), "body { margin: 0 auto; max-width: 40em; }\n")
+    for asset in range(pages):
+        path = os.path.join(root_dir, "static", "images", f"set{asset // FANOUT}", f"image{asset}.png")
+        write_file(path, rng.randbytes(rng.randint(512, 4096)))
+
+
+def tree_size(path: str) -> tuple[int, int]:
+    files = 0
+    size = 0
+    for dir_path, _, file_names in os.walk(path):
+        for file_name in file_names:
+            files += 1
+            size += os.path.getsize(os.path.join(dir_path, file_name))
+    return files, size
+
+
+def run_build(root_dir: str, jobs: int, trace_memory: bool) -> tuple[float, int]:
+    argv = ["--root", root_dir, "--jobs", str(jobs)]
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        build(argv)
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def measure(pages: int, args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as root_dir:
+        generate_site(root_dir, pages, args.blocks, args.seed)
+        _, content_bytes = tree_size(os.path.join(root_dir, "content"))
+
+        elapsed, _ = run_build(root_dir, args.jobs, trace_memory=False)
+        files, written = tree_size(os.path.join(root_dir, "docs"))
+
+        peak = None
+        if not args.skip_memory:
+            # tracing slows the build down, so memory comes from a separate full build
+            shutil.rmtree(os.path.join(root_dir, "docs"))
+            _, peak = run_build(root_dir, args.jobs, trace_memory=True)
+
+    return {
+        "pages": pages,
+        "content_bytes": content_bytes,
+        "seconds": elapsed,
+        "pages_per_sec": pages / elapsed,
+        "peak_traced_bytes": peak,
+        "files_written": files,
+        "bytes_written": written,
+    }
+
+
+def compare(results: dict, baseline: dict) -> None:
+    old_runs = {run["pages"]: run for run in baseline["runs"]}
+    print(f"\n{'pages':>8}{'baseline p/s':>14}{'now p/s':>10}{'change':>9}{'peak change':>13}")
+    for run in results["runs"]:
+        old = old_runs.get(run["pages"])
+        if old is None:
+            continue
+        change = run["pages_per_sec"] / old["pages_per_sec"] - 1
+        peak_change = ""
+        if run["peak_traced_bytes"] and old["peak_traced_bytes"]:
+            peak_change = f"{run['peak_traced_bytes'] / old['peak_traced_bytes'] - 1:+.0%}"
+        print(f"{run['pages']:>8}{old['pages_per_sec']:>14.1f}{run['pages_per_sec']:>10.1f}{change:>+9.0%}{peak_change:>13}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--blocks", type=int, default=40, help="markdown blocks per page")
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-memory", action="store_true", help="skip the traced build")
+    parser.add_argument("--save", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    results = {"python": platform.python_version(), "blocks": args.blocks, "jobs": args.jobs, "runs": []}
+    print(f"{'pages':>8}{'seconds':>10}{'pages/s':>10}{'peak MiB':>10}{'written MiB':>13}")
+    for pages in args.sizes:
+        run = measure(pages, args)
+        results["runs"].append(run)
+        peak = f"{run['peak_traced_bytes'] / 2**20:.1f}" if run["peak_traced_bytes"] is not None else "-"
+        print(f"{pages:>8}{run['seconds']:>10.2f}{run['pages_per_sec']:>10.1f}{peak:>10}{run['bytes_written'] / 2**20:>13.1f}")
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Deterministic synthetic markdown for the benchmarks.
+
+The same seed and parameters always produce the same document, so timings
+from different commits are measured on the same input.
+"""
+import random
+
+
+WORDS = (
+    "the ring of power was forged in the fires of mount doom by sauron who sought "
+    "dominion over middle earth while elves dwarves and men resisted his shadow"
+).split()
+
+
+class CorpusSpec():
+    def __init__(self, blocks: int = 200, paragraph_words: int = 80, link_density: float = 0.05,
+                 emphasis_density: float = 0.05, list_items: int = 6, code_lines: int = 8, seed: int = 0) -> None:
+        self.blocks: int = blocks
+        self.paragraph_words: int = paragraph_words
+        # chance that a word becomes a link or image, and that it gets bold/italic/code
+        self.link_density: float = link_density
+        self.emphasis_density: float = emphasis_density
+        self.list_items: int = list_items
+        self.code_lines: int = code_lines
+        self.seed: int = seed
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in ("blocks", "paragraph_words", "link_density", "emphasis_density", "list_items", "code_lines", "seed")}
+
+
+def inline_text(rng: random.Random, words: int, spec: CorpusSpec) -> str:
+    parts: list[str] = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < spec.link_density / 2:
+            word = f"[{word}](/blog/{word}/{rng.randrange(1000)})"
+        elif roll < spec.link_density:
+            word = f"![{word}](/images/{word}.png)"
+        elif roll < spec.link_density + spec.emphasis_density:
+            word = rng.choice(("**{}**", "*{}*", "_{}_", "`{}`")).format(word)
+        parts.append(word)
+    return " ".join(parts)
+
+
+def generate_markdown(spec: CorpusSpec) -> str:
+    rng = random.Random(spec.seed)
+    blocks = [f"# {inline_text(rng, 5, spec)}"]
+    for _ in range(spec.blocks):
+        kind = rng.random()
+        if kind < 0.1:
+            blocks.append(f"{'#' * rng.randint(2, 6)} {inline_text(rng, 6, spec)}")
+        elif kind < 0.25:
+            marker = rng.choice(("-", "*", None))
+            # items start with a plain word, list_to_htmlnode lstrips the marker characters
+            items = [f"{rng.choice(WORDS)} {inline_text(rng, 7, spec)}" for _ in range(spec.list_items)]
+            if marker is None:
+                blocks.append("\n".join(f"{index}. {item}" for index, item in enumerate(items, start=1)))
+            else:
+                blocks.append("\n".join(f"{marker} {item}" for item in items))
+        elif kind < 0.35:
+            blocks.append("\n".join(f"> {inline_text(rng, 10, spec)}" for _ in range(3)))
+        elif kind < 0.45 and spec.code_lines:
+            code = "\n".join(" ".join(rng.choice(WORDS) for _ in range(6)) for _ in range(spec.code_lines))
+            blocks.append(f"```\n{code}\n```")
+        else:
+            blocks.append(inline_text(rng, spec.paragraph_words, spec))
+    return "\n\n".join(blocks) + "\n"
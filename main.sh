@@ -1,4 +1,8 @@
 #!/bin/bash
 
-python3 src/main.py
-cd docs && python3 -m http.server 8888
\ No newline at end of file
+# build once so docs/ exists before serving it, then rebuild on every change in the background
+python3 src/main.py --incremental || exit 1
+python3 src/main.py --watch &
+watcher=$!
+trap 'kill $watcher' EXIT
+cd docs && python3 -m http.server 8888
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import posixpath
+import re
+
+from css import CSS_IMPORT_PATTERN, CSS_URL_PATTERN
+from manifest import hash_file
+
+
+HASH_LENGTH = 8
+
+# pages and files that are fetched by a well known name keep it
+UNFINGERPRINTED_EXTENSIONS = (".html",)
+UNFINGERPRINTED_NAMES = ("robots.txt", "favicon.ico", "_headers", "_redirects")
+
+ASSET_MAP_NAME = "assets.json"
+HEADERS_NAME = "_headers"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def fingerprinted_name(relative_path: str, digest: str) -> str:
+    root, extension = os.path.splitext(relative_path)
+    return f"{root}.{digest[:HASH_LENGTH]}{extension}"
+
+
+def split_url(url: str) -> tuple[str, str]:
+    """url split before its query or fragment."""
+    end = len(url)
+    for separator in "?#":
+        index = url.find(separator)
+        if index != -1:
+            end = min(end, index)
+    return url[:end], url[end:]
+
+
+def stylesheet_url_target(url: str, stylesheet_url: str) -> str:
+    """The site-absolute path a url() or @import in the stylesheet at stylesheet_url points at, or None."""
+    path, _ = split_url(url)
+    if not path or path.startswith(("data:", "#")) or "//" in path:
+        return None
+    if path.startswith("/"):
+        return path
+    return posixpath.normpath(posixpath.join(posixpath.dirname(stylesheet_url), path))
+
+
+class AssetMap():
+    """Content-hashed names for the files in static/.
+
+    files maps a static file's relative path to the relative path it is copied
+    to, index.css to index.3f9a1c2b.css. A changed file gets a new name, so every
+    fingerprinted name can be cached forever. digest identifies the whole map,
+    pages rendered with another digest link to other names. A stylesheet's name
+    also covers the names of the files it references, rewrite_css points it at them.
+    """
+    def __init__(self, files: dict[str, str]) -> None:
+        self.files: dict[str, str] = files
+        # urls are site-absolute, like the links in the markdown and the template
+        self.urls: dict[str, str] = {"/" + source.replace(os.sep, "/"): "/" + target.replace(os.sep, "/") for source, target in files.items()}
+        self.digest: str = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()
+
+    @classmethod
+    def build(cls, static_dir: str) -> 'AssetMap':
+        digests: dict[str, str] = {}
+        for dir_path, _, file_names in os.walk(static_dir):
+            for name in file_names:
+                relative_path = os.path.relpath(os.path.join(dir_path, name), start=static_dir)
+                if name in UNFINGERPRINTED_NAMES or name.endswith(UNFINGERPRINTED_EXTENSIONS):
+                    continue
+                digests[relative_path] = hash_file(os.path.join(dir_path, name))
+
+        # a stylesheet changes with the names it is rewritten to point at
+        stylesheet_digests: dict[str, str] = {}
+
+        def stylesheet_digest(relative_path: str, seen: frozenset[str]) -> str:
+            if relative_path in stylesheet_digests:
+                return stylesheet_digests[relative_path]
+            digest = hashlib.sha256(digests[relative_path].encode())
+            stylesheet_url = "/" + relative_path.replace(os.sep, "/")
+            with open(os.path.join(static_dir, relative_path), errors="replace") as file:
+                css = file.read()
+            for match in list(CSS_URL_PATTERN.finditer(css)) + list(CSS_IMPORT_PATTERN.finditer(css)):
+                target = stylesheet_url_target(match.group(2), stylesheet_url)
+                referenced = os.path.join(*target[1:].split("/")) if target is not None and target != "/" else None
+                if referenced not in digests:
+                    continue
+                # an @import cycle only counts the files once
+                if referenced.endswith(".css") and referenced not in seen:
+                    digest.update(stylesheet_digest(referenced, seen | {relative_path}).encode())
+                else:
+                    digest.update(digests[referenced].encode())
+            stylesheet_digests[relative_path] = digest.hexdigest()
+            return stylesheet_digests[relative_path]
+
+        files: dict[str, str] = {}
+        for relative_path, digest in digests.items():
+            if relative_path.endswith(".css"):
+                digest = stylesheet_digest(relative_path, frozenset())
+            files[relative_path] = fingerprinted_name(relative_path, digest)
+        return cls(files)
+
+    def rename(self, relative_path: str) -> str:
+        return self.files.get(relative_path, relative_path)
+
+    def url(self, url: str) -> str:
+        # a query or fragment stays on the renamed file
+        path, suffix = split_url(url)
+        target = self.urls.get(path)
+        return url if target is None else target + suffix
+
+    def rewrite_css(self, css: str, stylesheet_url: str) -> str:
+        """css with its url()s and @imports pointing at the fingerprinted names, relative urls stay relative."""
+        directory = posixpath.dirname(stylesheet_url)
+
+        def rewrite(url: str) -> str:
+            target = stylesheet_url_target(url, stylesheet_url)
+            renamed = self.urls.get(target) if target is not None else None
+            if renamed is None:
+                return url
+            suffix = split_url(url)[1]
+            if url.startswith("/"):
+                return renamed + suffix
+            return posixpath.relpath(renamed, directory) + suffix
+
+        def replace(match: re.Match) -> str:
+            start, end = match.start(2) - match.start(), match.end(2) - match.start()
+            return match.group(0)[:start] + rewrite(match.group(2)) + match.group(0)[end:]
+
+        return CSS_IMPORT_PATTERN.sub(replace, CSS_URL_PATTERN.sub(replace, css))
+
+    def write(self, public_dir: str, placed: set[str] = None, headers_path: str = None) -> list[str]:
+        """Write the asset map and a _headers file marking every fingerprinted file immutable.
+
+        _headers is the format Netlify and Cloudflare Pages read. placed holds
+        the paths relative to public_dir the static sync wrote, files left out
+        of public_dir are left out of both, None lists every file. The rules of
+        the _headers file at headers_path, the site's own, come first. Returns
+        the written paths relative to public_dir.
+        """
+        urls = {source: target for source, target in self.urls.items() if placed is None or os.path.join(*target[1:].split("/")) in placed}
+        with open(os.path.join(public_dir, ASSET_MAP_NAME), "w") as file:
+            json.dump(urls, file, indent=1, sort_keys=True)
+        with open(os.path.join(public_dir, HEADERS_NAME), "w") as file:
+            if headers_path is not None:
+                with open(headers_path) as headers:
+                    rules = headers.read()
+                file.write(rules if not rules or rules.endswith("\n") else rules + "\n")
+            for url in sorted(urls.values()):
+                file.write(f"{url}\n  Cache-Control: {IMMUTABLE}\n")
+        return [ASSET_MAP_NAME, HEADERS_NAME]
+
+    def __repr__(self) -> str:
+        return f"AssetMap({len(self.files)} files, {self.digest[:HASH_LENGTH]})"
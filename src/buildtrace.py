@@ -0,0 +1,76 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import ContextManager
+
+
+class Tracer():
+    """Collects spans as Chrome/Perfetto trace events.
+
+    Timestamps come from the monotonic perf counter, which is shared by every
+    process on the machine, so events recorded in worker processes line up with
+    the ones recorded here once merged with add_events.
+    """
+    def __init__(self) -> None:
+        self.events: list[dict] = []
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str = "build", **args):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            self.events.append({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": start / 1000,
+                "dur": (end - start) / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": args,
+            })
+
+    def add_events(self, events: list[dict]) -> None:
+        self.events.extend(events)
+
+    def drain(self) -> list[dict]:
+        events = self.events
+        self.events = []
+        return events
+
+    def export(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, file)
+
+    def slowest(self, name: str = "page", count: int = 20) -> list[tuple[str, float]]:
+        """The count longest spans called name, as (label, milliseconds)."""
+        spans = [(event["args"].get("path", ""), event["dur"] / 1000) for event in self.events if event["name"] == name]
+        return sorted(spans, key=lambda span: span[1], reverse=True)[:count]
+
+
+# the tracer of this process, None when tracing is off
+tracer: Tracer = None
+
+NO_SPAN = contextlib.nullcontext()
+
+
+def start_tracing() -> Tracer:
+    global tracer
+    tracer = Tracer()
+    return tracer
+
+
+def stop_tracing() -> None:
+    global tracer
+    tracer = None
+
+
+def span(name: str, category: str = "build", **args) -> ContextManager:
+    # a shared no-op context keeps disabled tracing close to free
+    if tracer is None:
+        return NO_SPAN
+    return tracer.span(name, category, **args)
@@ -0,0 +1,129 @@
+import gzip
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from buildtrace import span
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".mjs", ".json", ".svg", ".xml", ".txt", ".map", ".webmanifest")
+SIBLING_SUFFIXES = (".gz", ".br")
+DEFAULT_LEVEL = 9
+
+# below this the response headers cost more than compression saves
+MIN_SIZE = 256
+# a sibling has to save at least a tenth of the file to be worth serving
+MAX_RATIO = 0.9
+
+
+def encodings() -> list[str]:
+    return [".gz", ".br"] if brotli is not None else [".gz"]
+
+
+def compress_data(data: bytes, suffix: str, level: int) -> bytes:
+    if suffix == ".gz":
+        # mtime 0 keeps the output identical for identical input
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    # brotli goes from 0 to 11, the gzip levels are spread over it
+    return brotli.compress(data, quality=round(level * 11 / 9))
+
+
+class CompressResult():
+    def __init__(self) -> None:
+        self.compressed: list[str] = []
+        self.skipped: list[str] = []
+        self.unprofitable: list[str] = []
+
+    def __repr__(self) -> str:
+        return f"CompressResult(compressed: {len(self.compressed)}, skipped: {len(self.skipped)}, unprofitable: {len(self.unprofitable)})"
+
+
+def compress_file(path: str, relative_path: str, level: int, suffixes: list[str]) -> bool:
+    """Write a sibling of path for every suffix that makes it smaller, returning whether any was worth it."""
+    with span("compress", "compress", path=relative_path):
+        with open(path, "rb") as file:
+            data = file.read()
+        written = False
+        for suffix in suffixes:
+            sibling = path + suffix
+            compressed = compress_data(data, suffix, level) if len(data) >= MIN_SIZE else None
+            if compressed is None or len(compressed) > len(data) * MAX_RATIO:
+                # an older, bigger version of the file may have left one behind
+                if os.path.exists(sibling):
+                    os.remove(sibling)
+                continue
+            tmp_path = sibling + ".tmp"
+            with open(tmp_path, "wb") as file:
+                file.write(compressed)
+            os.replace(tmp_path, sibling)
+            written = True
+        return written
+
+
+def is_current(path: str, stat: os.stat_result, suffixes: list[str], signature: str, record: str) -> bool:
+    if record is not None:
+        if record == f"{signature} -":
+            return True
+        if record != f"{signature} +":
+            return False
+        return any(os.path.exists(path + suffix) for suffix in suffixes)
+    for suffix in suffixes:
+        try:
+            if os.stat(path + suffix).st_mtime_ns < stat.st_mtime_ns:
+                return False
+        except FileNotFoundError:
+            return False
+    return True
+
+
+def compress_tree(public_dir: str, level: int = DEFAULT_LEVEL, jobs: int = 1, records: dict[str, str] = None) -> CompressResult:
+    """Write .gz (and .br, when brotli is installed) siblings of the compressible files in public_dir.
+
+    records maps a file's path relative to public_dir to the size, mtime, level
+    and encodings it was last compressed with and whether that paid off, it is
+    read and updated, so only new or changed files are compressed again. A file
+    without a record is only compressed when a sibling is missing or older. zlib and brotli release the GIL,
+    so the files are compressed on jobs threads.
+    """
+    records = records if records is not None else {}
+    suffixes = encodings()
+    result = CompressResult()
+    todo: list[tuple[str, str, str]] = []
+    present: set[str] = set()
+
+    for dir_path, _, file_names in os.walk(public_dir):
+        for name in file_names:
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(dir_path, name)
+            relative_path = os.path.relpath(path, start=public_dir)
+            present.add(relative_path)
+            stat = os.stat(path)
+            signature = f"{stat.st_size}:{stat.st_mtime_ns}:{level}:{','.join(suffixes)}"
+            if is_current(path, stat, suffixes, signature, records.get(relative_path)):
+                result.skipped.append(relative_path)
+                continue
+            todo.append((path, relative_path, signature))
+
+    with ThreadPoolExecutor(max(1, jobs)) as executor:
+        written = executor.map(lambda item: compress_file(item[0], item[1], level, suffixes), todo)
+        for (_, relative_path, signature), worth_it in zip(todo, written):
+            # whether siblings were written, a docs/ wiped since then needs them again
+            records[relative_path] = f"{signature} {'+' if worth_it else '-'}"
+            (result.compressed if worth_it else result.unprofitable).append(relative_path)
+
+    for relative_path in [path for path in records if path not in present]:
+        del records[relative_path]
+    logger.info(
+        "compressed %d files to %s, %d unchanged, %d not worth it", len(result.compressed), " and ".join(suffixes),
+        len(result.skipped), len(result.unprofitable),
+    )
+    return result
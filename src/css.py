@@ -0,0 +1,199 @@
+import os
+import posixpath
+import re
+from typing import Callable
+
+from text_utils import get_file_content
+
+
+# one round trip's worth of bytes, past that a cached stylesheet wins
+DEFAULT_INLINE_THRESHOLD = 14 * 1024
+
+# every tag the markdown renderer can write into a page
+GENERATED_TAGS = frozenset(("div", "p", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "code", "ul", "ol", "li", "img", "a", "b", "i"))
+# at-rules holding rules, the rules inside are subset like top level ones
+GROUPING_AT_RULES = ("@media", "@supports", "@layer", "@container")
+
+CSS_TOKEN_PATTERN = re.compile(r"\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*'|/\*.*?\*/|\s+|[{};,>]|[^\"'/\s{};,>]+|/", re.DOTALL)
+# no space is needed after these, nor before the first set
+NO_SPACE_BEFORE = "{};,>"
+NO_SPACE_AFTER = "{};,:>"
+# tokens a dropped comment must not glue together, "1px/**/solid" or "1/**/.5"
+NAME_END_PATTERN = re.compile(r"[\w\-\\%]$")
+NAME_START_PATTERN = re.compile(r"[\w\-\\]|\.\d")
+
+STYLESHEET_LINK_PATTERN = re.compile(r"<link\b[^>]*>")
+LINK_ATTRIBUTE_PATTERN = re.compile(r"([\w-]+)=\"([^\"]*)\"")
+CSS_URL_PATTERN = re.compile(r"url\((\"|'|)([^)\"']*)\1\)")
+CSS_IMPORT_PATTERN = re.compile(r"@import\s*(\"|')([^\"']*)\1")
+TAG_NAME_PATTERN = re.compile(r"<([a-zA-Z][a-zA-Z0-9-]*)")
+CLASS_ID_ATTRIBUTE_PATTERN = re.compile(r"\b(class|id)=\"([^\"]*)\"")
+SELECTOR_ARGUMENT_PATTERN = re.compile(r"\[[^\]]*\]|\([^)]*\)|\"[^\"]*\"|'[^']*'")
+SELECTOR_NAME_PATTERN = re.compile(r"(^|[\s>+~.#:]+)(-?[a-zA-Z_][\w-]*|\*)")
+
+
+def minify_css(css: str) -> str:
+    """Drop comments and every space the css does not need, leaving strings alone."""
+    parts: list[str] = []
+    space = False
+    comment = False
+    for match in CSS_TOKEN_PATTERN.finditer(css):
+        token = match.group(0)
+        if token.startswith("/*"):
+            # a comment is not whitespace, ".a/**/.b" stays one compound selector
+            comment = True
+            continue
+        if token.isspace():
+            space = True
+            continue
+        if space and parts and parts[-1][-1] not in NO_SPACE_AFTER and token[0] not in NO_SPACE_BEFORE:
+            parts.append(" ")
+        elif comment and parts and NAME_END_PATTERN.search(parts[-1]) and NAME_START_PATTERN.match(token):
+            parts.append(" ")
+        space = False
+        comment = False
+        # the last declaration of a block needs no ";"
+        if token[0] == "}" and parts and parts[-1] == ";":
+            parts.pop()
+        parts.append(token)
+    return "".join(parts)
+
+
+def split_rules(css: str) -> list[tuple[str, str]]:
+    """Split minified css into (prelude, block) pairs, block is None for statements like @import."""
+    rules: list[tuple[str, str]] = []
+    position = 0
+    start = 0
+    depth = 0
+    body_start = 0
+    while position < len(css):
+        char = css[position]
+        if char in "\"'":
+            # skip the string, braces inside it mean nothing
+            end = position + 1
+            while end < len(css) and css[end] != char:
+                end += 2 if css[end] == "\\" else 1
+            position = end + 1
+            continue
+        if char == "{":
+            if depth == 0:
+                body_start = position + 1
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                rules.append((css[start:body_start - 1], css[body_start:position]))
+                start = position + 1
+        elif char == ";" and depth == 0:
+            rules.append((css[start:position], None))
+            start = position + 1
+        position += 1
+    return rules
+
+
+def split_selectors(prelude: str) -> list[str]:
+    selectors: list[str] = []
+    depth = 0
+    start = 0
+    for position, char in enumerate(prelude):
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == "," and depth == 0:
+            selectors.append(prelude[start:position])
+            start = position + 1
+    selectors.append(prelude[start:])
+    return selectors
+
+
+def selector_can_match(selector: str, tags: set[str], names: set[str]) -> bool:
+    # arguments of :not() and attribute tests only narrow a match, ignoring them keeps more rules
+    selector = SELECTOR_ARGUMENT_PATTERN.sub("", selector)
+    for match in SELECTOR_NAME_PATTERN.finditer(selector):
+        separator = match.group(1).strip()
+        name = match.group(2)
+        if separator.endswith(":") or name == "*":
+            continue
+        if separator.endswith((".", "#")):
+            if name not in names:
+                return False
+        elif name.lower() not in tags:
+            return False
+    return True
+
+
+def subset_css(css: str, tags: set[str], names: set[str]) -> str:
+    """The rules of minified css that can match a page made of tags, with the class and id names in names."""
+    parts: list[str] = []
+    for prelude, block in split_rules(css):
+        if block is None:
+            parts.append(prelude + ";")
+        elif prelude.startswith(GROUPING_AT_RULES):
+            inner = subset_css(block, tags, names)
+            if inner:
+                parts.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith("@"):
+            # @font-face, @keyframes and the like are kept whole
+            parts.append(f"{prelude}{{{block}}}")
+        else:
+            selectors = [selector for selector in split_selectors(prelude) if selector_can_match(selector, tags, names)]
+            if selectors:
+                parts.append(f"{','.join(selectors)}{{{block}}}")
+    return "".join(parts)
+
+
+def absolute_css_urls(css: str, stylesheet_url: str, rewrite_url: Callable[[str], str] = None) -> str:
+    # relative urls were relative to the stylesheet, inlined they would be relative to each page
+    directory = posixpath.dirname(stylesheet_url)
+
+    def replace(match: re.Match) -> str:
+        url = match.group(2)
+        if not url.startswith(("data:", "#")) and "//" not in url:
+            if not url.startswith("/"):
+                url = posixpath.normpath(posixpath.join(directory, url))
+            if rewrite_url is not None:
+                url = rewrite_url(url)
+        return f"url({match.group(1)}{url}{match.group(1)})"
+    return CSS_URL_PATTERN.sub(replace, css)
+
+
+class InlineCss():
+    """Which stylesheets linked from a template get inlined into its <head>.
+
+    A site-absolute stylesheet link is replaced by a <style> holding the rules of
+    the minified file that can match a generated page, as long as all the css
+    inlined into the template stays within threshold bytes. Bigger stylesheets
+    keep their link.
+    """
+    def __init__(self, static_dir: str, threshold: int = DEFAULT_INLINE_THRESHOLD) -> None:
+        self.static_dir: str = static_dir
+        self.threshold: int = threshold
+
+    def inline(self, source: str, rewrite_url: Callable[[str], str] = None) -> tuple[str, list[str]]:
+        """The template source with its stylesheets inlined, and the paths of the stylesheets it linked."""
+        tags = GENERATED_TAGS | {name.lower() for name in TAG_NAME_PATTERN.findall(source)}
+        names = {name for _, value in CLASS_ID_ATTRIBUTE_PATTERN.findall(source) for name in value.split()}
+        dependencies: list[str] = []
+        inlined = 0
+
+        def replace(match: re.Match) -> str:
+            nonlocal inlined
+            attributes = dict(LINK_ATTRIBUTE_PATTERN.findall(match.group(0)))
+            url = attributes.get("href", "").split("?")[0].split("#")[0]
+            if attributes.get("rel") != "stylesheet" or not url.startswith("/") or url.startswith("//") or "media" in attributes:
+                return match.group(0)
+            path = os.path.join(self.static_dir, *url[1:].split("/"))
+            if not os.path.isfile(path):
+                return match.group(0)
+            dependencies.append(path)
+            css = subset_css(minify_css(get_file_content(path)), tags, names)
+            if inlined + len(css) > self.threshold:
+                return match.group(0)
+            inlined += len(css)
+            return f"<style>{absolute_css_urls(css, url, rewrite_url)}</style>"
+
+        return STYLESHEET_LINK_PATTERN.sub(replace, source), dependencies
+
+    def __repr__(self) -> str:
+        return f"InlineCss({self.static_dir}, {self.threshold})"
@@ -0,0 +1,154 @@
+import base64
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+from typing import Callable, TextIO
+
+from css import CSS_URL_PATTERN
+from manifest import hash_file
+from references import resolve_url
+
+
+INLINABLE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".ico", ".woff", ".woff2")
+
+TAG_PATTERN = re.compile(r"<([a-zA-Z][a-zA-Z0-9-]*)\b[^>]*>")
+URL_ATTRIBUTE_PATTERN = re.compile(r"(\s(src|href)=\")([^\"]*)\"")
+
+# what an asset url was last seen as, a link anywhere means the file has to stay
+INLINED = "inlined"
+LINKED = "linked"
+
+
+def resolve_css_url(url: str, stylesheet_url: str) -> str:
+    """The site-absolute url a url() in the stylesheet at stylesheet_url points at, or None."""
+    if url.startswith(("data:", "#")) or "//" in url:
+        return None
+    if url.startswith("/"):
+        return url
+    return posixpath.normpath(posixpath.join(posixpath.dirname(stylesheet_url), url))
+
+
+class DataUris():
+    """The static files smaller than threshold bytes, as data: uris for img tags and css url()s.
+
+    paths maps the site-absolute url of every such file to its path. Each file
+    is encoded once per process, however many pages use it. uses records for each
+    url whether it was only ever inlined or also linked, a file only inlined is
+    left out of docs/.
+    """
+    def __init__(self, static_dir: str, threshold: int, paths: dict[str, str], uses: dict[str, str] = None) -> None:
+        self.static_dir: str = static_dir
+        self.threshold: int = threshold
+        self.paths: dict[str, str] = paths
+        self.uses: dict[str, str] = uses if uses is not None else {}
+        self.encoded: dict[str, str] = {}
+        digest = hashlib.sha256(f"{threshold}".encode())
+        for url in sorted(paths):
+            digest.update(f"\0{url}\0{hash_file(paths[url])}".encode())
+        self.digest: str = digest.hexdigest()
+
+    @classmethod
+    def build(cls, static_dir: str, threshold: int, uses: dict[str, str] = None) -> 'DataUris':
+        """Find the inlinable files in static_dir. uses carries over what earlier builds saw, for pages not rendered again."""
+        paths: dict[str, str] = {}
+        stylesheets: list[tuple[str, str]] = []
+        for dir_path, _, file_names in os.walk(static_dir):
+            for name in file_names:
+                path = os.path.join(dir_path, name)
+                url = "/" + os.path.relpath(path, start=static_dir).replace(os.sep, "/")
+                if name.lower().endswith(INLINABLE_EXTENSIONS) and os.path.getsize(path) < threshold:
+                    paths[url] = path
+                elif name.endswith(".css"):
+                    stylesheets.append((url, path))
+        uses = {url: use for url, use in (uses or {}).items() if url in paths}
+        data_uris = cls(static_dir, threshold, paths, uses)
+        # stylesheets are synced after the pages, what they inline has to be known before any file is copied
+        for url, path in stylesheets:
+            with open(path) as file:
+                data_uris.inline_css(file.read(), url)
+        return data_uris
+
+    def uri(self, url: str) -> str:
+        uri = self.encoded.get(url)
+        if uri is None:
+            with open(self.paths[url], "rb") as file:
+                data = base64.b64encode(file.read()).decode()
+            mime_type = mimetypes.guess_type(url)[0] or "application/octet-stream"
+            uri = self.encoded[url] = f"data:{mime_type};base64,{data}"
+        return uri
+
+    def inline(self, url: str) -> str:
+        self.uses.setdefault(url, INLINED)
+        return self.uri(url)
+
+    def link(self, url: str) -> None:
+        self.uses[url] = LINKED
+
+    def inline_css(self, css: str, stylesheet_url: str) -> str:
+        """css with every url() of an inlinable file replaced by its data: uri."""
+        def replace(match: re.Match) -> str:
+            url = resolve_css_url(match.group(2), stylesheet_url)
+            if url not in self.paths:
+                return match.group(0)
+            return f"url({match.group(1)}{self.inline(url)}{match.group(1)})"
+        return CSS_URL_PATTERN.sub(replace, css)
+
+    def by_url(self, rewrite_url: Callable[[str], str] = None) -> dict[str, str]:
+        """The inlinable urls keyed by the urls pages link to, after the basepath and fingerprinting."""
+        if rewrite_url is None:
+            return {url: url for url in self.paths}
+        return {rewrite_url(url): url for url in self.paths}
+
+    def dropped(self) -> set[str]:
+        """Paths relative to static_dir of the files only ever inlined."""
+        return {os.path.join(*url[1:].split("/")) for url, use in self.uses.items() if use == INLINED}
+
+    def merge(self, uses: dict[str, str]) -> None:
+        for url, use in uses.items():
+            if use == LINKED:
+                self.link(url)
+            else:
+                self.uses.setdefault(url, use)
+
+    def __repr__(self) -> str:
+        return f"DataUris({len(self.paths)} files under {self.threshold} bytes)"
+
+
+class AssetInliner():
+    """Wraps a writer, putting small files into img tags as data: uris.
+
+    Every other href or src pointing at such a file is recorded as a link, that
+    file has to stay in docs/. urls not found in urls are resolved against
+    page_url, the page's url without the basepath, so relative links count too.
+    """
+    def __init__(self, writer: TextIO, data_uris: DataUris, urls: dict[str, str], page_url: str = None, basepath: str = "/") -> None:
+        self.writer: TextIO = writer
+        self.data_uris: DataUris = data_uris
+        self.urls: dict[str, str] = urls
+        self.page_url: str = page_url
+        self.basepath: str = basepath
+
+    def write(self, html: str) -> None:
+        if 'src="' not in html and 'href="' not in html:
+            self.writer.write(html)
+            return
+        self.writer.write(TAG_PATTERN.sub(self.inline_tag, html))
+
+    def inline_tag(self, match: re.Match) -> str:
+        is_img = match.group(1).lower() == "img"
+
+        def replace(attribute: re.Match) -> str:
+            url = self.urls.get(attribute.group(3))
+            if url is None and self.page_url is not None:
+                url = resolve_url(attribute.group(3), self.page_url, self.basepath)
+                if url not in self.data_uris.paths:
+                    url = None
+            if url is None:
+                return attribute.group(0)
+            if is_img and attribute.group(2) == "src":
+                return f'{attribute.group(1)}{self.data_uris.inline(url)}"'
+            self.data_uris.link(url)
+            return attribute.group(0)
+        return URL_ATTRIBUTE_PATTERN.sub(replace, match.group(0))
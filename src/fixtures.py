@@ -0,0 +1,23 @@
+import os
+import tempfile
+import unittest
+
+
+def write_file(path: str, content: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def write_bytes(path: str, content: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(content)
+
+
+class TempDirTestCase(unittest.TestCase):
+    """A test case with a fresh temporary directory in self.tmp, removed after each test."""
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        # after tearDown, which may still close files in it
+        self.addCleanup(self.tmp.cleanup)
@@ -1,59 +1,282 @@
+import io
+import logging
 import os
-import shutil
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, TextIO
 
-from text_utils import (
-    get_file_content,
-    extract_title
-)
-from node_utils import markdown_to_html_node
+from text_utils import Block, BlockScanner, extract_title_from_lines, get_file_content
+from htmlnode import ParentNode, RawNode
+from node_utils import scan_markdown, blocks_to_html_node, block_lines_to_html_node
+from manifest import BuildManifest, hash_file
+from render_cache import RenderCache
+from io_pool import IOPool
+from assets import ASSET_MAP_NAME, HEADERS_NAME
+from compress import SIBLING_SUFFIXES
+from css import minify_css
+from sync import SyncResult, sync_tree
+from template import TEMPLATE_NAME, RenderOptions, Template, find_template, load_template, rewrite_root_urls
+import buildtrace
+from buildtrace import span
 
 
-def reset_public() -> None:
-    cwd = os.path.dirname(os.path.realpath(__file__))
-    root_dir = os.path.dirname(cwd)
+logger = logging.getLogger(__name__)
+
+# pages larger than this are rendered block by block instead of read whole
+STREAM_SIZE = 8 * 1024 * 1024
+
+
+def reset_public(manifest: BuildManifest = None, keep: set[str] = None, compare: str = "mtime", link: str = "copy", root_dir: str = None,
+                 io_pool: IOPool = None, options: RenderOptions = None, compressed: bool = False) -> SyncResult:
+    """Sync static/ into docs/, copying only new or changed files.
+
+    Everything else in docs/ is deleted unless its path relative to docs/ is in keep,
+    so pass the outputs of generate_pages_recursive to keep the generated pages.
+    options are the ones the pages were rendered with. With assets, static files are copied to their fingerprinted names and the
+    asset map and _headers file are written next to them, stylesheets link to
+    the fingerprinted names of what they use. With compressed, the
+    .gz and .br siblings of the files that stay are kept too. With minify,
+    stylesheets are minified on the way. With data_uris, stylesheets get the
+    small files they use as data: uris, and files only ever inlined are left out.
+    With references, images, stylesheets, scripts and fonts no page reaches are
+    left out and reported.
+    root_dir defaults to the repository the generator lives in.
+    """
+    if root_dir is None:
+        cwd = os.path.dirname(os.path.realpath(__file__))
+        root_dir = os.path.dirname(cwd)
     
     public_dir = os.path.join(root_dir, "docs")
     static_dir = os.path.join(root_dir, "static") 
+    options = options if options is not None else RenderOptions()
+    assets = options.assets
+    minify = options.minify
+    data_uris = options.data_uris
+    references = options.references
     
-    if os.path.exists(public_dir):
-        print(f"deleting {public_dir}")
-        shutil.rmtree(public_dir)
+    # the manifest remembers the hashes of the copied files between builds
+    hashes = manifest.static if manifest is not None else None
+    rename = None
+    transforms = None
+    exclude = None
+    if minify or data_uris is not None or assets is not None:
+        def transform_css(css: str, relative_path: str) -> str:
+            stylesheet_url = "/" + relative_path.replace(os.sep, "/")
+            if data_uris is not None:
+                css = data_uris.inline_css(css, stylesheet_url)
+            # the files a stylesheet references are copied to their fingerprinted names too
+            if assets is not None:
+                css = assets.rewrite_css(css, stylesheet_url)
+            return minify_css(css) if minify else css
+        transforms = {".css": transform_css}
+    if data_uris is not None:
+        exclude = data_uris.dropped()
+    if references is not None:
+        unreferenced = references.unreferenced(static_dir, assets)
+        for relative_path in unreferenced:
+            logger.info("unreferenced static file left out: %s", relative_path)
+        if unreferenced:
+            logger.warning("%d static files are not referenced by any page, left out of %s", len(unreferenced), public_dir)
+        exclude = (exclude or set()) | set(unreferenced)
+    if assets is not None:
+        keep = (keep or set()) | {ASSET_MAP_NAME, HEADERS_NAME}
+        rename = assets.rename
+    with span("static sync", "static"):
+        result = sync_tree(static_dir, public_dir, compare=compare, link=link, keep=keep, hashes=hashes, io_pool=io_pool, rename=rename,
+                            siblings=SIBLING_SUFFIXES if compressed else (), transforms=transforms, exclude=exclude)
+    if assets is not None:
+        # only what the sync placed, files left out must not be listed, and the site's own _headers rules are kept
+        headers_path = os.path.join(static_dir, HEADERS_NAME)
+        assets.write(public_dir, set(result.copied) | set(result.skipped), headers_path if os.path.isfile(headers_path) else None)
+    logger.info("static files: %d copied, %d unchanged, %d deleted", len(result.copied), len(result.skipped), len(result.deleted))
+    return result
+
+
+def remove_output(public_dir: str, relative_path: str) -> None:
+    path = os.path.join(public_dir, relative_path)
+    if os.path.exists(path):
+        os.remove(path)
         
-    os.makedirs(public_dir)
+    # drop the directories the removal left empty, but never the public dir itself
+    parent_dir = os.path.dirname(path)
+    while parent_dir != public_dir and os.path.isdir(parent_dir) and not os.listdir(parent_dir):
+        os.rmdir(parent_dir)
+        parent_dir = os.path.dirname(parent_dir)
+
+
+def page_output_path(from_path: str, dest_path: str) -> str:
+    file_name, _ = os.path.splitext(os.path.basename(from_path))
+    return os.path.join(dest_path, file_name + ".html")
+
+
+class Page():
+    def __init__(self, from_path: str, dest_path: str, template_path: str, size: int = 0, url: str = None) -> None:
+        self.from_path: str = from_path
+        self.dest_path: str = dest_path
+        self.template_path: str = template_path
+        self.size: int = size
+        # where the page sits in the site, without the basepath, relative links resolve against it
+        self.url: str = url
         
-    if not os.path.exists(static_dir):
-        print(f"{static_dir} missing, nothing to copy")
-        return
+    def __repr__(self) -> str:
+        return f"Page({self.from_path}, {self.dest_path}, {self.template_path}, {self.size}, {self.url})"
+
+
+def parse_page(markdown: str) -> tuple[ParentNode, str]:
+    with span("block parse"):
+        blocks, title = scan_markdown(markdown)
+    if title is None:
+        raise ValueError("Missing h1 header")
+    with span("inline parse"):
+        node = blocks_to_html_node(blocks)
+    return node, title
+
+
+def write_page(writer: TextIO, markdown: str, template: Template, cache: RenderCache = None, page_url: str = None) -> None:
+    rewrite_url = template.rewrite_url
+    if cache is None:
+        node, title = parse_page(markdown)
+        
+        # the content is serialized straight into the writer, never held as one string
+        def content(content_writer: TextIO) -> None:
+            with span("render"):
+                node.write_html(content_writer, rewrite_url)
+    else:
+        key = RenderCache.key(markdown, template.url_key)
+        cached = cache.get(key)
+        if cached is None:
+            cached = render_blocks(markdown, template, cache)
+            cache.put(key, *cached)
+        title, content = cached
+        
+    title = rewrite_root_urls(title, template.basepath, template.assets)
+    with span("template fill"):
+        template.render_to(writer, page_url, Title=title, Content=content)
+
+
+def render_blocks(markdown: str, template: Template, cache: RenderCache) -> tuple[str, str]:
+    """Render the page's content one block at a time, reusing every block found in cache."""
+    with span("block parse"):
+        blocks, title = scan_markdown(markdown)
+    if title is None:
+        raise ValueError("Missing h1 header")
     
-    # we hate shutil.copytree() in this course
-    def copy_contents(path = "") -> None:
-        static_path = os.path.join(static_dir, path)
-        with os.scandir(static_path) as it:
-            for pt in it:
-                public_path = os.path.join(public_dir, path)
-                if pt.is_dir():
-                    print(f"creating {pt.name} directory in {os.path.relpath(public_path, start=root_dir)}")
-                    relative_path = os.path.relpath(pt, start=static_dir)
-                    new_dir = os.path.join(public_path, pt.name)
-                    os.mkdir(new_dir)
-                    copy_contents(relative_path)
-                if pt.is_file():
-                    print(f"copying {pt.name} to {os.path.relpath(public_path, start=root_dir)}")
-                    shutil.copy(pt, public_path)
-                
-    copy_contents()
+    with span("inline parse"):
+        children = [RawNode(block_html(block, template, cache)) for block in blocks]
+            
+    buffer = io.StringIO()
+    with span("render"):
+        ParentNode("div", children).write_html(buffer)
+    return title, buffer.getvalue()
 
 
-def generate_page(from_path: os.DirEntry, template_path: str, dest_path: str, basepath: str) -> None:
-    print(f"Generating page from {from_path.name} to {dest_path} using {template_path}")
-    markdown = get_file_content(from_path)
-    template = get_file_content(template_path)
-    html = markdown_to_html_node(markdown).to_html()
-    title = extract_title(markdown)
-    full_html = template.replace("{{ Title }}", title).replace("{{ Content }}", html).replace('href="/', f'href="{basepath}').replace('src="/', f'src="{basepath}')
-    file_name, _ = os.path.splitext(os.path.basename(from_path))
-    file_name += ".html"
-    new_file_path = os.path.join(dest_path, file_name)
+def block_html(block: Block, template: Template, cache: RenderCache) -> str:
+    key = RenderCache.block_key(block, template.url_key)
+    html = cache.get_block(key)
+    if html is None:
+        buffer = io.StringIO()
+        block_lines_to_html_node(block.block_type, block.lines).write_html(buffer, template.rewrite_url)
+        html = buffer.getvalue()
+        cache.put_block(key, html)
+    return html
+
+
+def stream_page(writer: TextIO, from_path: str, template: Template, cache: RenderCache = None, page_url: str = None) -> None:
+    """Render the markdown file at from_path into writer one block at a time.
+    
+    The file is read twice, once up to the title, which the template may need
+    before the content, and once block by block. Memory stays bounded by the
+    largest block however big the file is.
+    """
+    with open(from_path) as file:
+        title = extract_title_from_lines(file)
+    title = rewrite_root_urls(title, template.basepath, template.assets)
+    
+    def content(content_writer: TextIO) -> None:
+        # the same wrapper blocks_to_html_node puts around the blocks
+        content_writer.write("<div>")
+        with open(from_path) as file:
+            for block in BlockScanner(file):
+                if cache is None:
+                    block_lines_to_html_node(block.block_type, block.lines).write_html(content_writer, template.rewrite_url)
+                else:
+                    content_writer.write(block_html(block, template, cache))
+        content_writer.write("</div>")
+        
+    with span("template fill"):
+        template.render_to(writer, page_url, Title=title, Content=content)
+
+
+def render_page(markdown: str, template: Template, cache: RenderCache = None, page_url: str = None) -> str:
+    buffer = io.StringIO()
+    write_page(buffer, markdown, template, cache, page_url)
+    return buffer.getvalue()
+
+
+def generate_page(from_path: str, template_path: str, dest_path: str, basepath: str, template: Template = None, cache: RenderCache = None,
+                  markdown: str = None, io_pool: IOPool = None, page_url: str = None) -> None:
+    """Render the markdown at from_path into dest_path.
+    
+    markdown is the content of from_path when the caller already read it, page_url
+    is the page's url in the site without the basepath, as in Page.url. With
+    io_pool the page is written on an io thread while the caller moves on, and
+    dest_path must already exist. Pages over STREAM_SIZE are always streamed
+    into their file.
+    """
+    with span("page", path=from_path):
+        logger.info("Generating page from %s to %s using %s", os.path.basename(from_path), dest_path, template_path)
+        if template is None:
+            template = load_template(template_path, basepath)
+        # big pages are streamed on this thread even with io_pool, never held as one string
+        size = os.path.getsize(from_path) if markdown is None else len(markdown)
+        if size > STREAM_SIZE:
+            write_output(from_path, dest_path, lambda file: stream_page(file, from_path, template, cache, page_url))
+            record_references(template, from_path, dest_path)
+            return
+        if markdown is None:
+            with span("read"):
+                markdown = get_file_content(from_path)
+        if io_pool is None:
+            write_page_file(markdown, from_path, template_path, dest_path, basepath, template, cache, page_url)
+            record_references(template, from_path, dest_path)
+            return
+        
+        # rendered before anything is written, a failed page leaves no partial file behind
+        html = render_page(markdown, template, cache, page_url)
+        record_references(template, from_path, dest_path)
+        new_file_path = page_output_path(from_path, dest_path)
+        logger.info("writing to %s", new_file_path)
+        io_pool.submit(write_text, new_file_path, html)
+
+
+def record_references(template: Template, from_path: str, dest_path: str) -> None:
+    # the urls the render collected belong to the page just written
+    if template.references is not None:
+        template.references.record(page_output_path(from_path, dest_path))
+
+
+def read_source(page: Page) -> str:
+    # pages big enough to be streamed are left on disk
+    if page.size > STREAM_SIZE:
+        return None
+    with span("read", path=page.from_path):
+        return get_file_content(page.from_path)
+
+
+def write_text(path: str, text: str) -> None:
+    with span("write", path=path), open(path, "w") as file:
+        file.write(text)
+
+
+def write_page_file(markdown: str, from_path: str, template_path: str, dest_path: str, basepath: str, template: Template = None, cache: RenderCache = None,
+                    page_url: str = None) -> None:
+    if template is None:
+        template = load_template(template_path, basepath)
+    write_output(from_path, dest_path, lambda file: write_page(file, markdown, template, cache, page_url))
+
+
+def write_output(from_path: str, dest_path: str, write: Callable[[TextIO], None]) -> None:
+    new_file_path = page_output_path(from_path, dest_path)
     
     if not os.path.exists(dest_path):
         def create_path(path: str) -> None:
@@ -61,37 +284,240 @@ def generate_page(from_path: os.DirEntry, template_path: str, dest_path: str, ba
             if not os.path.exists(parent_dir):
                 create_path(parent_dir)
                 
-            print(f"Creating {path}")
+            logger.info("Creating %s", path)
             os.mkdir(path)
             
         create_path(dest_path)
         
-    with open(new_file_path, "w+") as file:
-        print(f"writing to {new_file_path}")
-        file.write(full_html)
+    try:
+        with span("write"), open(new_file_path, "w+") as file:
+            logger.info("writing to %s", new_file_path)
+            write(file)
+    except Exception:
+        # half a page must not be served, or outlive its source in watch mode
+        os.remove(new_file_path)
+        raise
+
 
+# set once per worker process by init_worker, so the templates are not pickled with every page
+worker_templates: dict[str, Template] = {}
+worker_cache: RenderCache = None
 
-def generate_pages_recursive(dir_path_content: str, template_path: str, dest_dir_path: str, basepath: str) -> None:
-    cwd = os.path.dirname(os.path.realpath(__file__))
-    root_dir = os.path.dirname(cwd)
+
+def init_worker(templates: dict[str, Template], tracing: bool, cache: tuple[str, int, int] = None) -> None:
+    global worker_templates, worker_cache
+    worker_templates = templates
+    # a sqlite connection cannot cross processes, every worker opens the file itself
+    if cache is not None:
+        worker_cache = RenderCache(*cache)
+    if tracing:
+        buildtrace.start_tracing()
+
+
+def generate_page_in_worker(page: Page) -> tuple[list[dict], Counter, dict[str, str], dict[str, list[str]]]:
+    template = worker_templates[page.template_path]
+    generate_page(page.from_path, page.template_path, page.dest_path, template.basepath, template, worker_cache, page_url=page.url)
+    # each page's cache writes go to the file in one transaction
+    if worker_cache is not None:
+        worker_cache.flush()
+    # spans recorded and cache counts taken in the worker travel back with the result
+    events = buildtrace.tracer.drain() if buildtrace.tracer is not None else None
+    counters = None
+    if worker_cache is not None:
+        counters = worker_cache.counters
+        worker_cache.counters = Counter()
+    uses = None
+    if template.data_uris is not None:
+        uses = template.data_uris.uses
+        template.data_uris.uses = {}
+    references = None
+    if template.references is not None:
+        references = template.references.pages
+        template.references.pages = {}
+    return events, counters, uses, references
+
+
+def render_pages(pages: list[Page], basepath: str, options: RenderOptions, jobs: int = 1, cache: RenderCache = None, io_pool: IOPool = None) -> None:
+    """Generate every page, on jobs processes when jobs > 1.
     
-    public_dir_path = os.path.relpath(os.path.abspath(dest_dir_path), start=root_dir)
-    public_dir = os.path.join(root_dir, public_dir_path)
-    content_dir_path = os.path.relpath(os.path.abspath(dir_path_content), start=root_dir)
-    content_dir = os.path.join(root_dir, content_dir_path)
-    template_dir_path = os.path.relpath(os.path.abspath(template_path), start=root_dir)
-    template_dir = os.path.join(root_dir, template_dir_path)
+    On one process, io_pool reads the next sources and writes the finished pages
+    while the current one renders. Every write is done when this returns.
+    """
+    # every template is compiled once, however many pages use it
+    templates = {page.template_path: load_template(page.template_path, basepath, options) for page in pages}
+    if (jobs <= 1 or len(pages) < 2) and io_pool is None:
+        for page in pages:
+            generate_page(page.from_path, page.template_path, page.dest_path, basepath, templates[page.template_path], cache, page_url=page.url)
+        return
+    
+    # all directories up front, workers would race each other creating the same ones
+    if io_pool is not None:
+        io_pool.makedirs(page.dest_path for page in pages)
+    else:
+        for dest_path in {page.dest_path for page in pages}:
+            os.makedirs(dest_path, exist_ok=True)
+        
+    if jobs <= 1 or len(pages) < 2:
+        for page, markdown in io_pool.prefetch(pages, read_source):
+            generate_page(page.from_path, page.template_path, page.dest_path, basepath, templates[page.template_path], cache, markdown, io_pool, page.url)
+        io_pool.wait()
+        return
     
-    def generate(content_path: str) -> None:
+    # largest pages first, so a huge page does not start last and hold up the whole build
+    pages = sorted(pages, key=lambda page: page.size, reverse=True)
+    chunksize = max(1, len(pages) // (jobs * 4))
+    tracer = buildtrace.tracer
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(templates, tracer is not None, cache and (cache.path, cache.max_bytes, cache.memory_bytes))) as executor:
+        for events, counters, uses, page_references in executor.map(generate_page_in_worker, pages, chunksize=chunksize):
+            if tracer is not None:
+                tracer.add_events(events)
+            if cache is not None:
+                cache.counters.update(counters)
+            if options.data_uris is not None:
+                options.data_uris.merge(uses)
+            if options.references is not None:
+                options.references.merge(page_references)
+
+
+def template_hash(template_path: str, basepath: str, options: RenderOptions) -> str:
+    """What the manifest records a page was rendered with, besides its markdown."""
+    template = load_template(template_path, basepath, options)
+    return "".join([hash_file(template_path), options.digest] + [hash_file(path) for path in template.dependencies if os.path.exists(path)])
+
+
+def changed_markdown(changed: set[str], dir_path_content: str, manifest: BuildManifest = None) -> set[str]:
+    """The markdown files among the changed paths under dir_path_content, or None when only a full pass will do.
+
+    A template, a directory or a path the manifest knows pages under changes
+    more than its own page. Other files in the content dir are never rendered.
+    """
+    content_dir = os.path.abspath(dir_path_content)
+    markdown: set[str] = set()
+    for path in changed:
+        if path == content_dir or os.path.basename(path) == TEMPLATE_NAME or os.path.isdir(path):
+            return None
+        if path.endswith(".md"):
+            markdown.add(path)
+        elif not os.path.exists(path):
+            # a directory moved or deleted whole only shows up as itself
+            prefix = os.path.relpath(path, start=content_dir) + os.sep
+            if manifest is None or any(source.startswith(prefix) for source in manifest.pages):
+                return None
+    return markdown
+
+
+def generate_changed_pages(changed: set[str], dir_path_content: str, template_path: str, dest_dir_path: str, basepath: str, outputs: set[str],
+                           manifest: BuildManifest = None, jobs: int = 1, cache: RenderCache = None, io_pool: IOPool = None,
+                           options: RenderOptions = None) -> set[str]:
+    """Render only the markdown files in changed, absolute paths, and return the outputs updated from outputs.
+
+    The rest of the content tree is never walked. Deleted files lose their
+    output. Only right while the templates and the static digests stay the
+    same, generate_pages_recursive does the full pass otherwise.
+    """
+    public_dir = os.path.abspath(dest_dir_path)
+    content_dir = os.path.abspath(dir_path_content)
+    options = options if options is not None else RenderOptions()
+    outputs = set(outputs)
+    pages: list[Page] = []
+    records: list[tuple[str, str, str, str]] = []
+    template_hashes: dict[str, str] = {}
+    for path in sorted(changed):
+        source = os.path.relpath(path, start=content_dir)
+        dest_dir = os.path.normpath(os.path.join(public_dir, os.path.dirname(source)))
+        output = os.path.relpath(page_output_path(path, dest_dir), start=public_dir)
+        if not os.path.isfile(path):
+            if manifest is not None:
+                manifest.remove_page(source)
+            if output in outputs:
+                logger.info("removing %s, its markdown source is gone", output)
+                outputs.discard(output)
+                remove_output(public_dir, output)
+            continue
+
+        # the same override lookup collect does on its way down
+        directory = content_dir
+        page_template = find_template(directory, os.path.abspath(template_path))
+        for part in filter(None, os.path.dirname(source).split(os.sep)):
+            directory = os.path.join(directory, part)
+            page_template = find_template(directory, page_template)
+        outputs.add(output)
+        page = Page(path, dest_dir, page_template, os.path.getsize(path), "/" + output.replace(os.sep, "/"))
+        if manifest is not None:
+            source_hash = hash_file(path)
+            if page_template not in template_hashes:
+                template_hashes[page_template] = template_hash(page_template, basepath, options)
+            if manifest.page_is_current(source, source_hash, template_hashes[page_template], output) and os.path.exists(os.path.join(public_dir, output)):
+                continue
+            records.append((source, source_hash, template_hashes[page_template], output))
+        pages.append(page)
+
+    render_pages(pages, basepath, options, jobs, cache, io_pool)
+    if options.references is not None:
+        options.references.retain(outputs)
+    if manifest is not None:
+        for record in records:
+            manifest.record_page(*record)
+    return outputs
+
+
+def generate_pages_recursive(dir_path_content: str, template_path: str, dest_dir_path: str, basepath: str, manifest: BuildManifest = None, jobs: int = 1, cache: RenderCache = None,
+                             io_pool: IOPool = None, options: RenderOptions = None) -> set[str]:
+    public_dir = os.path.abspath(dest_dir_path)
+    content_dir = os.path.abspath(dir_path_content)
+    template_dir = os.path.abspath(template_path)
+    options = options if options is not None else RenderOptions()
+    
+    if manifest is not None:
+        manifest.set_basepath(basepath)
+    template_hashes: dict[str, str] = {}
+    sources: set[str] = set()
+    outputs: set[str] = set()
+    pages: list[Page] = []
+    records: list[tuple[str, str, str, str]] = []
+    
+    def collect(content_path: str, template_path: str) -> None:
+        template_path = find_template(content_path, template_path)
         with os.scandir(content_path) as it:
             for pt in it:
                 if pt.is_file():
-                    dest_dir = os.path.join(public_dir, os.path.relpath(os.path.dirname(pt.path), start=content_dir))
+                    # normalized, "docs/." would not be creatable when docs/ is missing
+                    dest_dir = os.path.normpath(os.path.join(public_dir, os.path.relpath(os.path.dirname(pt.path), start=content_dir)))
                     _, extension = os.path.splitext(pt)
-                    print(extension)
-                    if extension == ".md":
-                        generate_page(pt, template_dir, dest_dir, basepath)
+                    if extension != ".md":
+                        continue
+                    output = os.path.relpath(page_output_path(pt.path, dest_dir), start=public_dir)
+                    outputs.add(output)
+                    page = Page(pt.path, dest_dir, template_path, pt.stat().st_size, "/" + output.replace(os.sep, "/"))
+                    if manifest is None:
+                        pages.append(page)
+                        continue
+                    
+                    source = os.path.relpath(pt.path, start=content_dir)
+                    source_hash = hash_file(pt.path)
+                    if template_path not in template_hashes:
+                        template_hashes[template_path] = template_hash(template_path, basepath, options)
+                    page_template_hash = template_hashes[template_path]
+                    sources.add(source)
+                    if manifest.page_is_current(source, source_hash, page_template_hash, output) and os.path.exists(os.path.join(public_dir, output)):
+                        continue
+                    
+                    pages.append(page)
+                    records.append((source, source_hash, page_template_hash, output))
                 if pt.is_dir():
-                    generate(pt)
+                    collect(pt.path, template_path)
                     
-    generate(content_dir)
\ No newline at end of file
+    collect(content_dir, template_dir)
+    render_pages(pages, basepath, options, jobs, cache, io_pool)
+    if options.references is not None:
+        options.references.retain(outputs)
+    
+    if manifest is not None:
+        # only recorded once rendered, a failed build must not mark its pages as current
+        for record in records:
+            manifest.record_page(*record)
+        for output in manifest.prune_pages(sources):
+            logger.info("removing %s, its markdown source is gone", output)
+            remove_output(public_dir, output)
+            
+    return outputs
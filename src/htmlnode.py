@@ -1,54 +1,198 @@
+import io
+import sys
+from typing import Callable, TextIO
+
+from textnode import TextType, TextSpan
+
+
+URL_PROPS = ("href", "src")
+
+# values longer than this are unlikely to repeat, sharing them would only grow the table
+SHARED_VALUE_LENGTH = 16
+SHARED_LEAVES_LIMIT = 4096
+shared_leaves: dict[tuple[str, str], 'SharedLeafNode'] = {}
+
+
 class HTMLNode():
+    # no per-instance __dict__, a build allocates millions of nodes
+    __slots__ = ("tag", "value", "children", "props")
+    
     def __init__(self, tag: str = None, value: str = None, children: list = None, props: dict = None) -> None:
-        self.tag: str = tag
+        # the handful of tag names are shared by every node instead of copied into each
+        self.tag: str = sys.intern(tag) if tag.__class__ is str else tag
         self.value: str = value
         self.children: list = children
         self.props: dict = props
-        
-    def to_html(self) -> None:
+
+    def to_html(self) -> str:
+        buffer = io.StringIO()
+        self.write_html(buffer)
+        return buffer.getvalue()
+
+    def write_html(self, writer: TextIO, rewrite_url: Callable[[str], str] = None) -> None:
+        """Serialize the tree into writer, a file or io.StringIO, one fragment at a time.
+
+        The tree is walked with an explicit stack instead of recursion, so deep trees
+        neither copy their html once per level nor hit the recursion limit. rewrite_url
+        is applied to every href and src value on the way out.
+        """
+        write = writer.write
+        stack: list = [self]
+        while stack:
+            item = stack.pop()
+            # closing tags are pushed as plain strings
+            if item.__class__ is str:
+                write(item)
+                continue
+            closing = item.open_html(write, rewrite_url)
+            if closing is not None:
+                stack.append(closing)
+                stack.extend(reversed(item.children))
+
+    def open_html(self, write: Callable[[str], object], rewrite_url: Callable[[str], str] = None) -> str:
+        """Write the start of the node, returning the closing tag if its children follow."""
         raise NotImplementedError("to_html method not implemented")
-    
-    def props_to_html(self) -> str:
+
+    def props_to_html(self, rewrite_url: Callable[[str], str] = None) -> str:
         if not self.props:
             return ""
-        props_html = ""
-        for prop in self.props:
-            props_html += f' {prop}="{self.props[prop]}"'
-        return props_html
-    
+        if rewrite_url is None:
+            return "".join([f' {prop}="{value}"' for prop, value in self.props.items()])
+        return "".join([f' {prop}="{rewrite_url(value) if prop in URL_PROPS else value}"' for prop, value in self.props.items()])
+
     def __repr__(self) -> str:
         return f"HTMLNode({self.tag}, {self.value}, children: {self.children}, {self.props})"
-    
-    
+
+
 class LeafNode(HTMLNode):
+    __slots__ = ()
+    
     def __init__(self, tag: str, value: str, props: dict[str, str] = None) -> None:
         super().__init__(tag=tag, value=value, props=props)
-        
-    def to_html(self) -> str:
+
+    def open_html(self, write: Callable[[str], object], rewrite_url: Callable[[str], str] = None) -> None:
         if self.value is None: # img tag has no value
             raise ValueError("Leaf node has no value")
         if not self.tag:
-            return self.value
-        if self.tag == "img":
-            return f"<{self.tag}{self.props_to_html()} />"
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+            write(self.value)
+        elif self.tag == "img":
+            write(f"<{self.tag}{self.props_to_html(rewrite_url)} />")
+        else:
+            write(f"<{self.tag}{self.props_to_html(rewrite_url)}>")
+            write(self.value)
+            write(f"</{self.tag}>")
+        return None
+
+    @staticmethod
+    def shared(tag: str, value: str) -> 'SharedLeafNode':
+        """A prop-less, immutable leaf shared by every caller asking for the same tag and value.
+        
+        Short runs such as ", " or " and " repeat all over a page.
+        """
+        key = (tag, value)
+        node = shared_leaves.get(key)
+        if node is None:
+            node = SharedLeafNode(tag, value)
+            if len(shared_leaves) < SHARED_LEAVES_LIMIT:
+                shared_leaves[key] = node
+        return node
     
     def __repr__(self) -> str:
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
+
+
+class SharedLeafNode(LeafNode):
+    """A LeafNode handed to every tree that needs it, any change would show in all of them."""
+    __slots__ = ()
+    
+    def __init__(self, tag: str, value: str) -> None:
+        # set through the slots, __setattr__ refuses every later change
+        object.__setattr__(self, "tag", sys.intern(tag) if tag.__class__ is str else tag)
+        object.__setattr__(self, "value", value)
+        object.__setattr__(self, "children", None)
+        object.__setattr__(self, "props", None)
+        
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"shared leaf nodes are immutable, cannot set {name}")
     
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"shared leaf nodes are immutable, cannot delete {name}")
     
+    def __reduce__(self) -> tuple:
+        # unpickled leaves are shared again
+        return LeafNode.shared, (self.tag, self.value)
+
+
 class ParentNode(HTMLNode):
+    __slots__ = ()
+    
     def __init__(self, tag: str, children: list[LeafNode], props: dict[str, str] = None) -> None:
         super().__init__(tag=tag, children=children, props=props)
-        
-    def to_html(self) -> str:
+
+    def open_html(self, write: Callable[[str], object], rewrite_url: Callable[[str], str] = None) -> str:
         if not self.tag:
             raise ValueError("Parent node has no tag")
         if not self.children:
             raise ValueError("Parent node has no children")
-        return f"<{self.tag}>{''.join(map(lambda x: x.to_html(), self.children))}</{self.tag}>"
-    
+        write(f"<{self.tag}>")
+        return f"</{self.tag}>"
+
     def __repr__(self) -> str:
         return f"ParentNode({self.tag}, children: {self.children}, {self.props})"
+
+
+class SpanNode(HTMLNode):
+    """The inline content of a block as spans over its source text.
+    
+    Serializes exactly like the LeafNodes text_node_to_html_node would build, but
+    each substring only exists while it is being written.
+    """
+    __slots__ = ("spans",)
+    
+    def __init__(self, source: str, spans: list[TextSpan]) -> None:
+        super().__init__(value=source)
+        self.spans: list[TextSpan] = spans
+        
+    def open_html(self, write: Callable[[str], object], rewrite_url: Callable[[str], str] = None) -> None:
+        source = self.value
+        for span in self.spans:
+            match span.text_type:
+                case TextType.TEXT:
+                    write(source[span.start:span.end])
+                case TextType.BOLD | TextType.ITALIC | TextType.CODE:
+                    tag = SPAN_TAGS[span.text_type]
+                    write(f"<{tag}>")
+                    write(source[span.start:span.end])
+                    write(f"</{tag}>")
+                # links and images go through LeafNode so their props are written the same way
+                case TextType.LINK:
+                    LeafNode("a", span.text(source), {"href": span.url(source)}).open_html(write, rewrite_url)
+                case TextType.IMAGE:
+                    LeafNode("img", "", {"src": span.url(source), "alt": span.text(source)}).open_html(write, rewrite_url)
+        return None
+    
+    def __repr__(self) -> str:
+        return f"SpanNode({self.value}, {self.spans})"
+
+
+class RawNode(HTMLNode):
+    """Html that was already serialized, like a block fragment from the render cache."""
+    __slots__ = ()
     
-    
\ No newline at end of file
+    def __init__(self, html: str) -> None:
+        super().__init__(value=html)
+        
+    def open_html(self, write: Callable[[str], object], rewrite_url: Callable[[str], str] = None) -> None:
+        # urls were rewritten when the fragment was first written
+        write(self.value)
+        return None
+    
+    def __repr__(self) -> str:
+        return f"RawNode({self.value})"
+
+
+SPAN_TAGS = {
+    TextType.BOLD: "b",
+    TextType.ITALIC: "i",
+    TextType.CODE: "code",
+}
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import re
+import struct
+from typing import BinaryIO, Callable, TextIO
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+
+IMG_TAG_PATTERN = re.compile(r"<img\b[^>]*>")
+SRC_PATTERN = re.compile(r"\ssrc=\"([^\"]*)\"")
+
+# start of frame markers, the ones holding the image size
+JPEG_SOF_MARKERS = frozenset((0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF))
+
+
+def read_jpeg_size(file: BinaryIO) -> tuple[int, int]:
+    file.seek(2)
+    while True:
+        marker = file.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        # fill bytes before a marker
+        while marker[1] == 0xFF:
+            marker = marker[1:] + file.read(1)
+        if marker[1] == 0xD8 or 0xD0 <= marker[1] <= 0xD7:
+            continue
+        length_data = file.read(2)
+        if len(length_data) < 2:
+            return None
+        length = struct.unpack(">H", length_data)[0]
+        if marker[1] in JPEG_SOF_MARKERS:
+            data = file.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack(">xHH", data)
+            return width, height
+        file.seek(length - 2, os.SEEK_CUR)
+
+
+def read_image_size(path: str) -> tuple[int, int]:
+    """The (width, height) in the header of a PNG, JPEG, GIF or WebP file, or None."""
+    with open(path, "rb") as file:
+        head = file.read(30)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            chunk = head[12:16]
+            if chunk == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":
+                width, height = struct.unpack("<HH", head[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b"VP8L" and head[20] == 0x2F:
+                bits = struct.unpack("<I", head[21:25])[0]
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b"VP8X":
+                return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+            return None
+        if head.startswith(b"\xff\xd8"):
+            return read_jpeg_size(file)
+    return None
+
+
+class ImageSizes():
+    """The intrinsic size of every image in static/, read from the headers once per build.
+
+    sizes maps a site-absolute url to (width, height). signatures remembers the
+    (mtime, size) each header was read at, so building again from the previous
+    ImageSizes only reads the images that changed. digest changes whenever a
+    size does.
+    """
+    def __init__(self, sizes: dict[str, tuple[int, int]], signatures: dict[str, tuple[int, int]] = None) -> None:
+        self.sizes: dict[str, tuple[int, int]] = sizes
+        self.signatures: dict[str, tuple[int, int]] = signatures if signatures is not None else {}
+        self.digest: str = hashlib.sha256(json.dumps(sorted(sizes.items())).encode()).hexdigest()
+
+    @classmethod
+    def build(cls, static_dir: str, previous: 'ImageSizes' = None) -> 'ImageSizes':
+        sizes: dict[str, tuple[int, int]] = {}
+        signatures: dict[str, tuple[int, int]] = {}
+        for dir_path, _, file_names in os.walk(static_dir):
+            for name in file_names:
+                if not name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                path = os.path.join(dir_path, name)
+                url = "/" + os.path.relpath(path, start=static_dir).replace(os.sep, "/")
+                stat = os.stat(path)
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if previous is not None and previous.signatures.get(url) == signature:
+                    size = previous.sizes.get(url)
+                else:
+                    try:
+                        size = read_image_size(path)
+                    except (OSError, struct.error, IndexError):
+                        size = None
+                signatures[url] = signature
+                if size is not None:
+                    sizes[url] = size
+        return cls(sizes, signatures)
+
+    def by_url(self, rewrite_url: Callable[[str], str] = None) -> dict[str, tuple[int, int]]:
+        """sizes keyed by the urls pages link to, after the basepath and fingerprinting."""
+        if rewrite_url is None:
+            return dict(self.sizes)
+        return {rewrite_url(url): size for url, size in self.sizes.items()}
+
+    def __repr__(self) -> str:
+        return f"ImageSizes({len(self.sizes)} images, {self.digest[:8]})"
+
+
+class ImageHints():
+    """Wraps a writer, adding width, height, loading and decoding to the img tags written through it.
+
+    The first image of the page is likely in view, it is not lazy loaded. Tags
+    already carrying one of the attributes keep theirs.
+    """
+    def __init__(self, writer: TextIO, sizes: dict[str, tuple[int, int]]) -> None:
+        self.writer: TextIO = writer
+        self.sizes: dict[str, tuple[int, int]] = sizes
+        self.first: bool = True
+
+    def write(self, html: str) -> None:
+        if "<img" not in html:
+            self.writer.write(html)
+            return
+        self.writer.write(IMG_TAG_PATTERN.sub(self.add_hints, html))
+
+    def add_hints(self, match: re.Match) -> str:
+        tag = match.group(0)
+        attributes: list[str] = []
+        src = SRC_PATTERN.search(tag)
+        size = self.sizes.get(src.group(1)) if src is not None else None
+        if size is not None and " width=" not in tag and " height=" not in tag:
+            attributes.append(f' width="{size[0]}" height="{size[1]}"')
+        if not self.first and " loading=" not in tag:
+            attributes.append(' loading="lazy"')
+        if " decoding=" not in tag:
+            attributes.append(' decoding="async"')
+        self.first = False
+        end = len(tag) - (2 if tag.endswith("/>") else 1)
+        # keep the space before "/>" where it was
+        if tag[end - 1] == " ":
+            end -= 1
+        return tag[:end] + "".join(attributes) + tag[end:]
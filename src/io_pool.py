@@ -0,0 +1,86 @@
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, TypeVar
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_IO_THREADS = 4
+
+
+class IOPool():
+    """Runs blocking file I/O on a bounded number of threads.
+
+    File reads, writes and copies release the GIL, so on slow or network storage
+    the waits overlap with each other and with rendering. At most 2 * threads
+    submitted tasks are pending at once, which also bounds the memory held by
+    rendered pages waiting to be written. With threads == 0 everything runs
+    inline, in order.
+
+    The first error raised by a task is raised again by the next submit or wait
+    after it finished.
+    """
+    def __init__(self, threads: int = DEFAULT_IO_THREADS) -> None:
+        self.threads: int = threads
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(threads, thread_name_prefix="io") if threads > 0 else None
+        self.pending: deque[Future] = deque()
+
+    def submit(self, function: Callable[..., R], *args) -> Future:
+        if self.executor is None:
+            future = Future()
+            future.set_result(function(*args))
+            return future
+
+        # finished tasks are let go, a failed one fails this submit
+        for done in [future for future in self.pending if future.done()]:
+            self.pending.remove(done)
+            done.result()
+        # wait for the oldest task instead of queueing without bound
+        while len(self.pending) >= self.threads * 2:
+            self.pending.popleft().result()
+        future = self.executor.submit(function, *args)
+        self.pending.append(future)
+        return future
+
+    def wait(self) -> None:
+        """Block until every submitted task is done."""
+        while self.pending:
+            self.pending.popleft().result()
+
+    def prefetch(self, items: Iterable[T], read: Callable[[T], R]) -> Iterator[tuple[T, R]]:
+        """Yield (item, read(item)) in order, with up to threads reads running ahead."""
+        if self.executor is None:
+            for item in items:
+                yield item, read(item)
+            return
+
+        ahead: deque[tuple[T, Future]] = deque()
+        for item in items:
+            ahead.append((item, self.executor.submit(read, item)))
+            if len(ahead) > self.threads:
+                item, future = ahead.popleft()
+                yield item, future.result()
+        while ahead:
+            item, future = ahead.popleft()
+            yield item, future.result()
+
+    def makedirs(self, paths: Iterable[str]) -> None:
+        """Create every directory in paths, one call per branch of the tree."""
+        paths = sorted({os.path.normpath(path) for path in paths})
+        # a directory is created on the way to any directory below it
+        leaves = [path for index, path in enumerate(paths) if index + 1 == len(paths) or not paths[index + 1].startswith(path + os.sep)]
+        for path in leaves:
+            self.submit(os.makedirs, path, 0o777, True)
+        self.wait()
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def __enter__(self) -> 'IOPool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
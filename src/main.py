@@ -1,13 +1,192 @@
+import argparse
+import logging
+import os
 import sys
 
-from gencontent import reset_public, generate_pages_recursive
+from gencontent import changed_markdown, generate_changed_pages, generate_pages_recursive, reset_public
+from assets import AssetMap
+from compress import DEFAULT_LEVEL, compress_tree
+from css import DEFAULT_INLINE_THRESHOLD, InlineCss
+from data_uris import DataUris
+from images import ImageSizes
+from io_pool import DEFAULT_IO_THREADS, IOPool
+from manifest import BuildManifest
+from references import ReferenceIndex
+from render_cache import DEFAULT_CACHE_SIZE, RenderCache
+import buildtrace
+from sync import COMPARE_MODES, LINK_MODES
+from template import RenderOptions
+from watch import create_watcher, watch
 
 
-def main():
-    basepath = sys.argv[1] if len(sys.argv) > 1 else "/"
-    reset_public()
-    generate_pages_recursive("content/", "template.html", "docs/", basepath)
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv: list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate the static site from content/ into docs/")
+    parser.add_argument("basepath", nargs="?", default="/", help="path the site is served under")
+    parser.add_argument("--incremental", action="store_true", help="only rebuild what changed since the last build")
+    parser.add_argument("--static-compare", choices=COMPARE_MODES, default="mtime", help="how unchanged static files are detected")
+    parser.add_argument("--static-link", choices=LINK_MODES, default="copy", help="how static files are placed in docs/")
+    parser.add_argument("--root", help="site directory holding content/, static/, template.html and docs/, defaults to this repository")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="render pages on N processes, 0 uses every core")
+    parser.add_argument("--io-threads", type=int, default=DEFAULT_IO_THREADS, metavar="N", help="overlap file reads, writes and copies on N threads, 0 does them inline")
+    parser.add_argument("--quiet", "-q", action="store_true", help="only log warnings and errors")
+    parser.add_argument("--trace", metavar="OUT.json", help="record a Chrome/Perfetto trace of the build")
+    parser.add_argument("--cache", metavar="CACHE.db", help="reuse rendered pages and blocks from this SQLite file, it can be shared between checkouts")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024), metavar="MB", help="evict the least recently used pages beyond this size")
+    parser.add_argument("--fingerprint", action="store_true", help="copy static files to content-hashed names, link to those and write a _headers file marking them immutable")
+    parser.add_argument("--minify", action="store_true", help="strip comments, whitespace between tags and needless attribute quotes from the pages, and minify the css in static/")
+    parser.add_argument("--inline-css", type=int, nargs="?", const=DEFAULT_INLINE_THRESHOLD, metavar="BYTES",
+                        help=f"put the rules of linked stylesheets that can match a page into a <style> in the template, unless that adds more than BYTES (default {DEFAULT_INLINE_THRESHOLD})")
+    parser.add_argument("--image-hints", action="store_true", help="give img tags the width and height of their file in static/, lazy load all but the first and decode them async")
+    parser.add_argument("--inline-assets", type=int, metavar="BYTES",
+                        help="put static files smaller than BYTES into img tags and css url()s as data: uris, leaving out the ones only used that way")
+    parser.add_argument("--prune", action="store_true",
+                        help="only copy the images, stylesheets, scripts and fonts in static/ that a page or linked stylesheet references, and report the others")
+    parser.add_argument("--compress", type=int, nargs="?", const=DEFAULT_LEVEL, choices=range(1, 10), metavar="LEVEL",
+                        help=f"write .gz siblings (and .br ones when brotli is installed) of html, css and other text files, at LEVEL (default {DEFAULT_LEVEL})")
+    parser.add_argument("--watch", action="store_true", help="keep running and rebuild what changed, implies --incremental")
+    parser.add_argument("--poll", action="store_true", help="poll for changes in --watch mode instead of using inotify")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] = None):
+    args = parse_args(argv)
+
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+    logging.basicConfig(stream=sys.stdout, format="%(message)s", level=logging.WARNING if args.quiet else logging.INFO, force=True)
+    tracer = buildtrace.start_tracing() if args.trace else None
+
+    root_dir = os.path.abspath(args.root) if args.root else os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    content_dir = os.path.join(root_dir, "content")
+    static_dir = os.path.join(root_dir, "static")
+    template_path = os.path.join(root_dir, "template.html")
+    public_dir = os.path.join(root_dir, "docs")
+
+    manifest = None
+    if args.incremental or args.watch:
+        manifest = BuildManifest.load(os.path.join(root_dir, ".build-manifest.json"))
+
+    # watch mode keeps rendered blocks in memory between rebuilds even without a cache file
+    cache = None
+    if args.cache or args.watch:
+        cache = RenderCache(args.cache, args.cache_size * 1024 * 1024)
+
+    io_pool = IOPool(args.io_threads)
+    # the fingerprinted names have to be known before any page links to them
+    assets = AssetMap.build(static_dir) if args.fingerprint else None
+    inline_css = InlineCss(static_dir, args.inline_css) if args.inline_css is not None else None
+    images = ImageSizes.build(static_dir) if args.image_hints else None
+    data_uris = None
+    if args.inline_assets is not None:
+        # what pages skipped by an incremental build inlined and linked is remembered
+        data_uris = DataUris.build(static_dir, args.inline_assets, manifest.inline_assets if manifest is not None else None)
+    references = None
+    if args.prune:
+        # pages an incremental build skips keep the references they were last rendered with
+        references = ReferenceIndex(public_dir, args.basepath, manifest.references if manifest is not None else None)
+
+    options = RenderOptions(assets, args.minify, inline_css, images, data_uris, references)
+
+    # pages go first so the static sync knows which files in docs/ are not stale
+    outputs = generate_pages_recursive(content_dir, template_path, public_dir, args.basepath, manifest, jobs, cache, io_pool, options)
+    reset_public(manifest, keep=outputs, compare=args.static_compare, link=args.static_link, root_dir=root_dir, io_pool=io_pool, options=options,
+                 compressed=args.compress is not None)
+    compress_public(args.compress, public_dir, manifest)
+
+    if manifest is not None:
+        manifest.inline_assets = data_uris.uses if data_uris is not None else {}
+        manifest.references = references.pages if references is not None else {}
+        manifest.save()
+    if cache is not None:
+        evicted = cache.evict()
+        counters = cache.counters
+        logger.info(
+            "render cache: %d/%d pages and %d/%d blocks reused, %d evicted", counters["page hit"],
+            counters["page hit"] + counters["page miss"], counters["block hit"], counters["block hit"] + counters["block miss"], evicted,
+        )
+
+    if tracer is not None:
+        buildtrace.stop_tracing()
+        tracer.export(args.trace)
+        print(f"trace written to {args.trace}, slowest pages:")
+        for path, milliseconds in tracer.slowest("page", 20):
+            print(f"{milliseconds:10.2f} ms  {os.path.relpath(path, root_dir)}")
+
+    if args.watch:
+        def rebuild(changed: set[str]) -> None:
+            nonlocal outputs, options, assets, images, data_uris
+            static_changed = any(is_inside(path, static_dir) for path in changed)
+            # edited markdown only renders its own pages, a template or a directory takes a full pass
+            markdown = changed_markdown({path for path in changed if not is_inside(path, static_dir)}, content_dir, manifest)
+            full_pass = markdown is None
+            if static_changed and assets is not None:
+                # a changed static file gets a new name, every page linking to it changes too
+                previous_digest = assets.digest
+                assets = AssetMap.build(static_dir)
+                full_pass = full_pass or assets.digest != previous_digest
+            if static_changed and images is not None:
+                # only the images that changed have their header read again
+                previous_digest = images.digest
+                images = ImageSizes.build(static_dir, images)
+                full_pass = full_pass or images.digest != previous_digest
+            if static_changed and data_uris is not None:
+                rebuilt = DataUris.build(static_dir, args.inline_assets, data_uris.uses)
+                if rebuilt.digest != data_uris.digest:
+                    data_uris = rebuilt
+                    full_pass = True
+                else:
+                    # compiled templates hold on to the current one, it only learns what changed stylesheets inline
+                    data_uris.merge(rebuilt.uses)
+            # pages holding an inlined stylesheet change with it, the manifest knows which
+            full_pass = full_pass or (static_changed and inline_css is not None)
+            pages_changed = full_pass or bool(markdown)
+            # rebuilt static digests make new options, and with them newly compiled templates
+            if options.assets is not assets or options.images is not images or options.data_uris is not data_uris:
+                options = RenderOptions(assets, args.minify, inline_css, images, data_uris, references)
+            if pages_changed:
+                previous_outputs = outputs
+                if full_pass:
+                    # the manifest skips every page whose markdown and template are unchanged
+                    outputs = generate_pages_recursive(content_dir, template_path, public_dir, args.basepath, manifest, jobs, cache, io_pool, options)
+                else:
+                    outputs = generate_changed_pages(markdown, content_dir, template_path, public_dir, args.basepath, outputs, manifest, jobs, cache, io_pool, options)
+                # a page may link a static file no other page did, or stop linking one
+                static_changed = static_changed or outputs != previous_outputs or references is not None
+            if static_changed:
+                reset_public(manifest, keep=outputs, compare=args.static_compare, link=args.static_link, root_dir=root_dir, io_pool=io_pool, options=options,
+                             compressed=args.compress is not None)
+            if pages_changed or static_changed:
+                compress_public(args.compress, public_dir, manifest)
+            manifest.inline_assets = data_uris.uses if data_uris is not None else {}
+            manifest.references = references.pages if references is not None else {}
+            manifest.save()
+            cache.evict()
+            logger.info("reused %d of %d blocks", cache.counters["block hit"], cache.counters["block hit"] + cache.counters["block miss"])
+            cache.counters.clear()
+
+        # the first rebuild reports its own reuse, not the full build's
+        cache.counters.clear()
+        logger.info("watching %s for changes", root_dir)
+        watch(create_watcher([content_dir, static_dir], [template_path], poll=args.poll), rebuild)
+
+    io_pool.close()
+
+
+def compress_public(level: int, public_dir: str, manifest: BuildManifest = None) -> None:
+    if level is None:
+        # the static sync deleted the siblings, their records must not outlive them
+        if manifest is not None:
+            manifest.compressed = {}
+        return
+    # compression is cpu bound and releases the GIL, every core can take a share
+    compress_tree(public_dir, level, os.cpu_count(), manifest.compressed if manifest is not None else None)
+
+
+def is_inside(path: str, directory: str) -> bool:
+    return path == directory or path.startswith(directory + os.sep)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import logging
+import os
+
+
+logger = logging.getLogger(__name__)
+
+
+MANIFEST_VERSION = 1
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        # read in chunks so large static files never sit in memory whole
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest():
+    """Records the input hashes of the last build and the outputs they produced.
+
+    pages maps a markdown path (relative to the content dir) to the hash of the
+    markdown, the hash of the template it was rendered with and the generated file
+    (relative to the public dir). static maps a static file's relative path to its hash.
+    compressed maps a file in the public dir to the signature it was compressed with.
+    inline_assets maps the url of a small static file to whether pages only inlined it.
+    references maps a generated page to the site paths it links to.
+    """
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.basepath: str = None
+        self.pages: dict[str, dict[str, str]] = {}
+        self.static: dict[str, str] = {}
+        self.compressed: dict[str, str] = {}
+        self.inline_assets: dict[str, str] = {}
+        self.references: dict[str, list[str]] = {}
+
+    @classmethod
+    def load(cls, path: str) -> 'BuildManifest':
+        manifest = cls(path)
+        if not os.path.exists(path):
+            return manifest
+
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            logger.warning("%s is unreadable, doing a full build", path)
+            return manifest
+
+        # a manifest from another generator version may not mean the same thing
+        if data.get("version") != MANIFEST_VERSION:
+            return manifest
+
+        manifest.basepath = data.get("basepath")
+        manifest.pages = data.get("pages", {})
+        manifest.static = data.get("static", {})
+        manifest.compressed = data.get("compressed", {})
+        manifest.inline_assets = data.get("inline_assets", {})
+        manifest.references = data.get("references", {})
+        return manifest
+
+    def save(self) -> None:
+        data = {
+            "version": MANIFEST_VERSION,
+            "basepath": self.basepath,
+            "pages": self.pages,
+            "static": self.static,
+            "compressed": self.compressed,
+            "inline_assets": self.inline_assets,
+            "references": self.references,
+        }
+        # write next to the target and swap, an interrupted build must not leave half a manifest
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(data, file, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def set_basepath(self, basepath: str) -> None:
+        # every link in every page depends on the basepath
+        if self.basepath != basepath:
+            self.pages = {}
+        self.basepath = basepath
+
+    def page_is_current(self, source: str, source_hash: str, template_hash: str, output: str) -> bool:
+        record = self.pages.get(source)
+        if record is None:
+            return False
+        return record["hash"] == source_hash and record["template"] == template_hash and record["output"] == output
+
+    def record_page(self, source: str, source_hash: str, template_hash: str, output: str) -> None:
+        self.pages[source] = {"hash": source_hash, "template": template_hash, "output": output}
+
+    def remove_page(self, source: str) -> str:
+        """Forget the page built from source, returning its output or None."""
+        record = self.pages.pop(source, None)
+        return record["output"] if record is not None else None
+
+    def prune_pages(self, sources: set[str]) -> list[str]:
+        """Forget the pages whose source is not in sources, returning their outputs."""
+        removed = [source for source in self.pages if source not in sources]
+        return [self.pages.pop(source)["output"] for source in removed]
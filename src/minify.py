@@ -0,0 +1,138 @@
+import io
+import re
+from typing import TextIO
+
+
+# whitespace next to these never renders, inline tags keep one space
+BLOCK_TAGS = frozenset((
+    "!doctype", "html", "head", "body", "title", "meta", "link", "script", "style", "base", "noscript",
+    "header", "footer", "main", "nav", "section", "article", "aside", "div", "p", "blockquote", "pre", "hr", "br",
+    "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li", "dl", "dt", "dd", "figure", "figcaption",
+    "table", "thead", "tbody", "tfoot", "tr", "th", "td", "form", "fieldset",
+))
+# whitespace inside these is content
+PRESERVE_TAGS = frozenset(("pre", "code", "textarea", "script", "style"))
+
+# a tag needs a letter right after the "<", so text like "< Back Home" stays text
+TOKEN_PATTERN = re.compile(r"<!--.*?-->|<([!/]?)([a-zA-Z][a-zA-Z0-9-]*)(?:[^>\"']|\"[^\"]*\"|'[^']*')*>", re.DOTALL)
+WHITESPACE_PATTERN = re.compile(r"[ \t\n\r\f]+")
+# a value without whitespace, quotes, "=", "<", ">" or "`" is valid unquoted, unless a "/>" would join it
+QUOTED_ATTRIBUTE_PATTERN = re.compile(r"(\s[^\s\"'>/=]+)=\"([^\s\"'=<>`]+)\"(?!/)")
+
+
+KNOWN_TAGS_LIMIT = 4096
+# what each tag the serializers keep writing means to the minifier, "<p>" and "</b>" repeat all over a page
+known_tags: dict[str, 'TagInfo'] = {}
+
+
+class TagInfo():
+    def __init__(self, token: str, unquoted: str, block: bool, preserve: int) -> None:
+        self.token: str = token
+        self.unquoted: str = unquoted
+        self.block: bool = block
+        # +1 opens a tag whose content is kept as is, -1 closes one
+        self.preserve: int = preserve
+
+    def __repr__(self) -> str:
+        return f"TagInfo({self.token}, {self.block}, {self.preserve})"
+
+
+def tag_info(match: re.Match) -> TagInfo:
+    token = match.group(0)
+    info = known_tags.get(token)
+    if info is not None:
+        return info
+    prefix = match.group(1)
+    name = match.group(2).lower()
+    unquoted = QUOTED_ATTRIBUTE_PATTERN.sub(r"\1=\2", token) if '="' in token else token
+    preserve = 0
+    if name in PRESERVE_TAGS:
+        preserve = -1 if prefix == "/" else 0 if token.endswith("/>") else 1
+    info = TagInfo(token, unquoted, prefix == "!" or name in BLOCK_TAGS, preserve)
+    if len(known_tags) < KNOWN_TAGS_LIMIT:
+        known_tags[token] = info
+    return info
+
+
+class Minifier():
+    """Wraps a writer, minifying the html written through it fragment by fragment.
+
+    Comments are dropped, whitespace next to block tags is removed and other runs
+    of whitespace become one space, attribute values that do not need their quotes
+    lose them. Nothing inside pre, code, textarea, script or style changes. The
+    serializers write every tag in one fragment, so tags are never split across
+    writes. Whitespace at the very end of the document is dropped.
+    """
+    def __init__(self, writer: TextIO) -> None:
+        self.writer: TextIO = writer
+        self.preserve_depth: int = 0
+        # a space owed to the output, unless a block tag comes next
+        self.pending_space: bool = False
+        self.after_block: bool = True
+
+    def write(self, html: str) -> None:
+        # the two common fragments, a whole known tag and plain text, are handled inline
+        info = known_tags.get(html)
+        if info is not None:
+            if self.pending_space and not info.block:
+                self.writer.write(" ")
+            self.pending_space = False
+            self.after_block = info.block
+            self.writer.write(info.token if self.preserve_depth else info.unquoted)
+            if info.preserve:
+                self.preserve_depth = max(0, self.preserve_depth + info.preserve)
+            return
+        if "<" not in html:
+            if self.preserve_depth:
+                self.writer.write(html)
+            else:
+                self.write_text(html)
+            return
+        position = 0
+        for match in TOKEN_PATTERN.finditer(html):
+            if match.start() > position:
+                self.write_text(html[position:match.start()])
+            if match.group(2) is None:
+                # conditional comments are markup for old browsers, not comments
+                if self.preserve_depth or match.group(0).startswith("<!--[if"):
+                    self.writer.write(match.group(0))
+            else:
+                self.write_tag(tag_info(match))
+            position = match.end()
+        if position < len(html):
+            self.write_text(html[position:])
+
+    def write_tag(self, info: TagInfo) -> None:
+        if self.pending_space and not info.block:
+            self.writer.write(" ")
+        self.pending_space = False
+        self.after_block = info.block
+        # markdown text is not escaped, a "tag" inside code may just be code
+        self.writer.write(info.token if self.preserve_depth else info.unquoted)
+        if info.preserve:
+            self.preserve_depth = max(0, self.preserve_depth + info.preserve)
+
+    def write_text(self, text: str) -> None:
+        if not text:
+            return
+        if self.preserve_depth:
+            self.writer.write(text)
+            return
+
+        if "  " in text or "\n" in text or "\t" in text or "\r" in text or "\f" in text:
+            text = WHITESPACE_PATTERN.sub(" ", text)
+        core = text.strip(" ")
+        if not core:
+            self.pending_space = self.pending_space or not self.after_block
+            return
+        if (self.pending_space or text[0] == " ") and not self.after_block:
+            self.writer.write(" ")
+        self.writer.write(core)
+        self.after_block = False
+        self.pending_space = text[-1] == " "
+
+
+def minify_html(html: str) -> str:
+    buffer = io.StringIO()
+    Minifier(buffer).write(html)
+    return buffer.getvalue()
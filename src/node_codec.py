@@ -0,0 +1,340 @@
+"""A compact binary encoding of HTMLNode trees.
+
+Layout, every integer is an unsigned LEB128 varint:
+
+    magic       b"SWN" and a version byte
+    tag table   count, then each tag as byte length + utf-8
+    string pool count, then each string as byte length + utf-8
+    nodes       the tree in preorder
+
+A node starts with (tag << 2 | kind), tag being 0 for no tag or its table index
+plus one. String references are likewise 0 for None or the pool index plus one,
+so every repeated tag, prop name, url and text run is stored once.
+
+    leaf    value ref, prop count, (name ref, value ref) per prop
+    parent  prop count, props, child count, then the children
+    raw     value ref
+    span    source ref, span count, then per span its type, start and length,
+            links and images followed by url start and url length
+"""
+import io
+import sys
+from typing import Callable, TextIO
+
+from htmlnode import HTMLNode, LeafNode, ParentNode, RawNode, SharedLeafNode, SpanNode, URL_PROPS
+from textnode import TextSpan, TextType
+
+
+MAGIC = b"SWN\x01"
+
+LEAF = 0
+PARENT = 1
+RAW = 2
+SPAN = 3
+
+SPAN_TYPES = list(TextType)
+SPAN_TYPE_CODES = {text_type: code for code, text_type in enumerate(SPAN_TYPES)}
+
+
+def write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_node(node: HTMLNode) -> bytes:
+    tags: dict[str, int] = {}
+    strings: dict[str, int] = {}
+    body = bytearray()
+
+    def tag_ref(tag: str) -> int:
+        if tag is None:
+            return 0
+        ref = tags.get(tag)
+        if ref is None:
+            ref = tags[tag] = len(tags) + 1
+        return ref
+
+    def string_ref(value: str) -> int:
+        if value is None:
+            return 0
+        ref = strings.get(value)
+        if ref is None:
+            ref = strings[value] = len(strings) + 1
+        return ref
+
+    def write_props(props: dict[str, str]) -> None:
+        if not props:
+            body.append(0)
+            return
+        write_varint(body, len(props))
+        for name, value in props.items():
+            write_varint(body, string_ref(name))
+            write_varint(body, string_ref(value))
+
+    # iterative like write_html, deep trees must not hit the recursion limit
+    stack: list[HTMLNode] = [node]
+    while stack:
+        item = stack.pop()
+        item_class = item.__class__
+        if item_class is LeafNode or item_class is SharedLeafNode:
+            write_varint(body, tag_ref(item.tag) << 2 | LEAF)
+            write_varint(body, string_ref(item.value))
+            write_props(item.props)
+        elif item_class is ParentNode:
+            write_varint(body, tag_ref(item.tag) << 2 | PARENT)
+            write_props(item.props)
+            children = item.children or []
+            write_varint(body, len(children))
+            stack.extend(reversed(children))
+        elif item_class is RawNode:
+            write_varint(body, RAW)
+            write_varint(body, string_ref(item.value))
+        elif item_class is SpanNode:
+            write_varint(body, SPAN)
+            write_varint(body, string_ref(item.value))
+            write_varint(body, len(item.spans))
+            for span in item.spans:
+                body.append(SPAN_TYPE_CODES[span.text_type])
+                write_varint(body, span.start)
+                write_varint(body, span.end - span.start)
+                if span.url_start is not None:
+                    write_varint(body, span.url_start)
+                    write_varint(body, span.url_end - span.url_start)
+        else:
+            raise ValueError(f"Cannot encode {item_class.__name__}")
+
+    out = bytearray(MAGIC)
+    for table in (tags, strings):
+        write_varint(out, len(table))
+        # dicts keep insertion order, which is the order the refs were handed out
+        for value in table:
+            data = value.encode()
+            write_varint(out, len(data))
+            out += data
+    out += body
+    return bytes(out)
+
+
+class Decoder():
+    def __init__(self, data: bytes) -> None:
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not an encoded node tree")
+        self.data: bytes = data
+        self.position: int = len(MAGIC)
+        # interned like HTMLNode.__init__ does, read_node skips it
+        self.tags: list[str] = [None] + [sys.intern(tag) for tag in self.read_table()]
+        self.strings: list[str] = [None] + self.read_table()
+
+    def read_varint(self) -> int:
+        data = self.data
+        byte = data[self.position]
+        self.position += 1
+        # almost every value is a single byte
+        if byte < 0x80:
+            return byte
+        value = byte & 0x7F
+        shift = 7
+        while True:
+            byte = data[self.position]
+            self.position += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def read_table(self) -> list[str]:
+        table: list[str] = []
+        for _ in range(self.read_varint()):
+            length = self.read_varint()
+            table.append(self.data[self.position:self.position + length].decode())
+            self.position += length
+        return table
+
+    def read_props(self) -> dict[str, str]:
+        count = self.read_varint()
+        if count == 0:
+            return None
+        strings = self.strings
+        return {strings[self.read_varint()]: strings[self.read_varint()] for _ in range(count)}
+
+    def read_spans(self) -> list[TextSpan]:
+        spans: list[TextSpan] = []
+        for _ in range(self.read_varint()):
+            text_type = SPAN_TYPES[self.data[self.position]]
+            self.position += 1
+            start = self.read_varint()
+            end = start + self.read_varint()
+            if text_type == TextType.LINK or text_type == TextType.IMAGE:
+                url_start = self.read_varint()
+                spans.append(TextSpan(start, end, text_type, url_start, url_start + self.read_varint()))
+            else:
+                spans.append(TextSpan(start, end, text_type))
+        return spans
+
+    def read_node(self) -> HTMLNode:
+        """Rebuild the node objects, for callers that need the tree itself.
+
+        The slow path, rendering goes through write_encoded_html without a node
+        per element. Varints are read inline off a local position and nodes are
+        filled in without running __init__, a call per byte or node is most of
+        the cost here.
+        """
+        data = self.data
+        pos = self.position
+        tags = self.tags
+        strings = self.strings
+        new = object.__new__
+        root: list[HTMLNode] = []
+        # (children list to fill, children still expected)
+        stack: list[tuple[list, int]] = [(root, 1)]
+        while stack:
+            children, remaining = stack.pop()
+            if remaining == 0:
+                continue
+            stack.append((children, remaining - 1))
+            head = data[pos]
+            pos += 1
+            if head >= 0x80:
+                head, pos = long_varint(data, head, pos)
+            kind = head & 3
+            if kind == LEAF or kind == PARENT:
+                node = new(LeafNode if kind == LEAF else ParentNode)
+                node.tag = tags[head >> 2]
+                node.children = None
+                if kind == LEAF:
+                    ref = data[pos]
+                    pos += 1
+                    if ref >= 0x80:
+                        ref, pos = long_varint(data, ref, pos)
+                    node.value = strings[ref]
+                else:
+                    node.value = None
+                count = data[pos]
+                pos += 1
+                if count >= 0x80:
+                    count, pos = long_varint(data, count, pos)
+                props = None
+                if count:
+                    props = {}
+                    for _ in range(count):
+                        name = data[pos]
+                        pos += 1
+                        if name >= 0x80:
+                            name, pos = long_varint(data, name, pos)
+                        value = data[pos]
+                        pos += 1
+                        if value >= 0x80:
+                            value, pos = long_varint(data, value, pos)
+                        props[strings[name]] = strings[value]
+                node.props = props
+                children.append(node)
+                if kind == PARENT:
+                    count = data[pos]
+                    pos += 1
+                    if count >= 0x80:
+                        count, pos = long_varint(data, count, pos)
+                    if count:
+                        node.children = []
+                        stack.append((node.children, count))
+            else:
+                ref = data[pos]
+                pos += 1
+                if ref >= 0x80:
+                    ref, pos = long_varint(data, ref, pos)
+                if kind == RAW:
+                    children.append(RawNode(strings[ref]))
+                else:
+                    self.position = pos
+                    children.append(SpanNode(strings[ref], self.read_spans()))
+                    pos = self.position
+        self.position = pos
+        return root[0]
+
+
+def long_varint(data: bytes, byte: int, position: int) -> tuple[int, int]:
+    """The rest of a varint whose first byte, already read, had its high bit set, and the position after it."""
+    value = byte & 0x7F
+    shift = 7
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def decode_node(data: bytes) -> HTMLNode:
+    return Decoder(data).read_node()
+
+
+def write_encoded_html(data: bytes, writer: TextIO, rewrite_url: Callable[[str], str] = None) -> None:
+    """Serialize an encoded tree into writer exactly like HTMLNode.write_html, without rebuilding the tree."""
+    decoder = Decoder(data)
+    read_varint = decoder.read_varint
+    tags = decoder.tags
+    strings = decoder.strings
+    write = writer.write
+
+    def props_html() -> str:
+        count = read_varint()
+        if count == 0:
+            return ""
+        props = []
+        for _ in range(count):
+            name = strings[read_varint()]
+            value = strings[read_varint()]
+            if rewrite_url is not None and name in URL_PROPS:
+                value = rewrite_url(value)
+            props.append(f' {name}="{value}"')
+        return "".join(props)
+
+    # closing tags and how many children are still to come before each is written
+    stack: list[tuple[str, int]] = [(None, 1)]
+    while stack:
+        closing, remaining = stack.pop()
+        if remaining == 0:
+            if closing is not None:
+                write(closing)
+            continue
+        stack.append((closing, remaining - 1))
+
+        head = read_varint()
+        kind = head & 3
+        tag = tags[head >> 2]
+        if kind == LEAF:
+            value = strings[read_varint()]
+            props = props_html()
+            if value is None:
+                raise ValueError("Leaf node has no value")
+            if not tag:
+                write(value)
+            elif tag == "img":
+                write(f"<{tag}{props} />")
+            else:
+                write(f"<{tag}{props}>")
+                write(value)
+                write(f"</{tag}>")
+        elif kind == PARENT:
+            # parent props are never written, like ParentNode.open_html
+            props_html()
+            count = read_varint()
+            if not tag:
+                raise ValueError("Parent node has no tag")
+            if count == 0:
+                raise ValueError("Parent node has no children")
+            write(f"<{tag}>")
+            stack.append((f"</{tag}>", count))
+        elif kind == RAW:
+            write(strings[read_varint()])
+        else:
+            # spans are offsets already, wrapping them costs one object per block
+            SpanNode(strings[read_varint()], decoder.read_spans()).open_html(write, rewrite_url)
+
+
+def encoded_to_html(data: bytes) -> str:
+    buffer = io.StringIO()
+    write_encoded_html(data, buffer)
+    return buffer.getvalue()
@@ -1,20 +1,34 @@
 import re
 
-from textnode import TextType, TextNode
-from htmlnode import HTMLNode, ParentNode, LeafNode
-from text_utils import BlockType, markdown_to_blocks, block_to_block_type
+from typing import Callable, Iterable, TypeVar
+
+from textnode import TextType, TextNode, TextSpan
+from htmlnode import HTMLNode, ParentNode, LeafNode, SpanNode, SHARED_VALUE_LENGTH
+from text_utils import BlockType, Block, BlockScanner
+
+
+T = TypeVar("T")
+
+# builds the inline children of a block from its text
+InlineBuilder = Callable[[str], list[HTMLNode]]
+
+
+def leaf_node(tag: str, value: str) -> LeafNode:
+    if len(value) <= SHARED_VALUE_LENGTH:
+        return LeafNode.shared(tag, value)
+    return LeafNode(tag=tag, value=value)
 
 
 def text_node_to_html_node(text_node: TextNode) -> LeafNode:
     match text_node.text_type:
         case TextType.TEXT:
-            return LeafNode(tag=None, value=text_node.text)
+            return leaf_node(None, text_node.text)
         case TextType.BOLD:
-            return LeafNode(tag="b", value=text_node.text)
+            return leaf_node("b", text_node.text)
         case TextType.ITALIC:
-            return LeafNode(tag="i", value=text_node.text)
+            return leaf_node("i", text_node.text)
         case TextType.CODE:
-            return LeafNode(tag="code", value=text_node.text)
+            return leaf_node("code", text_node.text)
         case TextType.LINK:
             return LeafNode(tag="a", value=text_node.text, props={"href": text_node.url})
         case TextType.IMAGE:
@@ -46,16 +60,30 @@ def split_nodes_delimiter(old_nodes: list[TextNode], delimiter: str, text_type:
     return new_nodes
 
 
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+# longer delimiters first, so ** is never read as two *
+INLINE_DELIMITERS = {
+    "**" : TextType.BOLD,
+    "__" : TextType.BOLD,
+    "*" : TextType.ITALIC,
+    "_" : TextType.ITALIC,
+    "`" : TextType.CODE,
+}
+INLINE_START = re.compile(r"[!\[*_`]")
+
+
 def extract_markdown_images(text: str) -> list[tuple[str, str]]:
     #return re.findall(r"!\[(.*?)\]\((.*?)\)", text)
     # using regex provided by boot.dev to match ![alt_text](url)
-    return re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return IMAGE_PATTERN.findall(text)
 
 
 def extract_markdown_links(text: str) -> list[tuple[str, str]]:
     #return re.findall(r"(?<!!)\[(.*?)\]\((.*?)\)", text)
     # using regex provided by boot.dev to match [anchor_text](url)
-    return re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return LINK_PATTERN.findall(text)
 
 
 def split_nodes_image(old_nodes: list[TextNode]) -> list[TextNode]:
@@ -72,88 +100,144 @@ def split_nodes_imagelink(old_nodes: list[TextNode], text_type: TextType) -> lis
     if text_type != TextType.IMAGE and text_type != TextType.LINK:
         raise ValueError("split_nodes_imagelink only works with images and links")
     
-    # decide the right extractor to use
-    extractor = extract_markdown_images if text_type == TextType.IMAGE else extract_markdown_links
-    
-    node_links = list(map(lambda node: extractor(node.text), old_nodes))
-    
-    if not node_links:
-        return old_nodes
-    
-    new_nodes: list[TextNode] = []
-    
     #![alt_text](url) for images [anchor_text](url) for links
-    def delimiter(text: str, url: str) -> str:
-        return ('!' if text_type == TextType.IMAGE else "") + f"[{text}]({url})"
+    pattern = IMAGE_PATTERN if text_type == TextType.IMAGE else LINK_PATTERN
     
-    for links_list, node in zip(node_links, old_nodes):
-        if not links_list:
-            new_nodes.append(node)
-            continue
-            
-        split_text = [node.text]
-        
-        for text, url in links_list:
-            split_text = split_text[-1].split(delimiter(text, url), 1)
-            
-            if split_text[0]:
-                new_nodes.append(TextNode(split_text[0], node.text_type))
-            new_nodes.append(TextNode(text, text_type, url))
+    new_nodes: list[TextNode] = []
+    for node in old_nodes:
+        # cut around the match positions instead of re-splitting the tail once per link
+        position = 0
+        for match in pattern.finditer(node.text):
+            if match.start() > position:
+                new_nodes.append(TextNode(node.text[position:match.start()], node.text_type))
+            new_nodes.append(TextNode(match.group(1), text_type, match.group(2)))
+            position = match.end()
             
-        # append the last piece of text if it is not empty  
-        if split_text[-1]:
-            new_nodes.append(TextNode(split_text[-1], node.text_type))
+        if position == 0:
+            new_nodes.append(node)
+        # append the last piece of text if it is not empty
+        elif position < len(node.text):
+            new_nodes.append(TextNode(node.text[position:], node.text_type))
     
     return new_nodes
 
 
 def text_to_textnodes(text: str) -> list[TextNode]:
-    node_delimiters = {
-        "**" : TextType.BOLD,
-        "__" : TextType.BOLD,
-        "*" : TextType.ITALIC,
-        "_" : TextType.ITALIC,
-        "`" : TextType.CODE,
-    }
-    nodes = [TextNode(text, TextType.TEXT)]
-    
-    nodes = split_nodes_image(split_nodes_link(nodes))
-    
-    for delimiter, type in node_delimiters.items():
-        nodes = split_nodes_delimiter(nodes, delimiter, type)
+    """Split inline markdown into text nodes in a single left to right pass."""
+    # built straight from the offsets, no span is allocated on the way
+    def make(start: int, end: int, text_type: TextType, url_start: int = None, url_end: int = None) -> TextNode:
+        return TextNode(text[start:end], text_type, None if url_start is None else text[url_start:url_end])
+    return scan_inline(text, make)
+
+
+def text_to_spans(text: str) -> list[TextSpan]:
+    """Split inline markdown into spans over text, without copying any of it."""
+    return scan_inline(text, TextSpan)
+
+
+def scan_inline(text: str, make: Callable[..., T]) -> list[T]:
+    """The inline pass behind text_to_textnodes and text_to_spans.
+    
+    make is called with the start and end offsets of each span's text, its
+    TextType and, for links and images, the offsets of the url.
+    """
+    spans: list[T] = []
+    start = 0 # start of the plain text not emitted yet
+    position = 0
+    
+    while True:
+        match = INLINE_START.search(text, position)
+        if match is None:
+            break
+        index = match.start()
+        char = text[index]
+        
+        if char == "!" or char == "[":
+            link = (IMAGE_PATTERN if char == "!" else LINK_PATTERN).match(text, index)
+            if link is None:
+                position = index + 1
+                continue
+            if index > start:
+                spans.append(make(start, index, TextType.TEXT))
+            spans.append(make(link.start(1), link.end(1), TextType.IMAGE if char == "!" else TextType.LINK, link.start(2), link.end(2)))
+            start = position = link.end()
+            continue
+        
+        delimiter = char * 2 if char != "`" and text.startswith(char * 2, index) else char
+        close = text.find(delimiter, index + len(delimiter))
+        if close == -1:
+            # the offset points back into the source, the block scanner knows the line
+            raise Exception(f"closing delimiter missing for {delimiter} at offset {index}")
+        if index > start:
+            spans.append(make(start, index, TextType.TEXT))
+        if close > index + len(delimiter):
+            spans.append(make(index + len(delimiter), close, INLINE_DELIMITERS[delimiter]))
+        start = position = close + len(delimiter)
         
-    return nodes
+    if len(text) > start:
+        spans.append(make(start, len(text), TextType.TEXT))
+    return spans
 
 
 def markdown_to_html_node(markdown: str) -> ParentNode:
-    blocks_tuple = list(map(lambda block: (block_to_block_type(block), block), markdown_to_blocks(markdown)))
+    node, _ = parse_markdown(markdown)
+    return node
+
+
+def parse_markdown(markdown: str, inline: InlineBuilder = None) -> tuple[ParentNode, str]:
+    """Build the page's html node and find its title in one pass over the lines.
     
+    The title is None when the markdown has no "# " heading. inline builds the
+    children of each block from its text, text_to_span_children keeps them as spans.
+    """
+    blocks, title = scan_markdown(markdown)
+    return blocks_to_html_node(blocks, inline), title
+
+
+def scan_markdown(markdown: str) -> tuple[list[Block], str]:
+    scanner = BlockScanner(markdown.split('\n'))
+    blocks = list(scanner)
+    return blocks, scanner.title
+
+
+def blocks_to_html_node(blocks: Iterable[Block], inline: InlineBuilder = None) -> ParentNode:
     children: list[ParentNode] = []
-    for item in blocks_tuple:
-        children.append(block_to_html_node(*item))
+    for block in blocks:
+        children.append(block_lines_to_html_node(block.block_type, block.lines, inline))
     
-    return ParentNode("div", children) 
+    return ParentNode("div", children)
 
 
 def block_to_html_node(block_type, block):
+    return block_lines_to_html_node(block_type, block.split('\n'))
+
+
+def block_lines_to_html_node(block_type: BlockType, lines: list[str], inline: InlineBuilder = None) -> ParentNode:
+    inline = inline or text_to_children
     if block_type in [BlockType.ORDERED_LIST, BlockType.UNORDERED_LIST]:
-        return list_to_htmlnode(block_type, block)
+        return list_lines_to_htmlnode(block_type, lines, inline)
     if block_type == BlockType.HEADING:
-        return header_to_htmlnode(block)
+        return header_to_htmlnode('\n'.join(lines), inline)
     if block_type == BlockType.CODE:
-        return code_to_htmlnode(block)
+        return code_to_htmlnode('\n'.join(lines), inline)
     if block_type == BlockType.QUOTE:
-        return quotes_to_htmlnode(block)
+        return quotes_lines_to_htmlnode(lines, inline)
     if block_type == BlockType.PARAGRAPH:
-        return paragraph_to_htmlnode(block)
+        return paragraph_lines_to_htmlnode(lines, inline)
     raise ValueError("Invalid block type")
   
     
 def text_to_children(text: str) -> list[LeafNode]:
     return list(map(text_node_to_html_node, text_to_textnodes(text)))
 
+
+def text_to_span_children(text: str) -> list[SpanNode]:
+    spans = text_to_spans(text)
+    # no spans means no children, like text_to_children
+    return [SpanNode(text, spans)] if spans else []
+
     
-def header_to_htmlnode(block: str) -> ParentNode:
+def header_to_htmlnode(block: str, inline: InlineBuilder = text_to_children) -> ParentNode:
     # header block should start with 1 to 6 # followed by space and then header text
     if not block.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):
         raise ValueError("Incorrect header format")
@@ -162,23 +246,26 @@ def header_to_htmlnode(block: str) -> ParentNode:
     hash, text = block.split(maxsplit=1)
     header = f"h{len(hash)}"
     
-    return ParentNode(header, text_to_children(text))
+    return ParentNode(header, inline(text))
 
 
-def code_to_htmlnode(block: str) -> ParentNode:
+def code_to_htmlnode(block: str, inline: InlineBuilder = text_to_children) -> ParentNode:
     # code block should start and end with 3 backticks
     if not block.startswith("```") or not block.endswith("```") or len(block) < 6:
         raise ValueError("Incorrect code block format")
     
     # remove the starting and ending ```
     text = block[4:-3] # list slicing should return an empty string if block is just 6 backticks
-    return ParentNode("pre", [ParentNode("code", text_to_children(text))])
+    return ParentNode("pre", [ParentNode("code", inline(text))])
     
     
 def list_to_htmlnode(type: BlockType, block: str) -> ParentNode:
-    items = block.split('\n')
+    return list_lines_to_htmlnode(type, block.split('\n'))
+
+
+def list_lines_to_htmlnode(type: BlockType, items: list[str], inline: InlineBuilder = text_to_children) -> ParentNode:
     children: list[LeafNode] = []
-    start = block[:2]
+    start = items[0][:2]
     
     for index, item in enumerate(items, start=1):
         if type == BlockType.ORDERED_LIST:
@@ -189,13 +276,16 @@ def list_to_htmlnode(type: BlockType, block: str) -> ParentNode:
             raise ValueError(f"List item not starting with {start}")
         
         text = item.lstrip(start)
-        children.append(ParentNode("li", text_to_children(text)))
+        children.append(ParentNode("li", inline(text)))
         
     return ParentNode("ol" if type == BlockType.ORDERED_LIST else "ul", children)
     
     
 def quotes_to_htmlnode(block: str) -> ParentNode:
-    items = block.split('\n')
+    return quotes_lines_to_htmlnode(block.split('\n'))
+
+
+def quotes_lines_to_htmlnode(items: list[str], inline: InlineBuilder = text_to_children) -> ParentNode:
     lines: list[str] = []
     for item in items:
         # every line in a quote block starts with a >
@@ -204,11 +294,14 @@ def quotes_to_htmlnode(block: str) -> ParentNode:
         lines.append(item[1:].strip()) # stripping whitespace to comply with boot.dev tests
     text = " ".join(lines)
     
-    return ParentNode("blockquote", text_to_children(text))
+    return ParentNode("blockquote", inline(text))
 
 
 def paragraph_to_htmlnode(block: str) -> ParentNode:
-    lines = block.split('\n')
+    return paragraph_lines_to_htmlnode(block.split('\n'))
+
+
+def paragraph_lines_to_htmlnode(lines: list[str], inline: InlineBuilder = text_to_children) -> ParentNode:
     text = " ".join(lines)
-    return ParentNode("p", text_to_children(text))
+    return ParentNode("p", inline(text))
 
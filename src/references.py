@@ -0,0 +1,120 @@
+import logging
+import os
+import posixpath
+import re
+from typing import TextIO
+from urllib.parse import unquote
+
+from assets import UNFINGERPRINTED_NAMES, AssetMap
+from css import CSS_IMPORT_PATTERN, CSS_URL_PATTERN
+
+
+logger = logging.getLogger(__name__)
+
+# files only ever fetched because a page or stylesheet links them, anything else may be fetched by name
+PRUNABLE_EXTENSIONS = (
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".svg", ".ico", ".bmp",
+    ".css", ".js", ".mjs", ".map", ".woff", ".woff2", ".ttf", ".otf", ".eot",
+    ".mp3", ".mp4", ".ogg", ".webm", ".wav",
+)
+
+REFERENCE_PATTERN = re.compile(r"\s(?:src|href)=\"([^\"]*)\"|url\((?:\"|'|)([^)\"']*)")
+
+
+def resolve_url(url: str, base_url: str, basepath: str = "/") -> str:
+    """The site path, without the basepath, that url written in the file at base_url points at, or None."""
+    url = url.split("#")[0].split("?")[0]
+    if not url or url.startswith(("data:", "mailto:", "tel:", "javascript:", "//")) or "://" in url:
+        return None
+    if url.startswith(basepath):
+        url = "/" + url[len(basepath):]
+    elif not url.startswith("/"):
+        url = posixpath.join(posixpath.dirname(base_url), url)
+    return posixpath.normpath(unquote(url))
+
+
+class ReferenceIndex():
+    """Every src, href and url() the rendered pages emit, by page.
+
+    pages maps a page's path relative to public_dir to the site paths it
+    references, after relative urls are resolved and the basepath stripped.
+    While a page renders its urls collect in pending, record files them under
+    the page. Files in static/ no page or linked stylesheet reaches are left
+    out of docs/.
+    """
+    def __init__(self, public_dir: str, basepath: str = "/", pages: dict[str, list[str]] = None) -> None:
+        self.public_dir: str = public_dir
+        self.basepath: str = basepath
+        self.pages: dict[str, list[str]] = pages if pages is not None else {}
+        self.pending: list[str] = []
+
+    def record(self, output_path: str) -> None:
+        output = os.path.relpath(output_path, start=self.public_dir).replace(os.sep, "/")
+        page_url = "/" + output
+        urls = {resolve_url(url, page_url, self.basepath) for url in self.pending}
+        urls.discard(None)
+        self.pages[output] = sorted(urls)
+        self.pending = []
+
+    def merge(self, pages: dict[str, list[str]]) -> None:
+        self.pages.update(pages)
+
+    def retain(self, outputs: set[str]) -> None:
+        """Forget the pages not in outputs, paths relative to public_dir."""
+        outputs = {output.replace(os.sep, "/") for output in outputs}
+        self.pages = {output: urls for output, urls in self.pages.items() if output in outputs}
+
+    def unreferenced(self, static_dir: str, assets: AssetMap = None) -> list[str]:
+        """Paths relative to static_dir of the prunable files nothing reaches, sorted."""
+        # the site paths the static files are copied to, and back
+        sources: dict[str, str] = {}
+        for dir_path, _, file_names in os.walk(static_dir):
+            for name in file_names:
+                relative_path = os.path.relpath(os.path.join(dir_path, name), start=static_dir)
+                target = assets.rename(relative_path) if assets is not None else relative_path
+                sources["/" + target.replace(os.sep, "/")] = relative_path
+
+        reached: set[str] = set()
+        queue = [url for urls in self.pages.values() for url in urls]
+        while queue:
+            url = queue.pop()
+            relative_path = sources.get(url)
+            if relative_path is None or relative_path in reached:
+                continue
+            reached.add(relative_path)
+            if relative_path.endswith(".css"):
+                # stylesheets reference their fonts and images by source name, relative to themselves
+                stylesheet_url = "/" + relative_path.replace(os.sep, "/")
+                with open(os.path.join(static_dir, relative_path)) as file:
+                    css = file.read()
+                for match in CSS_URL_PATTERN.finditer(css):
+                    queue.append(self.static_url(resolve_url(match.group(2), stylesheet_url), assets))
+                for match in CSS_IMPORT_PATTERN.finditer(css):
+                    queue.append(self.static_url(resolve_url(match.group(2), stylesheet_url), assets))
+
+        return sorted(
+            relative_path for relative_path in sources.values()
+            if relative_path not in reached and relative_path.lower().endswith(PRUNABLE_EXTENSIONS)
+            and os.path.basename(relative_path) not in UNFINGERPRINTED_NAMES
+        )
+
+    def static_url(self, url: str, assets: AssetMap = None) -> str:
+        if url is None or assets is None:
+            return url
+        return assets.url(url)
+
+    def __repr__(self) -> str:
+        return f"ReferenceIndex({len(self.pages)} pages, {self.basepath})"
+
+
+class ReferenceRecorder():
+    """Wraps a writer, noting every src, href and url() written through it in references.pending."""
+    def __init__(self, writer: TextIO, references: ReferenceIndex) -> None:
+        self.writer: TextIO = writer
+        self.references: ReferenceIndex = references
+
+    def write(self, html: str) -> None:
+        if 'src="' in html or 'href="' in html or "url(" in html:
+            for match in REFERENCE_PATTERN.finditer(html):
+                self.references.pending.append(match.group(1) if match.group(1) is not None else match.group(2))
+        self.writer.write(html)
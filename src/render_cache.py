@@ -0,0 +1,181 @@
+import hashlib
+import sqlite3
+import time
+from collections import Counter, OrderedDict
+
+from text_utils import Block
+
+
+# bump whenever the generated html changes, entries from other versions are never read
+GENERATOR_VERSION = 1
+
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+DEFAULT_MEMORY_SIZE = 64 * 1024 * 1024
+# writes held back before they go to the file in one transaction
+FLUSH_ROWS = 512
+
+
+class RenderCache():
+    """Rendered pages and blocks, keyed by what their html depends on.
+
+    Keys hash the markdown, the template's url_key (the basepath and asset map)
+    and GENERATOR_VERSION, never a path or a timestamp, so the SQLite file at
+    path can be carried between checkouts and machines. Once its fragments add
+    up to more than max_bytes the least recently used ones are evicted. Block
+    fragments are also kept in memory, up to memory_bytes, which is all there is
+    when path is None. Stores and use times are buffered and written in one
+    transaction by flush, which evict and close call too.
+
+    Every process opens its own RenderCache. counters tracks "page hit",
+    "page miss", "block hit" and "block miss".
+    """
+    def __init__(self, path: str = None, max_bytes: int = DEFAULT_CACHE_SIZE, memory_bytes: int = DEFAULT_MEMORY_SIZE) -> None:
+        self.path: str = path
+        self.max_bytes: int = max_bytes
+        self.memory_bytes: int = memory_bytes
+        self.memory: OrderedDict[str, str] = OrderedDict()
+        self.memory_size: int = 0
+        self.counters: Counter = Counter()
+        # key to (title, html, size, used) of the rows not written yet, and key to used of the rows read
+        self.pending_rows: dict[str, tuple[str, str, int, int]] = {}
+        self.pending_used: dict[str, int] = {}
+        self.connection: sqlite3.Connection = None
+        if path is None:
+            return
+
+        # other build processes may be writing, wait for them instead of failing
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        # a lost write only costs a render next time, no need to fsync
+        self.connection.execute("PRAGMA synchronous = OFF")
+        # readers never wait for a writer, the workers of one build share the file
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        # pages have a title, blocks do not
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS fragments ("
+            "key TEXT PRIMARY KEY, title TEXT, html TEXT NOT NULL, size INTEGER NOT NULL, used INTEGER NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS fragments_used ON fragments (used)")
+
+    @staticmethod
+    def key(markdown: str, url_key: str) -> str:
+        digest = hashlib.sha256(f"{GENERATOR_VERSION}\0{url_key}\0".encode())
+        digest.update(markdown.encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def block_key(block: Block, url_key: str) -> str:
+        digest = hashlib.sha256(f"{GENERATOR_VERSION}\0{url_key}\0{block.block_type.value}\0".encode())
+        for line in block.lines:
+            digest.update(line.encode())
+            digest.update(b"\n")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> tuple[str, str]:
+        """The (title, html) of the page stored under key, or None."""
+        # whole pages are only worth keeping across builds
+        if self.connection is None:
+            return None
+        row = self.load(key)
+        self.counters["page miss" if row is None else "page hit"] += 1
+        return row
+
+    def put(self, key: str, title: str, html: str) -> None:
+        self.store(key, title, html)
+
+    def get_block(self, key: str) -> str:
+        html = self.memory.get(key)
+        if html is not None:
+            self.memory.move_to_end(key)
+        else:
+            row = self.load(key)
+            if row is not None:
+                html = row[1]
+                self.remember(key, html)
+        self.counters["block miss" if html is None else "block hit"] += 1
+        return html
+
+    def put_block(self, key: str, html: str) -> None:
+        self.remember(key, html)
+        self.store(key, None, html)
+
+    def remember(self, key: str, html: str) -> None:
+        if key in self.memory:
+            self.memory_size -= len(self.memory[key])
+        self.memory[key] = html
+        self.memory_size += len(html)
+        while self.memory_size > self.memory_bytes:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_size -= len(evicted)
+
+    def load(self, key: str) -> tuple[str, str]:
+        if self.connection is None:
+            return None
+        pending = self.pending_rows.get(key)
+        if pending is not None:
+            title, html, size, _ = pending
+            self.pending_rows[key] = (title, html, size, time.time_ns())
+            return title, html
+        row = self.connection.execute("SELECT title, html FROM fragments WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self.pending_used[key] = time.time_ns()
+        return row
+
+    def store(self, key: str, title: str, html: str) -> None:
+        if self.connection is None:
+            return
+        # max_bytes is a file size, count encoded bytes rather than characters
+        self.pending_rows[key] = (title, html, len(html.encode()) + len((title or "").encode()), time.time_ns())
+        self.pending_used.pop(key, None)
+        if len(self.pending_rows) >= FLUSH_ROWS:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered stores and use times in one transaction."""
+        if self.connection is None or (not self.pending_rows and not self.pending_used):
+            return
+        self.connection.execute("BEGIN")
+        self.connection.executemany("UPDATE fragments SET used = ? WHERE key = ?", [(used, key) for key, used in self.pending_used.items()])
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO fragments (key, title, html, size, used) VALUES (?, ?, ?, ?, ?)",
+            [(key, *row) for key, row in self.pending_rows.items()],
+        )
+        self.connection.execute("COMMIT")
+        self.pending_rows = {}
+        self.pending_used = {}
+
+    def count(self) -> int:
+        if self.connection is None:
+            return len(self.memory)
+        self.flush()
+        return self.connection.execute("SELECT COUNT(*) FROM fragments").fetchone()[0]
+
+    def size(self) -> int:
+        if self.connection is None:
+            return self.memory_size
+        self.flush()
+        return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM fragments").fetchone()[0]
+
+    def evict(self) -> int:
+        """Drop the least recently used entries until the file fits max_bytes, returning how many went."""
+        if self.connection is None:
+            return 0
+        # size() flushes, the buffered rows count too
+        excess = self.size() - self.max_bytes
+        if excess <= 0:
+            return 0
+        evicted = 0
+        rows = self.connection.execute("SELECT key, size FROM fragments ORDER BY used").fetchall()
+        self.connection.execute("BEGIN")
+        for key, size in rows:
+            if excess <= 0:
+                break
+            self.connection.execute("DELETE FROM fragments WHERE key = ?", (key,))
+            excess -= size
+            evicted += 1
+        self.connection.execute("COMMIT")
+        return evicted
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.flush()
+            self.connection.close()
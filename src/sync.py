@@ -0,0 +1,204 @@
+import logging
+import os
+import shutil
+from typing import Callable
+
+from io_pool import IOPool
+from manifest import hash_file
+from buildtrace import span
+
+
+logger = logging.getLogger(__name__)
+
+
+COMPARE_MODES = ("mtime", "hash")
+LINK_MODES = ("copy", "hardlink", "range")
+
+
+class SyncResult():
+    def __init__(self) -> None:
+        self.copied: list[str] = []
+        self.skipped: list[str] = []
+        self.deleted: list[str] = []
+
+    def __repr__(self) -> str:
+        return f"SyncResult(copied: {len(self.copied)}, skipped: {len(self.skipped)}, deleted: {len(self.deleted)})"
+
+
+def is_unchanged(src: os.DirEntry, dst_path: str, relative_path: str, compare: str, hashes: dict[str, str]) -> bool:
+    try:
+        dst_stat = os.stat(dst_path)
+    except FileNotFoundError:
+        return False
+
+    src_stat = src.stat()
+    if compare == "mtime":
+        # copies keep the source mtime, so a matching size and mtime means nothing was touched
+        return src_stat.st_size == dst_stat.st_size and src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    # the hash of what is at the destination is remembered, so only the source gets read
+    dst_hash = hashes.get(relative_path)
+    if dst_hash is None:
+        dst_hash = hash_file(dst_path)
+    if hash_file(src.path) != dst_hash:
+        return False
+    hashes[relative_path] = dst_hash
+    return True
+
+
+def copy_file_range(src_path: str, dst_path: str) -> None:
+    # the kernel moves the bytes (or shares extents on btrfs/xfs), nothing passes through python
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+    shutil.copystat(src_path, dst_path)
+
+
+def place_file(src_path: str, dst_path: str, link: str) -> None:
+    # never write through an old hardlink into the static tree
+    if os.path.lexists(dst_path):
+        os.remove(dst_path)
+
+    if link == "hardlink":
+        try:
+            os.link(src_path, dst_path)
+            return
+        except OSError:
+            pass # different filesystem, fall back to a copy
+    if link == "range" and hasattr(os, "copy_file_range"):
+        try:
+            copy_file_range(src_path, dst_path)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src_path, dst_path)
+
+
+def copy_file(src_path: str, dst_path: str, relative_path: str, link: str, compare: str, hashes: dict[str, str]) -> None:
+    with span("copy", "static", path=relative_path):
+        place_file(src_path, dst_path, link)
+    if compare == "hash":
+        hashes[relative_path] = hash_file(dst_path)
+    else:
+        hashes.pop(relative_path, None)
+
+
+def transform_file(src_path: str, dst_path: str, relative_path: str, transform: Callable[[str, str], str]) -> bool:
+    """Write transform of the text at src_path to dst_path, returning False when dst_path already holds it."""
+    with open(src_path) as file:
+        text = transform(file.read(), relative_path)
+    # the output never matches the source's size or hash, so it is compared with what is there
+    if os.path.isfile(dst_path) and not os.path.islink(dst_path):
+        with open(dst_path) as file:
+            if file.read() == text:
+                return False
+    if os.path.lexists(dst_path):
+        os.remove(dst_path)
+    with open(dst_path, "w") as file:
+        file.write(text)
+    return True
+
+
+def sync_tree(src_dir: str, dst_dir: str, compare: str = "mtime", link: str = "copy", keep: set[str] = None, hashes: dict[str, str] = None,
+              io_pool: IOPool = None, rename: Callable[[str], str] = None, siblings: tuple[str, ...] = (),
+              transforms: dict[str, Callable[[str, str], str]] = None, exclude: set[str] = None) -> SyncResult:
+    """Make dst_dir mirror src_dir, copying only new or changed files.
+
+    Files in dst_dir that are not in src_dir are deleted unless their path relative
+    to dst_dir is in keep. hashes maps relative paths to the hash of the file at the
+    destination, it is read and updated when compare is "hash". With io_pool the
+    copies run on its threads, all of them done when this returns. rename maps a
+    file's relative path in src_dir to its relative path in dst_dir. A file named
+    after a kept or copied file plus one of the siblings suffixes is kept with it.
+    transforms maps a file extension to a function rewriting the text of those
+    files on the way, it is passed the text and the file's relative path in
+    src_dir. Files whose relative path in src_dir is in exclude are not copied.
+    """
+    if compare not in COMPARE_MODES:
+        raise ValueError(f"Unknown compare mode: {compare}")
+    if link not in LINK_MODES:
+        raise ValueError(f"Unknown link mode: {link}")
+
+    keep = keep if keep is not None else set()
+    hashes = hashes if hashes is not None else {}
+    result = SyncResult()
+    # every file that belongs in dst_dir, stale is whatever else is there
+    placed: set[str] = set()
+    os.makedirs(dst_dir, exist_ok=True)
+
+    def sync_contents(path: str = "") -> None:
+        src_path = os.path.join(src_dir, path)
+        dst_path = os.path.join(dst_dir, path)
+        with os.scandir(src_path) as it:
+            for pt in it:
+                relative_path = os.path.join(path, pt.name)
+                target = os.path.join(dst_path, pt.name)
+                if pt.is_dir():
+                    if not os.path.isdir(target):
+                        if os.path.lexists(target):
+                            os.remove(target)
+                        os.mkdir(target)
+                    sync_contents(relative_path)
+                if pt.is_file():
+                    if exclude and relative_path in exclude:
+                        continue
+                    source_path = relative_path
+                    if rename is not None:
+                        relative_path = rename(relative_path)
+                        target = os.path.join(dst_dir, relative_path)
+                    # generated pages win over static files with the same name
+                    if relative_path in keep:
+                        continue
+                    placed.add(relative_path)
+                    transform = transforms.get(os.path.splitext(pt.name)[1]) if transforms else None
+                    if transform is not None:
+                        hashes.pop(relative_path, None)
+                        with span("transform", "static", path=relative_path):
+                            changed = transform_file(pt.path, target, source_path, transform)
+                        (result.copied if changed else result.skipped).append(relative_path)
+                        continue
+                    if is_unchanged(pt, target, relative_path, compare, hashes):
+                        result.skipped.append(relative_path)
+                        continue
+                    logger.info("copying %s", relative_path)
+                    if io_pool is None:
+                        copy_file(pt.path, target, relative_path, link, compare, hashes)
+                    else:
+                        io_pool.submit(copy_file, pt.path, target, relative_path, link, compare, hashes)
+                    result.copied.append(relative_path)
+
+    def delete_stale(path: str = "") -> None:
+        dst_path = os.path.join(dst_dir, path)
+        with os.scandir(dst_path) as it:
+            for pt in it:
+                relative_path = os.path.join(path, pt.name)
+                if pt.is_dir(follow_symlinks=False):
+                    delete_stale(relative_path)
+                    if not os.listdir(pt.path) and not os.path.isdir(os.path.join(src_dir, relative_path)):
+                        os.rmdir(pt.path)
+                    continue
+                if relative_path in keep or relative_path in placed:
+                    continue
+                base_path, suffix = os.path.splitext(relative_path)
+                if suffix in siblings and (base_path in keep or base_path in placed):
+                    continue
+                logger.info("removing stale %s", relative_path)
+                os.remove(pt.path)
+                hashes.pop(relative_path, None)
+                result.deleted.append(relative_path)
+
+    if os.path.exists(src_dir):
+        sync_contents()
+        if io_pool is not None:
+            io_pool.wait()
+    else:
+        logger.info("%s missing, nothing to copy", src_dir)
+    delete_stale()
+
+    return result
@@ -0,0 +1,230 @@
+import io
+import os
+import re
+from typing import Callable, TextIO
+
+from assets import AssetMap
+from css import InlineCss
+from data_uris import AssetInliner, DataUris
+from images import ImageHints, ImageSizes
+from minify import Minifier
+from references import ReferenceIndex, ReferenceRecorder
+from text_utils import get_file_content
+
+
+TEMPLATE_NAME = "template.html"
+
+SLOT_PATTERN = re.compile(r"\{\{ *(\w+) *\}\}")
+URL_ATTRIBUTES = ('href="', 'src="')
+URL_ATTRIBUTE_PATTERN = re.compile(r'((?:href|src)=")([^"]*)"')
+
+
+class RootUrlRewriter():
+    """Puts site-absolute urls under the basepath, and static files at their fingerprinted names.
+
+    A class rather than a closure, templates holding one are pickled to the workers.
+    """
+    def __init__(self, basepath: str, assets: AssetMap = None) -> None:
+        self.basepath: str = basepath
+        self.assets: AssetMap = assets
+
+    def __call__(self, url: str) -> str:
+        if self.assets is not None:
+            url = self.assets.url(url)
+        return self.basepath + url[1:] if self.basepath != "/" and url.startswith("/") else url
+
+    def __repr__(self) -> str:
+        return f"RootUrlRewriter({self.basepath}, {self.assets})"
+
+
+def root_url_rewriter(basepath: str, assets: AssetMap = None) -> Callable[[str], str]:
+    """The per-url form of rewrite_root_urls, for HTMLNode.write_html."""
+    if assets is None and basepath == "/":
+        return None
+    return RootUrlRewriter(basepath, assets)
+
+
+def rewrite_root_urls(html: str, basepath: str, assets: AssetMap = None) -> str:
+    # site-absolute links have to live under the basepath the site is served from
+    if assets is None:
+        if basepath == "/":
+            return html
+        return html.replace('href="/', f'href="{basepath}').replace('src="/', f'src="{basepath}')
+    rewrite_url = root_url_rewriter(basepath, assets)
+    return URL_ATTRIBUTE_PATTERN.sub(lambda match: f'{match.group(1)}{rewrite_url(match.group(2))}"', html)
+
+
+class RenderOptions():
+    """What a build renders its pages with besides the basepath, one per build.
+
+    With assets, links to static files point at their fingerprinted names. With
+    minify, pages are minified as they are written. With inline_css, small
+    stylesheets are inlined into the template. With images, img tags get their
+    size and loading hints. With data_uris, small images and the small files
+    inlined stylesheets use are written as data: uris. With references, the urls
+    every page links to are collected in it.
+
+    key tells compiled templates apart, digest is what the manifest records.
+    Both are taken once here, a rebuilt asset map or image set makes new options.
+    """
+    def __init__(self, assets: AssetMap = None, minify: bool = False, inline_css: InlineCss = None, images: ImageSizes = None,
+                 data_uris: DataUris = None, references: ReferenceIndex = None) -> None:
+        self.assets: AssetMap = assets
+        self.minify: bool = minify
+        self.inline_css: InlineCss = inline_css
+        self.images: ImageSizes = images
+        self.data_uris: DataUris = data_uris
+        self.references: ReferenceIndex = references
+        # the index pages record into is told apart by identity
+        self.key: tuple = (
+            assets.digest if assets is not None else None, minify,
+            (inline_css.static_dir, inline_css.threshold) if inline_css is not None else None,
+            images.digest if images is not None else None, data_uris.digest if data_uris is not None else None, references,
+        )
+        # fingerprinted links, minifying, inlined css and image sizes change the page as much as the template does
+        self.digest: str = "".join(
+            [assets.digest if assets is not None else "", ":minify" if minify else ""]
+            + ([f":inline {inline_css.threshold}"] if inline_css is not None else [])
+            + ([images.digest] if images is not None else [])
+            + ([data_uris.digest] if data_uris is not None else [])
+            # pages rendered without the index have no references on record
+            + ([":references"] if references is not None else [])
+        )
+
+    def __repr__(self) -> str:
+        return f"RenderOptions({self.digest})"
+
+
+class Template():
+    """A template parsed once into literal segments and {{ Slot }} placeholders.
+
+    segments[i] is the literal text before slots[i], the last segment follows the
+    last slot. offsets[i] is where slots[i] started in the template source. The
+    basepath is applied to the literals when compiling, so rendering a page is a
+    single join. options adds fingerprinted links, minifying, inlined css,
+    image hints, data: uris and reference tracking, dependencies lists the
+    stylesheet files inlining the css read.
+    """
+    def __init__(self, source: str, basepath: str = "/", options: RenderOptions = None) -> None:
+        options = options if options is not None else RenderOptions()
+        assets = options.assets
+        images = options.images
+        data_uris = options.data_uris
+        inline_css = options.inline_css
+        self.basepath: str = basepath
+        self.options: RenderOptions = options
+        self.assets: AssetMap = assets
+        self.minify: bool = options.minify
+        self.rewrite_url: Callable[[str], str] = root_url_rewriter(basepath, assets)
+        # everything a rendered url depends on, for cache keys
+        self.url_key: str = basepath if assets is None else f"{basepath}\0{assets.digest}"
+        self.dependencies: list[str] = []
+        # looked up by the src a page ends up with
+        self.image_sizes: dict[str, tuple[int, int]] = images.by_url(self.rewrite_url) if images is not None else None
+        self.data_uris: DataUris = data_uris
+        self.data_uri_urls: dict[str, str] = data_uris.by_url(self.rewrite_url) if data_uris is not None else None
+        self.references: ReferenceIndex = options.references
+        if inline_css is not None:
+            css_url = self.rewrite_url
+            if data_uris is not None:
+                css_url = lambda url: data_uris.inline(url) if url in data_uris.paths else self.rewrite_url(url) if self.rewrite_url is not None else url
+            # decided once here, every page rendered with the template shares it
+            source, self.dependencies = inline_css.inline(source, css_url)
+        self.segments: list[str] = []
+        self.slots: list[str] = []
+        self.offsets: list[int] = []
+        self.placeholders: list[str] = []
+        # slots right after href=" or src=" hold a url that may need the basepath
+        self.url_slots: list[bool] = []
+
+        position = 0
+        for match in SLOT_PATTERN.finditer(source):
+            literal = source[position:match.start()]
+            self.segments.append(rewrite_root_urls(literal, basepath, assets))
+            self.slots.append(match.group(1))
+            self.offsets.append(match.start())
+            self.placeholders.append(match.group(0))
+            self.url_slots.append(literal.endswith(URL_ATTRIBUTES))
+            position = match.end()
+        self.segments.append(rewrite_root_urls(source[position:], basepath, assets))
+
+    def render(self, page_url: str = None, **values: str) -> str:
+        # the stream writers only work on render_to, the join is for plain pages
+        if self.minify or self.image_sizes is not None or self.data_uris is not None or self.references is not None:
+            buffer = io.StringIO()
+            self.render_to(buffer, page_url, **values)
+            return buffer.getvalue()
+        parts: list[str] = []
+        for segment, slot, placeholder, url_slot in zip(self.segments, self.slots, self.placeholders, self.url_slots):
+            parts.append(segment)
+            # placeholders without a value are left in the page, as str.replace did
+            value = values.get(slot, placeholder)
+            if url_slot and self.rewrite_url is not None:
+                value = self.rewrite_url(value)
+            parts.append(value)
+        parts.append(self.segments[-1])
+        return "".join(parts)
+
+    def render_to(self, writer: TextIO, page_url: str = None, **values: str | Callable[[TextIO], None]) -> None:
+        """Stream the page into writer, callable values write their own slot.
+
+        page_url is where the page sits in the site without the basepath, for
+        the relative links data_uris resolves.
+        """
+        if self.minify:
+            writer = Minifier(writer)
+        # after inlining, an image written as a data: uri is no longer fetched
+        if self.references is not None:
+            writer = ReferenceRecorder(writer, self.references)
+        if self.data_uris is not None:
+            writer = AssetInliner(writer, self.data_uris, self.data_uri_urls, page_url, self.basepath)
+        # every render starts a new page, with its own first image
+        if self.image_sizes is not None:
+            writer = ImageHints(writer, self.image_sizes)
+        for segment, slot, placeholder, url_slot in zip(self.segments, self.slots, self.placeholders, self.url_slots):
+            writer.write(segment)
+            value = values.get(slot, placeholder)
+            if callable(value):
+                value(writer)
+                continue
+            if url_slot and self.rewrite_url is not None:
+                value = self.rewrite_url(value)
+            writer.write(value)
+        writer.write(self.segments[-1])
+
+    def __repr__(self) -> str:
+        return f"Template(slots: {self.slots}, {self.basepath})"
+
+
+# compiled templates by path, basepath and options key, with the file stats they were compiled from
+template_cache: dict[tuple, tuple[list[tuple[int, int]], Template]] = {}
+
+
+def file_signatures(paths: list[str]) -> list[tuple[int, int]]:
+    signatures = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signatures.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signatures.append(None)
+    return signatures
+
+
+def load_template(path: str, basepath: str = "/", options: RenderOptions = None) -> Template:
+    key = (path, basepath, options.key if options is not None else None)
+    cached = template_cache.get(key)
+    # an inlined stylesheet is as much a part of the template as its own source
+    if cached is not None and cached[0] == file_signatures([path] + cached[1].dependencies):
+        return cached[1]
+
+    signature = file_signatures([path])
+    template = Template(get_file_content(path), basepath, options)
+    template_cache[key] = (signature + file_signatures(template.dependencies), template)
+    return template
+
+
+def find_template(content_path: str, default_path: str) -> str:
+    """Per-directory override: a template.html inside a content directory applies to it and below."""
+    override = os.path.join(content_path, TEMPLATE_NAME)
+    return override if os.path.isfile(override) else default_path
@@ -0,0 +1,88 @@
+import json
+import os
+import unittest
+
+from assets import ASSET_MAP_NAME, HEADERS_NAME, AssetMap, fingerprinted_name
+from fixtures import TempDirTestCase, write_file
+
+
+class TestAssetMap(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.tmp.name, "static")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "cat.png"), "meow")
+        write_file(os.path.join(self.static, "robots.txt"), "User-agent: *")
+        write_file(os.path.join(self.static, "about.html"), "<p>about</p>")
+
+    def test_fingerprinted_name(self):
+        self.assertEqual(fingerprinted_name("images/cat.png", "0123456789abcdef"), "images/cat.01234567.png")
+        self.assertEqual(fingerprinted_name("LICENSE", "0123456789abcdef"), "LICENSE.01234567")
+
+    def test_build(self):
+        assets = AssetMap.build(self.static)
+        self.assertEqual(sorted(assets.files), [os.path.join("images", "cat.png"), "index.css"])
+        self.assertRegex(assets.rename("index.css"), r"^index\.[0-9a-f]{8}\.css$")
+        # well known names are left alone
+        self.assertEqual(assets.rename("robots.txt"), "robots.txt")
+        self.assertEqual(assets.rename("about.html"), "about.html")
+
+    def test_digest_follows_content(self):
+        before = AssetMap.build(self.static)
+        self.assertEqual(AssetMap.build(self.static).digest, before.digest)
+        write_file(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        after = AssetMap.build(self.static)
+        self.assertNotEqual(after.digest, before.digest)
+        self.assertNotEqual(after.rename("index.css"), before.rename("index.css"))
+        self.assertEqual(after.rename("images/cat.png"), before.rename("images/cat.png"))
+
+    def test_url(self):
+        assets = AssetMap({"index.css": "index.1234.css"})
+        self.assertEqual(assets.url("/index.css"), "/index.1234.css")
+        self.assertEqual(assets.url("/index.css?v=2#top"), "/index.1234.css?v=2#top")
+        self.assertEqual(assets.url("/other.css"), "/other.css")
+        self.assertEqual(assets.url("index.css"), "index.css")
+
+    def test_stylesheet_references(self):
+        write_file(os.path.join(self.static, "css", "site.css"), "@import 'print.css';body{background:url(../images/cat.png)}a{background:url(\"/images/cat.png?v=1\")}")
+        write_file(os.path.join(self.static, "css", "print.css"), "body{}")
+        assets = AssetMap.build(self.static)
+        cat = assets.rename(os.path.join("images", "cat.png")).replace(os.sep, "/")
+        printed = os.path.basename(assets.rename(os.path.join("css", "print.css")))
+        self.assertEqual(
+            assets.rewrite_css("@import 'print.css';body{background:url(../images/cat.png)}a{background:url(\"/images/cat.png?v=1\")}", "/css/site.css"),
+            f"@import '{printed}';body{{background:url(../{cat})}}a{{background:url(\"/{cat}?v=1\")}}",
+        )
+        self.assertEqual(assets.rewrite_css("p{background:url(data:image/png;base64,AA==)}", "/css/site.css"), "p{background:url(data:image/png;base64,AA==)}")
+
+        # a changed image renames the stylesheets pointing at it
+        write_file(os.path.join(self.static, "images", "cat.png"), "purr")
+        after = AssetMap.build(self.static)
+        self.assertNotEqual(after.rename(os.path.join("css", "site.css")), assets.rename(os.path.join("css", "site.css")))
+        self.assertEqual(after.rename(os.path.join("css", "print.css")), assets.rename(os.path.join("css", "print.css")))
+        self.assertEqual(after.rename("index.css"), assets.rename("index.css"))
+
+    def test_write(self):
+        assets = AssetMap({"index.css": "index.1234.css"})
+        public = os.path.join(self.tmp.name, "docs")
+        os.makedirs(public)
+        self.assertEqual(assets.write(public), [ASSET_MAP_NAME, HEADERS_NAME])
+        with open(os.path.join(public, ASSET_MAP_NAME)) as file:
+            self.assertEqual(json.load(file), {"/index.css": "/index.1234.css"})
+        with open(os.path.join(public, HEADERS_NAME)) as file:
+            self.assertEqual(file.read(), "/index.1234.css\n  Cache-Control: public, max-age=31536000, immutable\n")
+
+    def test_write_placed_and_site_headers(self):
+        assets = AssetMap({"index.css": "index.1234.css", os.path.join("images", "cat.png"): os.path.join("images", "cat.1234.png")})
+        public = os.path.join(self.tmp.name, "docs")
+        os.makedirs(public)
+        write_file(os.path.join(self.static, HEADERS_NAME), "/*\n  X-Frame-Options: DENY")
+        assets.write(public, {os.path.join("images", "cat.1234.png")}, os.path.join(self.static, HEADERS_NAME))
+        with open(os.path.join(public, ASSET_MAP_NAME)) as file:
+            self.assertEqual(json.load(file), {"/images/cat.png": "/images/cat.1234.png"})
+        with open(os.path.join(public, HEADERS_NAME)) as file:
+            self.assertEqual(file.read(), "/*\n  X-Frame-Options: DENY\n/images/cat.1234.png\n  Cache-Control: public, max-age=31536000, immutable\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import json
+import os
+import tempfile
+import unittest
+
+import buildtrace
+from buildtrace import Tracer, span
+
+
+class TestTracer(unittest.TestCase):
+    def test_span_records_event(self):
+        tracer = Tracer()
+        with tracer.span("page", path="index.md"):
+            with tracer.span("read"):
+                pass
+        self.assertEqual([event["name"] for event in tracer.events], ["read", "page"])
+        page = tracer.events[1]
+        self.assertEqual(page["ph"], "X")
+        self.assertEqual(page["args"], {"path": "index.md"})
+        self.assertGreaterEqual(page["dur"], tracer.events[0]["dur"])
+
+    def test_export(self):
+        tracer = Tracer()
+        with tracer.span("write", "io"):
+            pass
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.json")
+            tracer.export(path)
+            with open(path) as file:
+                data = json.load(file)
+        self.assertEqual(data["traceEvents"][0]["cat"], "io")
+
+    def test_slowest(self):
+        tracer = Tracer()
+        tracer.add_events([
+            {"name": "page", "dur": 1000, "args": {"path": "a.md"}},
+            {"name": "page", "dur": 3000, "args": {"path": "b.md"}},
+            {"name": "read", "dur": 9000, "args": {}},
+        ])
+        self.assertEqual(tracer.slowest(count=1), [("b.md", 3.0)])
+        self.assertEqual(len(tracer.drain()), 3)
+        self.assertEqual(tracer.events, [])
+
+    def test_disabled_span(self):
+        buildtrace.stop_tracing()
+        with span("page"):
+            pass
+        tracer = buildtrace.start_tracing()
+        try:
+            with span("page", path="a.md"):
+                pass
+        finally:
+            buildtrace.stop_tracing()
+        self.assertEqual(len(tracer.events), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import gzip
+import os
+import unittest
+
+import compress
+from compress import MIN_SIZE, compress_tree
+from fixtures import TempDirTestCase, write_file
+
+
+class TestCompressTree(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.public = self.tmp.name
+        self.page = "<p>" + "the same words again and again " * 100 + "</p>"
+        write_file(os.path.join(self.public, "blog", "index.html"), self.page)
+        write_file(os.path.join(self.public, "index.css"), "body {}")
+        write_file(os.path.join(self.public, "images", "cat.png"), "meow" * 1000)
+
+    def test_writes_gzip_siblings(self):
+        result = compress_tree(self.public, jobs=2)
+        self.assertEqual(result.compressed, [os.path.join("blog", "index.html")])
+        with gzip.open(os.path.join(self.public, "blog", "index.html.gz"), "rt") as file:
+            self.assertEqual(file.read(), self.page)
+        # too small to pay off, and images are not compressed at all
+        self.assertEqual(result.unprofitable, ["index.css"])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.css.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images", "cat.png.gz")))
+
+    def test_skips_unchanged(self):
+        records = {}
+        compress_tree(self.public, records=records)
+        result = compress_tree(self.public, records=records)
+        self.assertEqual(result.compressed, [])
+        self.assertEqual(sorted(result.skipped), [os.path.join("blog", "index.html"), "index.css"])
+
+        write_file(os.path.join(self.public, "blog", "index.html"), self.page + "<p>more</p>")
+        result = compress_tree(self.public, records=records)
+        self.assertEqual(result.compressed, [os.path.join("blog", "index.html")])
+
+    def test_skips_newer_siblings_without_records(self):
+        compress_tree(self.public)
+        self.assertEqual(compress_tree(self.public).compressed, [])
+
+    def test_recompresses_missing_siblings(self):
+        records = {}
+        compress_tree(self.public, records=records)
+        os.remove(os.path.join(self.public, "blog", "index.html.gz"))
+        self.assertEqual(compress_tree(self.public, records=records).compressed, [os.path.join("blog", "index.html")])
+
+    def test_removes_sibling_that_stopped_paying_off(self):
+        records = {}
+        compress_tree(self.public, records=records)
+        write_file(os.path.join(self.public, "blog", "index.html"), "x" * (MIN_SIZE - 1))
+        result = compress_tree(self.public, records=records)
+        self.assertIn(os.path.join("blog", "index.html"), result.unprofitable)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "index.html.gz")))
+
+    def test_forgets_removed_files(self):
+        records = {}
+        compress_tree(self.public, records=records)
+        os.remove(os.path.join(self.public, "index.css"))
+        compress_tree(self.public, records=records)
+        self.assertEqual(list(records), [os.path.join("blog", "index.html")])
+
+    @unittest.skipIf(compress.brotli is None, "brotli is not installed")
+    def test_writes_brotli_siblings(self):
+        compress_tree(self.public)
+        with open(os.path.join(self.public, "blog", "index.html.br"), "rb") as file:
+            self.assertEqual(compress.brotli.decompress(file.read()).decode(), self.page)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import unittest
+
+from css import GENERATED_TAGS, InlineCss, absolute_css_urls, minify_css, selector_can_match, subset_css
+from fixtures import TempDirTestCase, write_file
+
+
+class TestMinifyCss(unittest.TestCase):
+    def test_whitespace_and_comments(self):
+        css = "/* headings */\nh1,\nh2 {\n  color: #fff;\n  margin: 0 auto;\n}\n\nul > li { padding: 0 }\n"
+        self.assertEqual(minify_css(css), "h1,h2{color:#fff;margin:0 auto}ul>li{padding:0}")
+
+    def test_keeps_needed_spaces(self):
+        self.assertEqual(minify_css("a :hover { width: calc(1px + 2px) }"), "a :hover{width:calc(1px + 2px)}")
+        self.assertEqual(minify_css("@media (max-width: 600px) { p { margin: 0 } }"), "@media (max-width:600px){p{margin:0}}")
+
+    def test_comments_are_not_whitespace(self):
+        self.assertEqual(minify_css(".a/* c */.b { color: red }"), ".a.b{color:red}")
+        self.assertEqual(minify_css("p { border: 1px/**/solid }"), "p{border:1px solid}")
+        self.assertEqual(minify_css("a /* c */ b { margin: 0 }"), "a b{margin:0}")
+
+    def test_strings(self):
+        self.assertEqual(minify_css('q::before { content: "a  { /* b */ }" ; }'), 'q::before{content:"a  { /* b */ }"}')
+
+
+class TestSubsetCss(unittest.TestCase):
+    def test_selector_can_match(self):
+        tags = GENERATED_TAGS | {"body"}
+        self.assertTrue(selector_can_match("pre code", tags, set()))
+        self.assertTrue(selector_can_match("a:hover", tags, set()))
+        self.assertTrue(selector_can_match("::-webkit-scrollbar", tags, set()))
+        self.assertTrue(selector_can_match("li:not(table)", tags, set()))
+        self.assertFalse(selector_can_match("table td", tags, set()))
+        self.assertFalse(selector_can_match("p.note", tags, set()))
+        self.assertTrue(selector_can_match("p.note", tags, {"note"}))
+
+    def test_subset(self):
+        css = "h1,table{color:red}.x{a:b}@media (max-width:1px){span{a:b}p{c:d}}@font-face{font-family:x}@import url(a.css);"
+        self.assertEqual(
+            subset_css(css, GENERATED_TAGS, set()),
+            "h1{color:red}@media (max-width:1px){p{c:d}}@font-face{font-family:x}@import url(a.css);",
+        )
+
+    def test_absolute_urls(self):
+        css = 'p{background:url(img/a.png)}q{background:url("/b.png")}r{background:url(data:x)}'
+        self.assertEqual(
+            absolute_css_urls(css, "/css/site.css", lambda url: "/site" + url),
+            'p{background:url(/site/css/img/a.png)}q{background:url("/site/b.png")}r{background:url(data:x)}',
+        )
+
+
+class TestInlineCss(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        write_file(os.path.join(self.tmp.name, "index.css"), "p { color: red; }\ntable { color: blue; }\n")
+        self.source = '<head><link href="/index.css" rel="stylesheet" /><link href="/missing.css" rel="stylesheet" /></head>'
+
+    def test_inline(self):
+        source, dependencies = InlineCss(self.tmp.name).inline(self.source)
+        self.assertEqual(source, '<head><style>p{color:red}</style><link href="/missing.css" rel="stylesheet" /></head>')
+        self.assertEqual(dependencies, [os.path.join(self.tmp.name, "index.css")])
+
+    def test_threshold(self):
+        source, dependencies = InlineCss(self.tmp.name, threshold=5).inline(self.source)
+        self.assertEqual(source, self.source)
+        # the decision still depends on the file
+        self.assertEqual(dependencies, [os.path.join(self.tmp.name, "index.css")])
+
+
+if __name__ == "__main__":
+    unittest.main()
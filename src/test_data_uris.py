@@ -0,0 +1,91 @@
+import base64
+import io
+import os
+import unittest
+
+from data_uris import INLINED, LINKED, AssetInliner, DataUris, resolve_css_url
+from fixtures import TempDirTestCase, write_bytes
+
+
+class TestResolveCssUrl(unittest.TestCase):
+    def test_resolve(self):
+        self.assertEqual(resolve_css_url("../images/a.png", "/css/index.css"), "/images/a.png")
+        self.assertEqual(resolve_css_url("/a.png", "/css/index.css"), "/a.png")
+        self.assertIsNone(resolve_css_url("data:image/png;base64,AA==", "/index.css"))
+        self.assertIsNone(resolve_css_url("https://example.com/a.png", "/index.css"))
+
+
+class TestDataUris(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        write_bytes(os.path.join(self.tmp.name, "images", "dot.png"), b"small")
+        write_bytes(os.path.join(self.tmp.name, "images", "big.png"), b"x" * 100)
+        write_bytes(os.path.join(self.tmp.name, "css", "index.css"), b"body{background:url('../images/dot.png')}")
+
+    def test_build(self):
+        data_uris = DataUris.build(self.tmp.name, 50)
+        self.assertEqual(sorted(data_uris.paths), ["/images/dot.png"])
+        # the stylesheet inlined it before any page was rendered
+        self.assertEqual(data_uris.uses, {"/images/dot.png": INLINED})
+        self.assertEqual(data_uris.dropped(), {os.path.join("images", "dot.png")})
+
+    def test_uri(self):
+        data_uris = DataUris.build(self.tmp.name, 50)
+        uri = data_uris.uri("/images/dot.png")
+        self.assertEqual(uri, "data:image/png;base64," + base64.b64encode(b"small").decode())
+        self.assertIs(data_uris.uri("/images/dot.png"), uri)
+
+    def test_inline_css(self):
+        data_uris = DataUris.build(self.tmp.name, 50)
+        css = data_uris.inline_css("a{background:url(../images/dot.png)}b{background:url(../images/big.png)}", "/css/index.css")
+        self.assertEqual(css, f"a{{background:url({data_uris.uri('/images/dot.png')})}}b{{background:url(../images/big.png)}}")
+
+    def test_digest(self):
+        digest = DataUris.build(self.tmp.name, 50).digest
+        self.assertEqual(DataUris.build(self.tmp.name, 50).digest, digest)
+        self.assertNotEqual(DataUris.build(self.tmp.name, 200).digest, digest)
+        write_bytes(os.path.join(self.tmp.name, "images", "dot.png"), b"other")
+        self.assertNotEqual(DataUris.build(self.tmp.name, 50).digest, digest)
+
+    def test_merge(self):
+        data_uris = DataUris.build(self.tmp.name, 200)
+        data_uris.merge({"/images/big.png": INLINED, "/images/dot.png": LINKED})
+        self.assertEqual(data_uris.uses, {"/images/dot.png": LINKED, "/images/big.png": INLINED})
+        self.assertEqual(data_uris.dropped(), {os.path.join("images", "big.png")})
+
+
+class TestAssetInliner(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        write_bytes(os.path.join(self.tmp.name, "images", "dot.png"), b"small")
+        write_bytes(os.path.join(self.tmp.name, "images", "dash.png"), b"small")
+
+    def test_img(self):
+        data_uris = DataUris.build(self.tmp.name, 50)
+        buffer = io.StringIO()
+        inliner = AssetInliner(buffer, data_uris, data_uris.by_url(lambda url: "/site" + url))
+        inliner.write('<p>text</p><img src="/site/images/dot.png" alt="dot">')
+        self.assertEqual(buffer.getvalue(), f'<p>text</p><img src="{data_uris.uri("/images/dot.png")}" alt="dot">')
+        self.assertEqual(data_uris.dropped(), {os.path.join("images", "dot.png")})
+
+    def test_link_keeps_file(self):
+        data_uris = DataUris.build(self.tmp.name, 50)
+        buffer = io.StringIO()
+        inliner = AssetInliner(buffer, data_uris, data_uris.by_url())
+        inliner.write('<img src="/images/dot.png">')
+        inliner.write('<a href="/images/dot.png">full size</a><img src="/images/other.png">')
+        self.assertTrue(buffer.getvalue().endswith('<a href="/images/dot.png">full size</a><img src="/images/other.png">'))
+        self.assertEqual(data_uris.uses, {"/images/dot.png": LINKED})
+        self.assertEqual(data_uris.dropped(), set())
+
+    def test_relative_links(self):
+        data_uris = DataUris.build(self.tmp.name, 50)
+        buffer = io.StringIO()
+        inliner = AssetInliner(buffer, data_uris, data_uris.by_url(lambda url: "/site" + url), "/blog/post.html", "/site/")
+        inliner.write('<img src="../images/dash.png"><a href="../images/dot.png">download</a>')
+        self.assertEqual(buffer.getvalue(), f'<img src="{data_uris.uri("/images/dash.png")}"><a href="../images/dot.png">download</a>')
+        self.assertEqual(data_uris.uses, {"/images/dash.png": INLINED, "/images/dot.png": LINKED})
+
+
+if __name__ == "__main__":
+    unittest.main()
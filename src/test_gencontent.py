@@ -0,0 +1,161 @@
+import io
+import os
+import unittest
+
+import gencontent
+from gencontent import changed_markdown, generate_changed_pages, generate_pages_recursive, render_page, stream_page
+from io_pool import IOPool
+from manifest import BuildManifest
+from template import Template
+from fixtures import TempDirTestCase, write_file
+
+
+def read_tree(path: str) -> dict[str, str]:
+    files = {}
+    for dir_path, _, file_names in os.walk(path):
+        for file_name in file_names:
+            file_path = os.path.join(dir_path, file_name)
+            with open(file_path) as file:
+                files[os.path.relpath(file_path, start=path)] = file.read()
+    return files
+
+
+class TestGeneratePagesRecursive(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        write_file(self.template, '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\n[blog](/blog)")
+        for index in range(12):
+            body = "\n\n".join(f"paragraph **{n}** with ![img](/images/{n}.png)" for n in range(index * 10))
+            write_file(os.path.join(self.content, "blog", f"post{index}", "index.md"), f"# Post {index}\n\n{body}")
+        write_file(os.path.join(self.content, "notes.txt"), "not markdown")
+
+    def build(self, dest: str, jobs: int) -> set[str]:
+        return generate_pages_recursive(self.content, self.template, os.path.join(self.root, dest), "/site/", jobs=jobs)
+
+    def test_outputs(self):
+        outputs = self.build("serial", 1)
+        self.assertIn("index.html", outputs)
+        self.assertIn(os.path.join("blog", "post3", "index.html"), outputs)
+        self.assertEqual(len(outputs), 13)
+
+    def test_parallel_matches_serial(self):
+        self.build("serial", 1)
+        self.build("parallel", 4)
+        serial = read_tree(os.path.join(self.root, "serial"))
+        self.assertEqual(len(serial), 13)
+        self.assertEqual(serial, read_tree(os.path.join(self.root, "parallel")))
+        self.assertIn('href="/site/index.css"', serial["index.html"])
+
+    def test_io_pool_matches_serial(self):
+        self.build("serial", 1)
+        with IOPool(4) as io_pool:
+            generate_pages_recursive(self.content, self.template, os.path.join(self.root, "pooled"), "/site/", io_pool=io_pool)
+        self.assertEqual(read_tree(os.path.join(self.root, "serial")), read_tree(os.path.join(self.root, "pooled")))
+
+    def test_template_override(self):
+        write_file(os.path.join(self.content, "blog", "template.html"), "<main>{{ Content }}</main>")
+        outputs = self.build("override", 2)
+        self.assertNotIn(os.path.join("blog", "template.html"), outputs)
+        pages = read_tree(os.path.join(self.root, "override"))
+        self.assertTrue(pages[os.path.join("blog", "post1", "index.html")].startswith("<main><div><h1>Post 1</h1>"))
+        self.assertTrue(pages["index.html"].startswith("<title>Home</title>"))
+
+    def test_failed_page_leaves_no_output(self):
+        write_file(os.path.join(self.content, "broken.md"), "no title")
+        with self.assertRaisesRegex(ValueError, "Missing h1 header"):
+            self.build("broken", 1)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "broken", "broken.html")))
+
+    def test_changed_pages_match_full_build(self):
+        write_file(os.path.join(self.content, "blog", "template.html"), "<main>{{ Content }}</main>")
+        manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+        dest = os.path.join(self.root, "watched")
+        outputs = generate_pages_recursive(self.content, self.template, dest, "/site/", manifest)
+        edited = os.path.join(self.content, "blog", "post2", "index.md")
+        added = os.path.join(self.content, "blog", "post2", "more.md")
+        deleted = os.path.join(self.content, "blog", "post5", "index.md")
+        write_file(edited, "# Edited\n\nnew body")
+        write_file(added, "# More")
+        os.remove(deleted)
+
+        changed = changed_markdown({edited, added, deleted}, self.content, manifest)
+        self.assertEqual(changed, {edited, added, deleted})
+        outputs = generate_changed_pages(changed, self.content, self.template, dest, "/site/", outputs, manifest)
+        self.assertNotIn(os.path.join("blog", "post5", "index.html"), outputs)
+        self.assertIn(os.path.join("blog", "post2", "more.html"), outputs)
+        self.assertNotIn(os.path.join("blog", "post5", "index.md"), manifest.pages)
+
+        self.assertEqual(generate_pages_recursive(self.content, self.template, os.path.join(self.root, "full"), "/site/"), outputs)
+        self.assertEqual(read_tree(dest), read_tree(os.path.join(self.root, "full")))
+        self.assertTrue(read_tree(dest)[os.path.join("blog", "post2", "index.html")].startswith("<main>"))
+
+    def test_changed_markdown_needs_full_pass(self):
+        manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+        generate_pages_recursive(self.content, self.template, os.path.join(self.root, "watched"), "/site/", manifest)
+        self.assertEqual(changed_markdown({os.path.join(self.content, "notes.txt")}, self.content, manifest), set())
+        self.assertIsNone(changed_markdown({os.path.join(self.content, "blog", "template.html")}, self.content, manifest))
+        self.assertIsNone(changed_markdown({os.path.join(self.content, "blog")}, self.content, manifest))
+        # a directory moved away is no longer there to tell it apart from a file, the manifest knows its pages
+        manifest.record_page(os.path.join("gone", "index.md"), "hash", "template", os.path.join("gone", "index.html"))
+        self.assertIsNone(changed_markdown({os.path.join(self.content, "gone")}, self.content, manifest))
+        self.assertEqual(changed_markdown({os.path.join(self.content, "old.swp")}, self.content, manifest), set())
+
+
+
+class TestStreamPage(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.tmp.name, "big.md")
+        self.template = Template("<main>{{ Content }}</main><title>{{ Title }}</title>", "/site/")
+        
+    def test_matches_render_page(self):
+        markdown = "intro [link](/a)\n\n# The **Title**\n\n" + "\n\n".join(f"- item {n}\n- *item*" for n in range(50)) + "\n\n```\ncode\n```\n"
+        write_file(self.path, markdown)
+        buffer = io.StringIO()
+        stream_page(buffer, self.path, self.template)
+        self.assertEqual(buffer.getvalue(), render_page(markdown, self.template))
+        
+    def test_missing_title(self):
+        write_file(self.path, "no title")
+        with self.assertRaisesRegex(ValueError, "Missing h1 header"):
+            stream_page(io.StringIO(), self.path, self.template)
+            
+    def test_large_pages_are_streamed(self):
+        content = os.path.join(self.tmp.name, "content")
+        template = os.path.join(self.tmp.name, "template.html")
+        write_file(os.path.join(content, "index.md"), "# Big\n\nbody")
+        write_file(template, "{{ Title }}{{ Content }}")
+        stream_size = gencontent.STREAM_SIZE
+        gencontent.STREAM_SIZE = 0
+        try:
+            generate_pages_recursive(content, template, os.path.join(self.tmp.name, "docs"), "/")
+        finally:
+            gencontent.STREAM_SIZE = stream_size
+        with open(os.path.join(self.tmp.name, "docs", "index.html")) as file:
+            self.assertEqual(file.read(), "Big<div><h1>Big</h1><p>body</p></div>")
+
+    def test_large_pages_are_streamed_with_io_pool(self):
+        content = os.path.join(self.tmp.name, "content")
+        template = os.path.join(self.tmp.name, "template.html")
+        write_file(os.path.join(content, "index.md"), "# Big\n\nbody")
+        write_file(template, "{{ Title }}{{ Content }}")
+        def render_page(*args) -> str:
+            raise AssertionError("rendered into one string")
+
+        stream_size, original_render_page = gencontent.STREAM_SIZE, gencontent.render_page
+        gencontent.STREAM_SIZE, gencontent.render_page = 0, render_page
+        try:
+            with IOPool(2) as io_pool:
+                generate_pages_recursive(content, template, os.path.join(self.tmp.name, "docs"), "/", io_pool=io_pool)
+        finally:
+            gencontent.STREAM_SIZE, gencontent.render_page = stream_size, original_render_page
+        with open(os.path.join(self.tmp.name, "docs", "index.html")) as file:
+            self.assertEqual(file.read(), "Big<div><h1>Big</h1><p>body</p></div>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,9 @@
+import io
+import pickle
+import sys
 import unittest
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, RawNode
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -216,6 +219,63 @@ class TestHTMLNode(unittest.TestCase):
             "<h2><b>Bold text</b>Normal text<i>italic text</i>Normal text</h2>",
         )
         
-        
+    def test_write_html(self):
+        node = ParentNode("p", [LeafNode("b", "Bold text"), LeafNode("a", "link", {"href": "/blog"})])
+        buffer = io.StringIO()
+        node.write_html(buffer)
+        self.assertEqual(buffer.getvalue(), '<p><b>Bold text</b><a href="/blog">link</a></p>')
+
+    def test_write_html_rewrite_url(self):
+        node = ParentNode("p", [
+            LeafNode("a", "/text", {"href": "/blog", "title": "/blog"}),
+            LeafNode("img", "", {"src": "/cat.png", "alt": "cat"}),
+        ])
+        buffer = io.StringIO()
+        node.write_html(buffer, lambda url: "/site" + url)
+        self.assertEqual(
+            buffer.getvalue(),
+            '<p><a href="/site/blog" title="/blog">/text</a><img src="/site/cat.png" alt="cat" /></p>',
+        )
+
+    def test_deep_tree(self):
+        depth = sys.getrecursionlimit() * 2
+        node = LeafNode(None, "deep")
+        for _ in range(depth):
+            node = ParentNode("b", [node])
+        self.assertEqual(node.to_html(), "<b>" * depth + "deep" + "</b>" * depth)
+
+    def test_base_node_has_no_html(self):
+        with self.assertRaisesRegex(NotImplementedError, "to_html method not implemented"):
+            HTMLNode("p", "text").to_html()
+
+    def test_slots(self):
+        node = LeafNode("b", "text")
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = True
+
+    def test_shared_leaf(self):
+        node = LeafNode.shared("b", ", ")
+        self.assertIs(LeafNode.shared("b", ", "), node)
+        self.assertIsNot(LeafNode.shared("i", ", "), node)
+        self.assertEqual(node.to_html(), "<b>, </b>")
+
+    def test_shared_leaf_is_immutable(self):
+        node = LeafNode.shared("b", "hi")
+        with self.assertRaisesRegex(AttributeError, "immutable"):
+            node.value = "X"
+        with self.assertRaises(AttributeError):
+            del node.tag
+        self.assertIs(pickle.loads(pickle.dumps(node)), node)
+
+    def test_interned_tag(self):
+        tag = "".join(["h", "3"])
+        self.assertIs(HTMLNode(tag).tag, HTMLNode("h3").tag)
+
+    def test_raw_node(self):
+        node = ParentNode("div", [RawNode('<p><a href="/a">a</a></p>'), LeafNode("a", "b", {"href": "/b"})])
+        self.assertEqual(node.to_html(), '<div><p><a href="/a">a</a></p><a href="/b">b</a></div>')
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
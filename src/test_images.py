@@ -0,0 +1,79 @@
+import io
+import os
+import struct
+import unittest
+
+from images import ImageHints, ImageSizes, read_image_size
+from fixtures import TempDirTestCase, write_bytes
+
+
+PNG = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", 640, 480) + b"\x08\x06\x00\x00\x00"
+GIF = b"GIF89a" + struct.pack("<HH", 32, 16) + b"\x00" * 8
+# an APP0 segment before the frame, which has to be skipped
+JPEG = b"\xff\xd8" + b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9 + b"\xff\xc0" + struct.pack(">HBHH", 17, 8, 300, 400) + b"\x00" * 12
+WEBP_LOSSY = b"RIFF" + struct.pack("<I", 30) + b"WEBPVP8 " + struct.pack("<I", 10) + b"\x00\x00\x00\x9d\x01\x2a" + struct.pack("<HH", 200, 100)
+WEBP_LOSSLESS = b"RIFF" + struct.pack("<I", 30) + b"WEBPVP8L" + struct.pack("<I", 5) + b"\x2f" + struct.pack("<I", (50 - 1) | (25 - 1) << 14)
+WEBP_EXTENDED = b"RIFF" + struct.pack("<I", 30) + b"WEBPVP8X" + struct.pack("<I", 10) + b"\x00" * 4 + (1000 - 1).to_bytes(3, "little") + (700 - 1).to_bytes(3, "little")
+
+
+class TestReadImageSize(TempDirTestCase):
+    def size_of(self, name: str, content: bytes):
+        path = os.path.join(self.tmp.name, name)
+        write_bytes(path, content)
+        return read_image_size(path)
+
+    def test_formats(self):
+        self.assertEqual(self.size_of("a.png", PNG), (640, 480))
+        self.assertEqual(self.size_of("a.gif", GIF), (32, 16))
+        self.assertEqual(self.size_of("a.jpg", JPEG), (400, 300))
+        self.assertEqual(self.size_of("a.webp", WEBP_LOSSY), (200, 100))
+        self.assertEqual(self.size_of("b.webp", WEBP_LOSSLESS), (50, 25))
+        self.assertEqual(self.size_of("c.webp", WEBP_EXTENDED), (1000, 700))
+
+    def test_unknown(self):
+        self.assertIsNone(self.size_of("a.png", b"not an image"))
+        self.assertIsNone(self.size_of("b.jpg", b"\xff\xd8\xff\xe0"))
+
+
+class TestImageSizes(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        write_bytes(os.path.join(self.tmp.name, "images", "cat.png"), PNG)
+        write_bytes(os.path.join(self.tmp.name, "dog.gif"), GIF)
+        write_bytes(os.path.join(self.tmp.name, "index.css"), b"body {}")
+
+    def test_build(self):
+        images = ImageSizes.build(self.tmp.name)
+        self.assertEqual(images.sizes, {"/images/cat.png": (640, 480), "/dog.gif": (32, 16)})
+        self.assertEqual(images.by_url(lambda url: "/site" + url)["/site/dog.gif"], (32, 16))
+
+    def test_rebuild_reuses_unchanged(self):
+        images = ImageSizes.build(self.tmp.name)
+        # a size that was not read from the file proves the header was not read again
+        images.sizes["/dog.gif"] = (1, 1)
+        again = ImageSizes.build(self.tmp.name, images)
+        self.assertEqual(again.sizes["/dog.gif"], (1, 1))
+
+        write_bytes(os.path.join(self.tmp.name, "images", "cat.png"), PNG.replace(struct.pack(">II", 640, 480), struct.pack(">II", 64, 48)))
+        changed = ImageSizes.build(self.tmp.name, again)
+        self.assertEqual(changed.sizes["/images/cat.png"], (64, 48))
+        self.assertNotEqual(changed.digest, again.digest)
+
+
+class TestImageHints(unittest.TestCase):
+    def test_hints(self):
+        buffer = io.StringIO()
+        hints = ImageHints(buffer, {"/cat.png": (640, 480)})
+        hints.write('<p><img src="/cat.png" alt="cat" /></p>')
+        hints.write('<img src="/cat.png" alt="cat" />')
+        hints.write('<img src="/other.png" alt="" loading="eager" />')
+        self.assertEqual(
+            buffer.getvalue(),
+            '<p><img src="/cat.png" alt="cat" width="640" height="480" decoding="async" /></p>'
+            '<img src="/cat.png" alt="cat" width="640" height="480" loading="lazy" decoding="async" />'
+            '<img src="/other.png" alt="" loading="eager" decoding="async" />',
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
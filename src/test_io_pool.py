@@ -0,0 +1,76 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from io_pool import IOPool
+
+
+class TestIOPool(unittest.TestCase):
+    def test_submit_and_wait(self):
+        done = []
+        with IOPool(3) as pool:
+            for index in range(20):
+                pool.submit(done.append, index)
+            pool.wait()
+            self.assertEqual(sorted(done), list(range(20)))
+            self.assertEqual(len(pool.pending), 0)
+
+    def test_error_is_raised_again(self):
+        def fail() -> None:
+            raise OSError("disk full")
+
+        with IOPool(2) as pool:
+            pool.submit(fail)
+            with self.assertRaisesRegex(OSError, "disk full"):
+                pool.wait()
+
+    def test_error_is_raised_by_next_submit(self):
+        def fail() -> None:
+            raise OSError("disk full")
+
+        with IOPool(2) as pool:
+            pool.submit(fail).exception()
+            with self.assertRaisesRegex(OSError, "disk full"):
+                pool.submit(time.sleep, 0)
+            pool.wait()
+
+    def test_pending_is_bounded(self):
+        release = threading.Event()
+        with IOPool(2) as pool:
+            for _ in range(4):
+                pool.submit(release.wait)
+            blocked = threading.Thread(target=pool.submit, args=(release.wait,))
+            blocked.start()
+            blocked.join(0.05)
+            # the fifth task waits for room
+            self.assertTrue(blocked.is_alive())
+            release.set()
+            blocked.join()
+            pool.wait()
+
+    def test_prefetch_keeps_order(self):
+        def read(index: int) -> int:
+            time.sleep(0.001 * (10 - index))
+            return index * 2
+
+        with IOPool(4) as pool:
+            self.assertEqual(list(pool.prefetch(range(10), read)), [(index, index * 2) for index in range(10)])
+
+    def test_inline(self):
+        pool = IOPool(0)
+        self.assertEqual(pool.submit(sum, [1, 2]).result(), 3)
+        self.assertEqual(list(pool.prefetch([1, 2], str)), [(1, "1"), (2, "2")])
+        pool.close()
+
+    def test_makedirs(self):
+        with tempfile.TemporaryDirectory() as tmp, IOPool(2) as pool:
+            paths = [os.path.join(tmp, *parts) for parts in [("a",), ("a", "b", "c"), ("a", "d"), ("e",)]]
+            pool.makedirs(paths + paths)
+            for path in paths:
+                self.assertTrue(os.path.isdir(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import io
+import logging
+import os
+import tempfile
+import unittest
+
+from gencontent import generate_pages_recursive
+from manifest import BuildManifest, hash_file
+from fixtures import TempDirTestCase, write_file
+
+
+class TestBuildManifest(unittest.TestCase):
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "manifest.json")
+            manifest = BuildManifest(path)
+            manifest.set_basepath("/")
+            manifest.record_page("index.md", "aaa", "ttt", "index.html")
+            manifest.static["index.css"] = "ccc"
+            manifest.save()
+
+            loaded = BuildManifest.load(path)
+            self.assertEqual(loaded.basepath, "/")
+            self.assertTrue(loaded.page_is_current("index.md", "aaa", "ttt", "index.html"))
+            self.assertFalse(loaded.page_is_current("index.md", "aaa", "changed", "index.html"))
+            self.assertEqual(loaded.static, {"index.css": "ccc"})
+
+    def test_missing_and_corrupt(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "manifest.json")
+            self.assertEqual(BuildManifest.load(path).pages, {})
+
+            write_file(path, "{not json")
+            with self.assertLogs("manifest", level="WARNING"):
+                self.assertEqual(BuildManifest.load(path).pages, {})
+
+    def test_basepath_change_invalidates(self):
+        manifest = BuildManifest("unused")
+        manifest.set_basepath("/")
+        manifest.record_page("index.md", "aaa", "ttt", "index.html")
+        manifest.set_basepath("/blog/")
+        self.assertEqual(manifest.pages, {})
+
+    def test_prune_pages(self):
+        manifest = BuildManifest("unused")
+        manifest.record_page("a.md", "1", "t", "a.html")
+        manifest.record_page("b.md", "2", "t", "b.html")
+        self.assertEqual(manifest.prune_pages({"a.md"}), ["b.html"])
+        self.assertEqual(list(manifest.pages), ["a.md"])
+
+
+class TestIncrementalBuild(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.content, "blog", "post.md"), "# Post")
+        self.manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+
+    def build(self) -> str:
+        # the build log tells which pages were generated
+        log = io.StringIO()
+        handler = logging.StreamHandler(log)
+        logger = logging.getLogger("gencontent")
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        try:
+            generate_pages_recursive(self.content, self.template, self.public, "/", self.manifest)
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(logging.NOTSET)
+        return log.getvalue()
+
+    def test_skips_unchanged_pages(self):
+        self.build()
+        self.assertEqual(self.build(), "")
+
+        write_file(os.path.join(self.content, "index.md"), "# Home again")
+        log = self.build()
+        self.assertIn("index.md", log)
+        self.assertNotIn("post.md", log)
+        with open(os.path.join(self.public, "index.html")) as file:
+            self.assertEqual(file.read(), "<title>Home again</title><div><h1>Home again</h1></div>")
+
+    def test_template_change_rebuilds_everything(self):
+        self.build()
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        log = self.build()
+        self.assertIn("index.md", log)
+        self.assertIn("post.md", log)
+        self.assertEqual(self.manifest.pages["index.md"]["template"], hash_file(self.template))
+
+    def test_deleted_source_is_pruned(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+        self.assertNotIn(os.path.join("blog", "post.md"), self.manifest.pages)
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
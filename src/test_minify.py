@@ -0,0 +1,43 @@
+import io
+import unittest
+
+from minify import Minifier, minify_html
+
+
+class TestMinify(unittest.TestCase):
+    def test_whitespace_between_tags(self):
+        html = "<!doctype html>\n<html>\n  <head>\n    <title> Hi </title>\n  </head>\n\n  <body>\n    <p>a  b\n c</p>\n  </body>\n</html>\n"
+        self.assertEqual(minify_html(html), "<!doctype html><html><head><title>Hi</title></head><body><p>a b c</p></body></html>")
+
+    def test_inline_tags_keep_one_space(self):
+        self.assertEqual(minify_html("<p><b>a</b>  <i>b</i>\n<code>c</code></p>"), "<p><b>a</b> <i>b</i> <code>c</code></p>")
+
+    def test_comments(self):
+        self.assertEqual(minify_html("<p>a<!-- note --></p><!--[if IE]><p>old</p><![endif]-->"), "<p>a</p><!--[if IE]><p>old</p><![endif]-->")
+
+    def test_attribute_quotes(self):
+        self.assertEqual(
+            minify_html('<a href="/blog/tom">x</a><img src="/a b.png" alt="" /><br class="x"/>'),
+            '<a href=/blog/tom>x</a><img src="/a b.png" alt="" /><br class="x"/>',
+        )
+
+    def test_preserves_pre_and_code(self):
+        html = '<pre><code>def f():\n    return  1\n<a href="/x">\n</code></pre>\n<p>x <code>a  b</code></p>'
+        self.assertEqual(minify_html(html), '<pre><code>def f():\n    return  1\n<a href="/x">\n</code></pre><p>x <code>a  b</code></p>')
+
+    def test_text_is_not_a_tag(self):
+        self.assertEqual(minify_html('<p><a href="/">< Back  Home</a></p>'), "<p><a href=/>< Back Home</a></p>")
+
+    def test_fragments(self):
+        # the same output whichever way the html is split into writes
+        html = '<div>\n  <p>one <b>two</b>\n three</p>\n  <pre><code>a\n  b</code></pre>\n</div>\n'
+        buffer = io.StringIO()
+        minifier = Minifier(buffer)
+        for fragment in ["<div>", "\n  ", "<p>", "one ", "<b>", "two", "</b>", "\n three", "</p>", "\n  <pre><code>", "a\n  b", "</code></pre>", "\n</div>\n"]:
+            minifier.write(fragment)
+        self.assertEqual(buffer.getvalue(), minify_html(html))
+        self.assertEqual(buffer.getvalue(), "<div><p>one <b>two</b> three</p><pre><code>a\n  b</code></pre></div>")
+
+
+if __name__ == "__main__":
+    unittest.main()
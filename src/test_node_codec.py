@@ -0,0 +1,101 @@
+import io
+import unittest
+
+from htmlnode import LeafNode, ParentNode, RawNode
+from node_codec import MAGIC, decode_node, encode_node, encoded_to_html, write_encoded_html
+from node_utils import markdown_to_html_node, parse_markdown, text_to_span_children
+from template import root_url_rewriter
+
+
+MARKDOWN = """# Title with **bold** and a [link](/home)
+
+A paragraph with _italic_, `code` and ![an image](/images/cat.png) plus
+a second line, a [second link](https://example.com) and a ![second image](/images/dog.png).
+
+> quoted *text*
+> over two lines
+
+- unordered **item**
+- another item
+
+1. first
+2. second [link](/second)
+
+```
+code block with **no** parsing
+```
+
+###### small heading"""
+
+
+class TestNodeCodec(unittest.TestCase):
+    def test_round_trip(self):
+        node = markdown_to_html_node(MARKDOWN)
+        data = encode_node(node)
+        self.assertTrue(data.startswith(MAGIC))
+        decoded = decode_node(data)
+        self.assertEqual(decoded.to_html(), node.to_html())
+        self.assertEqual(repr(decoded), repr(node))
+
+    def test_round_trip_spans(self):
+        node, _ = parse_markdown(MARKDOWN, text_to_span_children)
+        decoded = decode_node(encode_node(node))
+        self.assertEqual(decoded.to_html(), markdown_to_html_node(MARKDOWN).to_html())
+
+    def test_render_without_decoding(self):
+        for node in [markdown_to_html_node(MARKDOWN), parse_markdown(MARKDOWN, text_to_span_children)[0]]:
+            data = encode_node(node)
+            self.assertEqual(encoded_to_html(data), node.to_html())
+
+            rewrite_url = root_url_rewriter("/site/")
+            expected = io.StringIO()
+            node.write_html(expected, rewrite_url)
+            written = io.StringIO()
+            write_encoded_html(data, written, rewrite_url)
+            self.assertEqual(written.getvalue(), expected.getvalue())
+            self.assertIn('href="/site/home"', written.getvalue())
+
+    def test_props_and_raw(self):
+        node = ParentNode("div", [
+            RawNode("<p>cached</p>"),
+            LeafNode("a", "x", {"href": "/a", "target": "_blank"}),
+            LeafNode(None, ""),
+        ])
+        decoded = decode_node(encode_node(node))
+        self.assertEqual(decoded.children[1].props, {"href": "/a", "target": "_blank"})
+        self.assertIsNone(decoded.children[2].tag)
+        self.assertEqual(encoded_to_html(encode_node(node)), node.to_html())
+
+    def test_strings_are_pooled(self):
+        once = encode_node(ParentNode("p", [LeafNode("b", "repeated text")]))
+        many = encode_node(ParentNode("p", [LeafNode("b", "repeated text")] * 100))
+        # each repeat is only a head byte, a value ref and a prop count
+        self.assertEqual(len(many) - len(once), 99 * 3)
+
+    def test_multi_byte_refs(self):
+        # past 127 strings, tags and children every ref and count takes two bytes
+        node = ParentNode("ul", [LeafNode(f"t{i}", f"item {i}", {f"data-{i}": str(i)}) for i in range(300)])
+        decoded = decode_node(encode_node(node))
+        self.assertEqual(decoded.to_html(), node.to_html())
+        self.assertEqual(decoded.children[299].tag, "t299")
+        self.assertEqual(decoded.children[299].props, {"data-299": "299"})
+
+    def test_deep_tree(self):
+        node = LeafNode(None, "deep")
+        for _ in range(5000):
+            node = ParentNode("b", [node])
+        data = encode_node(node)
+        self.assertEqual(encoded_to_html(data), node.to_html())
+        self.assertEqual(decode_node(data).to_html(), node.to_html())
+
+    def test_errors(self):
+        with self.assertRaisesRegex(ValueError, "Not an encoded node tree"):
+            decode_node(b"not a tree")
+        with self.assertRaisesRegex(ValueError, "Parent node has no children"):
+            encoded_to_html(encode_node(ParentNode("p", [])))
+        with self.assertRaisesRegex(ValueError, "Leaf node has no value"):
+            encoded_to_html(encode_node(LeafNode("b", None)))
+
+
+if __name__ == "__main__":
+    unittest.main()
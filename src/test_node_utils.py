@@ -9,9 +9,13 @@ from node_utils import (
     split_nodes_link, 
     split_nodes_imagelink,
     text_to_textnodes,
-    markdown_to_html_node
+    text_to_spans,
+    text_to_children,
+    text_to_span_children,
+    markdown_to_html_node,
+    parse_markdown,
 )
-from textnode import TextType, TextNode
+from textnode import TextType, TextNode, TextSpan
 from htmlnode import LeafNode
 
 
@@ -110,6 +114,12 @@ class TestTextNodeToHTMLNode(unittest.TestCase):
             {"src": "https://www.boot.dev", "alt": "This is an image"},
         )
 
+    def test_shared_leaf_cannot_leak_into_other_pages(self):
+        html_node = text_node_to_html_node(TextNode("hi", TextType.BOLD))
+        with self.assertRaises(AttributeError):
+            html_node.value = "X"
+        self.assertEqual(markdown_to_html_node("para **hi** end").to_html(), "<div><p>para <b>hi</b> end</p></div>")
+
     def test_bold(self):
         node = TextNode("This is bold", TextType.BOLD)
         html_node = text_node_to_html_node(node)
@@ -457,6 +467,74 @@ class TestTextToTextnodes(unittest.TestCase):
         )
 
 
+    def test_image_and_link_with_same_text(self):
+        self.assertListEqual(
+            [
+                TextNode("x", TextType.IMAGE, "y"),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("x", TextType.LINK, "y"),
+            ],
+            text_to_textnodes("![x](y) and [x](y)"),
+        )
+        
+    def test_delimiters_inside_code(self):
+        self.assertListEqual(
+            [
+                TextNode("call ", TextType.TEXT),
+                TextNode("a*b*c", TextType.CODE),
+                TextNode(" or ", TextType.TEXT),
+                TextNode("init", TextType.BOLD),
+            ],
+            text_to_textnodes("call `a*b*c` or __init__"),
+        )
+        
+    def test_many_links(self):
+        text = " ".join(f"[link {n}](/page/{n})" for n in range(1000))
+        nodes = text_to_textnodes(text)
+        self.assertEqual(len(nodes), 1999)
+        self.assertEqual(nodes[-1], TextNode("link 999", TextType.LINK, "/page/999"))
+        
+    def test_missing_closing_delimiter(self):
+        with self.assertRaisesRegex(Exception, "closing delimiter missing"):
+            text_to_textnodes("this is **not closed")
+            
+        
+class TestTextToSpans(unittest.TestCase):
+    def test_offsets(self):
+        text = "a **b** [c](/d) ![e](f.png)"
+        spans = text_to_spans(text)
+        self.assertListEqual(
+            [
+                TextSpan(0, 2, TextType.TEXT),
+                TextSpan(4, 5, TextType.BOLD),
+                TextSpan(7, 8, TextType.TEXT),
+                TextSpan(9, 10, TextType.LINK, 12, 14),
+                TextSpan(15, 16, TextType.TEXT),
+                TextSpan(18, 19, TextType.IMAGE, 21, 26),
+            ],
+            spans,
+        )
+        self.assertEqual(spans[3].url(text), "/d")
+        self.assertIsNone(spans[0].url(text))
+        
+    def test_span_children_match_leaves(self):
+        text = "This is **text** with an *italic* word, a `code block`, an ![obi wan](/obi.png) and a [link](https://boot.dev)"
+        span_html = "".join(node.to_html() for node in text_to_span_children(text))
+        leaf_html = "".join(node.to_html() for node in text_to_children(text))
+        self.assertEqual(span_html, leaf_html)
+        self.assertEqual(text_to_span_children(""), [])
+        
+    def test_parse_markdown_with_spans(self):
+        md = "# Title\n\n- a **b**\n- [c](/d)\n\n> quote *it*\n\n```\ncode\n```"
+        node, title = parse_markdown(md, text_to_span_children)
+        self.assertEqual(title, "Title")
+        self.assertEqual(node.to_html(), markdown_to_html_node(md).to_html())
+        
+    def test_error_offset(self):
+        with self.assertRaisesRegex(Exception, "closing delimiter missing for \\*\\* at offset 5"):
+            text_to_spans("some **bold")
+            
+            
 class TestMarkdownToHTMLNode(unittest.TestCase):
     def test_header(self):
         node = markdown_to_html_node("## Header")
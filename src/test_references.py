@@ -0,0 +1,80 @@
+import io
+import os
+import unittest
+
+from assets import AssetMap
+from references import ReferenceIndex, ReferenceRecorder, resolve_url
+from fixtures import TempDirTestCase, write_file
+
+
+class TestResolveUrl(unittest.TestCase):
+    def test_resolve(self):
+        self.assertEqual(resolve_url("/site/images/a.png", "/blog/index.html", "/site/"), "/images/a.png")
+        self.assertEqual(resolve_url("../images/a%20b.png?v=1#top", "/blog/index.html"), "/images/a b.png")
+        self.assertEqual(resolve_url("a.png", "/blog/index.html"), "/blog/a.png")
+        self.assertIsNone(resolve_url("https://example.com/a.png", "/index.html"))
+        self.assertIsNone(resolve_url("mailto:someone@example.com", "/index.html"))
+        self.assertIsNone(resolve_url("#top", "/index.html"))
+        self.assertIsNone(resolve_url("data:image/png;base64,AA==", "/index.html"))
+
+
+class TestReferenceIndex(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static_dir = os.path.join(self.tmp.name, "static")
+        self.public_dir = os.path.join(self.tmp.name, "docs")
+        write_file(os.path.join(self.static_dir, "css", "index.css"), "@import 'print.css';body{background:url(../images/bg.png)}")
+        write_file(os.path.join(self.static_dir, "css", "print.css"), "body{}")
+        write_file(os.path.join(self.static_dir, "images", "bg.png"), "bg")
+        write_file(os.path.join(self.static_dir, "images", "cat.png"), "cat")
+        write_file(os.path.join(self.static_dir, "images", "old.png"), "old")
+        write_file(os.path.join(self.static_dir, "robots.txt"), "User-agent: *")
+        write_file(os.path.join(self.static_dir, "favicon.ico"), "icon")
+
+    def index(self, basepath: str = "/") -> ReferenceIndex:
+        references = ReferenceIndex(self.public_dir, basepath)
+        recorder = ReferenceRecorder(io.StringIO(), references)
+        recorder.write(f'<link href="{basepath}css/index.css" rel="stylesheet">')
+        recorder.write('<p><img src="../images/cat.png" alt="cat"></p>')
+        references.record(os.path.join(self.public_dir, "blog", "index.html"))
+        return references
+
+    def test_record(self):
+        references = self.index("/site/")
+        self.assertEqual(references.pages, {"blog/index.html": ["/css/index.css", "/images/cat.png"]})
+        self.assertEqual(references.pending, [])
+
+    def test_unreferenced(self):
+        # stylesheets reach their imports and images, files fetched by name are never pruned
+        self.assertEqual(self.index().unreferenced(self.static_dir), [os.path.join("images", "old.png")])
+
+    def test_fingerprinted(self):
+        assets = AssetMap.build(self.static_dir)
+        references = ReferenceIndex(self.public_dir)
+        recorder = ReferenceRecorder(io.StringIO(), references)
+        recorder.write(f'<link href="{assets.url("/css/index.css")}" rel="stylesheet">')
+        references.record(os.path.join(self.public_dir, "index.html"))
+        self.assertEqual(references.unreferenced(self.static_dir, assets), [os.path.join("images", "cat.png"), os.path.join("images", "old.png")])
+
+    def test_retain(self):
+        references = self.index()
+        references.merge({"index.html": ["/images/old.png"]})
+        self.assertEqual(references.unreferenced(self.static_dir), [])
+        references.retain({os.path.join("blog", "index.html")})
+        self.assertEqual(list(references.pages), ["blog/index.html"])
+        self.assertEqual(references.unreferenced(self.static_dir), [os.path.join("images", "old.png")])
+
+
+class TestReferenceRecorder(unittest.TestCase):
+    def test_passes_through(self):
+        buffer = io.StringIO()
+        references = ReferenceIndex("/docs")
+        recorder = ReferenceRecorder(buffer, references)
+        recorder.write('<style>p{background:url("/dot.png")}</style><a href="/about">about</a>')
+        recorder.write("<p>no links</p>")
+        self.assertEqual(buffer.getvalue(), '<style>p{background:url("/dot.png")}</style><a href="/about">about</a><p>no links</p>')
+        self.assertEqual(references.pending, ["/dot.png", "/about"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import io
+import os
+import tempfile
+import unittest
+
+from gencontent import render_page, write_page
+from render_cache import RenderCache
+from template import Template
+from fixtures import TempDirTestCase
+
+
+class TestRenderCache(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.tmp.name, "cache.db")
+        self.cache = RenderCache(self.path)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_key(self):
+        key = RenderCache.key("# Home", "/")
+        self.assertEqual(key, RenderCache.key("# Home", "/"))
+        self.assertNotEqual(key, RenderCache.key("# Home", "/blog/"))
+        self.assertNotEqual(key, RenderCache.key("# Home!", "/"))
+
+    def test_get_and_put(self):
+        self.assertIsNone(self.cache.get("key"))
+        self.cache.put("key", "Home", "<div><h1>Home</h1></div>")
+        self.assertEqual(self.cache.get("key"), ("Home", "<div><h1>Home</h1></div>"))
+        self.assertEqual(self.cache.counters, {"page hit": 1, "page miss": 1})
+
+    def test_persists_between_connections(self):
+        self.cache.put("key", "Home", "<div></div>")
+        self.cache.close()
+        self.cache = RenderCache(self.path)
+        self.assertEqual(self.cache.get("key"), ("Home", "<div></div>"))
+
+    def test_evicts_least_recently_used(self):
+        self.cache.max_bytes = 25
+        for key in ["a", "b", "c"]:
+            self.cache.put(key, "t", "x" * 9)
+        self.cache.get("a")
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.size(), 20)
+
+    def test_writes_are_buffered(self):
+        self.cache.put("key", "Home", "<p>é</p>")
+        other = RenderCache(self.path)
+        self.assertIsNone(other.get("key"))
+        self.cache.flush()
+        self.assertEqual(other.get("key"), ("Home", "<p>é</p>"))
+        other.close()
+        # sizes are bytes, like max_bytes
+        self.assertEqual(self.cache.size(), len("Home") + len("<p>é</p>".encode()))
+
+    def test_write_page_uses_cache(self):
+        template = Template('<title>{{ Title }}</title>{{ Content }}', "/site/")
+        markdown = "# Home\n\n[about](/about)"
+        expected = render_page(markdown, template)
+        
+        pages = []
+        for _ in range(2):
+            buffer = io.StringIO()
+            write_page(buffer, markdown, template, self.cache)
+            pages.append(buffer.getvalue())
+        self.assertEqual(pages, [expected, expected])
+        self.assertEqual(self.cache.counters["page hit"], 1)
+        self.assertIn('href="/site/about"', expected)
+
+
+class TestBlockCache(unittest.TestCase):
+    def setUp(self):
+        self.template = Template("{{ Content }}", "/site/")
+        self.markdown = "# Home\n\nfirst [link](/a)\n\n- one\n- two\n\nlast **bold**"
+        
+    def render(self, markdown: str, cache: RenderCache) -> str:
+        buffer = io.StringIO()
+        write_page(buffer, markdown, self.template, cache)
+        return buffer.getvalue()
+        
+    def test_edited_block_is_the_only_miss(self):
+        cache = RenderCache()
+        self.assertEqual(self.render(self.markdown, cache), render_page(self.markdown, self.template))
+        self.assertEqual(cache.counters, {"block miss": 4})
+        
+        edited = self.markdown.replace("last", "final")
+        cache.counters.clear()
+        self.assertEqual(self.render(edited, cache), render_page(edited, self.template))
+        self.assertEqual(cache.counters, {"block hit": 3, "block miss": 1})
+        
+    def test_block_type_is_part_of_the_key(self):
+        cache = RenderCache()
+        self.render("# Home\n\n1. one", cache)
+        self.assertEqual(self.render("# Home\n\n1. one\n2. two", cache), render_page("# Home\n\n1. one\n2. two", self.template))
+        
+    def test_blocks_persist(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.db")
+            cache = RenderCache(path)
+            self.render(self.markdown, cache)
+            cache.close()
+            
+            cache = RenderCache(path)
+            self.render(self.markdown.replace("# Home", "# Away"), cache)
+            self.assertEqual(cache.counters["block hit"], 3)
+            cache.close()
+            
+    def test_memory_limit(self):
+        cache = RenderCache(memory_bytes=40)
+        self.render(self.markdown, cache)
+        self.assertLessEqual(cache.memory_size, 40)
+        self.assertLess(len(cache.memory), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import os
+import unittest
+
+from io_pool import IOPool
+from sync import sync_tree
+from fixtures import TempDirTestCase, write_file
+
+
+def read_file(path: str) -> str:
+    with open(path) as file:
+        return file.read()
+
+
+class TestSyncTree(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.src = os.path.join(self.tmp.name, "static")
+        self.dst = os.path.join(self.tmp.name, "docs")
+        write_file(os.path.join(self.src, "index.css"), "body {}")
+        write_file(os.path.join(self.src, "images", "cat.png"), "meow")
+
+    def sync(self, **kwargs):
+        return sync_tree(self.src, self.dst, **kwargs)
+
+    def test_copies_then_skips(self):
+        result = self.sync()
+        self.assertEqual(sorted(result.copied), ["images/cat.png", "index.css"])
+        self.assertEqual(read_file(os.path.join(self.dst, "images", "cat.png")), "meow")
+
+        result = self.sync()
+        self.assertEqual(result.copied, [])
+        self.assertEqual(len(result.skipped), 2)
+
+    def test_copies_changed_files(self):
+        self.sync()
+        write_file(os.path.join(self.src, "index.css"), "body { color: red; }")
+        result = self.sync()
+        self.assertEqual(result.copied, ["index.css"])
+        self.assertEqual(read_file(os.path.join(self.dst, "index.css")), "body { color: red; }")
+
+    def test_hash_compare(self):
+        hashes = {}
+        self.sync(compare="hash", hashes=hashes)
+        self.assertEqual(sorted(hashes), ["images/cat.png", "index.css"])
+
+        # same content with a new mtime is not copied again
+        write_file(os.path.join(self.src, "index.css"), "body {}")
+        result = self.sync(compare="hash", hashes=hashes)
+        self.assertEqual(result.copied, [])
+
+        write_file(os.path.join(self.src, "index.css"), "body {!}")
+        result = self.sync(compare="hash", hashes=hashes)
+        self.assertEqual(result.copied, ["index.css"])
+
+    def test_deletes_stale_but_keeps(self):
+        self.sync()
+        write_file(os.path.join(self.dst, "old", "gone.png"), "stale")
+        write_file(os.path.join(self.dst, "blog", "index.html"), "page")
+        os.remove(os.path.join(self.src, "images", "cat.png"))
+
+        result = self.sync(keep={"blog/index.html"})
+        self.assertEqual(sorted(result.deleted), ["images/cat.png", "old/gone.png"])
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "old")))
+        self.assertTrue(os.path.exists(os.path.join(self.dst, "blog", "index.html")))
+        # the directory still exists in static/
+        self.assertTrue(os.path.isdir(os.path.join(self.dst, "images")))
+
+    def test_hardlink(self):
+        self.sync(link="hardlink")
+        src_stat = os.stat(os.path.join(self.src, "index.css"))
+        dst_stat = os.stat(os.path.join(self.dst, "index.css"))
+        self.assertEqual(src_stat.st_ino, dst_stat.st_ino)
+
+    def test_copy_file_range(self):
+        self.sync(link="range")
+        self.assertEqual(read_file(os.path.join(self.dst, "images", "cat.png")), "meow")
+        self.assertEqual(self.sync(link="range").copied, [])
+
+    def test_io_pool(self):
+        with IOPool(2) as io_pool:
+            hashes = {}
+            result = self.sync(compare="hash", hashes=hashes, io_pool=io_pool)
+        self.assertEqual(sorted(result.copied), ["images/cat.png", "index.css"])
+        self.assertEqual(sorted(hashes), ["images/cat.png", "index.css"])
+        self.assertEqual(read_file(os.path.join(self.dst, "index.css")), "body {}")
+
+    def test_rename(self):
+        rename = {"index.css": "index.1234.css"}.get
+        result = self.sync(rename=lambda path: rename(path, path))
+        self.assertEqual(sorted(result.copied), ["images/cat.png", "index.1234.css"])
+        self.assertEqual(read_file(os.path.join(self.dst, "index.1234.css")), "body {}")
+
+        # the unrenamed copy from an earlier build is stale, the renamed one is not
+        write_file(os.path.join(self.dst, "index.css"), "body {}")
+        result = self.sync(rename=lambda path: rename(path, path))
+        self.assertEqual(result.deleted, ["index.css"])
+        self.assertTrue(os.path.exists(os.path.join(self.dst, "index.1234.css")))
+
+    def test_keeps_siblings(self):
+        self.sync()
+        write_file(os.path.join(self.dst, "index.css.gz"), "zipped")
+        write_file(os.path.join(self.dst, "blog", "index.html.gz"), "zipped")
+        write_file(os.path.join(self.dst, "gone.css.gz"), "zipped")
+        result = self.sync(keep={os.path.join("blog", "index.html")}, siblings=(".gz",))
+        self.assertEqual(result.deleted, ["gone.css.gz"])
+        # without the suffix they are stale like anything else
+        result = self.sync(keep={os.path.join("blog", "index.html")})
+        self.assertEqual(sorted(result.deleted), [os.path.join("blog", "index.html.gz"), "index.css.gz"])
+
+    def test_transforms(self):
+        result = self.sync(transforms={".css": lambda text, path: text.upper()})
+        self.assertEqual(read_file(os.path.join(self.dst, "index.css")), "BODY {}")
+        self.assertEqual(sorted(result.copied), ["images/cat.png", "index.css"])
+
+        result = self.sync(transforms={".css": lambda text, path: text.upper()})
+        self.assertEqual(result.copied, [])
+        # without the transform the output no longer matches the source
+        result = self.sync()
+        self.assertEqual(result.copied, ["index.css"])
+        self.assertEqual(read_file(os.path.join(self.dst, "index.css")), "body {}")
+
+    def test_exclude(self):
+        self.sync()
+        result = self.sync(exclude={os.path.join("images", "cat.png")})
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "images", "cat.png")))
+        self.assertEqual(result.copied, [])
+
+    def test_unknown_mode(self):
+        with self.assertRaisesRegex(ValueError, "Unknown compare mode"):
+            sync_tree(self.src, self.dst, compare="size")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import io
+import os
+import pickle
+import tempfile
+import unittest
+
+from assets import AssetMap
+from css import InlineCss
+from images import ImageSizes
+from references import ReferenceIndex
+from template import RenderOptions, Template, find_template, load_template, rewrite_root_urls, root_url_rewriter
+
+
+class TestTemplate(unittest.TestCase):
+    def test_compile(self):
+        template = Template("<title>{{ Title }}</title><body>{{ Content }}</body>")
+        self.assertEqual(template.segments, ["<title>", "</title><body>", "</body>"])
+        self.assertEqual(template.slots, ["Title", "Content"])
+        self.assertEqual(template.offsets, [7, 32])
+
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title>{{Content}}<h1>{{ Title }}</h1>")
+        self.assertEqual(
+            template.render(Title="Hi", Content="<p>text</p>"),
+            "<title>Hi</title><p>text</p><h1>Hi</h1>",
+        )
+
+    def test_render_to(self):
+        template = Template('<title>{{ Title }}</title><link href="/index.css">{{ Content }}', "/site/")
+        buffer = io.StringIO()
+        template.render_to(buffer, Title="Hi", Content=lambda writer: writer.write("<p>streamed</p>"))
+        self.assertEqual(buffer.getvalue(), '<title>Hi</title><link href="/site/index.css"><p>streamed</p>')
+
+    def test_unknown_slot_is_kept(self):
+        template = Template("{{ Title }} {{ Date }}")
+        self.assertEqual(template.render(Title="Hi"), "Hi {{ Date }}")
+
+    def test_no_slots(self):
+        self.assertEqual(Template("plain").render(Title="Hi"), "plain")
+
+    def test_basepath(self):
+        template = Template('<link href="/index.css"><a href="{{ Url }}">{{ Content }}</a>', "/blog/")
+        self.assertEqual(
+            template.render(Url="/post", Content='<img src="/cat.png" />'),
+            '<link href="/blog/index.css"><a href="/blog/post"><img src="/cat.png" /></a>',
+        )
+
+    def test_rewrite_root_urls(self):
+        html = '<a href="/x">x</a><img src="/y.png" /><a href="https://z">z</a>'
+        self.assertEqual(rewrite_root_urls(html, "/"), html)
+        self.assertEqual(
+            rewrite_root_urls(html, "/site/"),
+            '<a href="/site/x">x</a><img src="/site/y.png" /><a href="https://z">z</a>',
+        )
+        self.assertIsNone(root_url_rewriter("/"))
+        self.assertEqual(root_url_rewriter("/site/")("/x"), "/site/x")
+        self.assertEqual(root_url_rewriter("/site/")("https://z"), "https://z")
+
+    def test_assets(self):
+        assets = AssetMap({"index.css": "index.1234.css"})
+        template = Template('<link href="/index.css"><a href="{{ Url }}">x</a>', "/site/", RenderOptions(assets))
+        self.assertEqual(template.render(Url="/index.css?v=2"), '<link href="/site/index.1234.css"><a href="/site/index.1234.css?v=2">x</a>')
+        self.assertEqual(template.url_key, f"/site/\0{assets.digest}")
+        self.assertEqual(
+            rewrite_root_urls('<img src="/index.css" /><a href="/x">x</a>', "/", assets),
+            '<img src="/index.1234.css" /><a href="/x">x</a>',
+        )
+
+    def test_minify(self):
+        template = Template('<html>\n  <head><link href="/index.css" rel="stylesheet" /></head>\n  <body>{{ Content }}</body>\n</html>\n', "/site/", RenderOptions(minify=True))
+        expected = "<html><head><link href=/site/index.css rel=stylesheet /></head><body><pre>a\n b</pre></body></html>"
+        self.assertEqual(template.render(Content="<pre>a\n b</pre>\n"), expected)
+        buffer = io.StringIO()
+        template.render_to(buffer, Content=lambda writer: writer.write("<pre>a\n b</pre>\n"))
+        self.assertEqual(buffer.getvalue(), expected)
+
+    def test_image_hints(self):
+        images = ImageSizes({"/cat.png": (640, 480)})
+        template = Template("<h1>{{ Title }}</h1>{{ Content }}", "/site/", RenderOptions(images=images))
+        self.assertEqual(
+            template.render(Title="x", Content='<img src="/site/cat.png" alt="" /><img src="/site/cat.png" alt="" />'),
+            '<h1>x</h1><img src="/site/cat.png" alt="" width="640" height="480" decoding="async" />'
+            '<img src="/site/cat.png" alt="" width="640" height="480" loading="lazy" decoding="async" />',
+        )
+
+    def test_pickles_with_basepath_and_assets(self):
+        # workers get their templates pickled, under spawn and forkserver too
+        template = Template('<link href="/index.css">{{ Content }}', "/site/", RenderOptions(AssetMap({"index.css": "index.1234.css"})))
+        copy = pickle.loads(pickle.dumps(template))
+        self.assertEqual(copy.rewrite_url("/index.css"), "/site/index.1234.css")
+        self.assertEqual(copy.render(Content='<a href="/about">about</a>'), template.render(Content='<a href="/about">about</a>'))
+
+    def test_references(self):
+        references = ReferenceIndex("/docs", "/site/")
+        template = Template('<link href="/index.css" rel="stylesheet"><h1>{{ Title }}</h1>{{ Content }}', "/site/", RenderOptions(references=references))
+        template.render(Title="x", Content='<img src="images/cat.png" alt="" /><a href="https://example.com">out</a>')
+        references.record("/docs/blog/post/index.html")
+        self.assertEqual(references.pages, {"blog/post/index.html": ["/blog/post/images/cat.png", "/index.css"]})
+
+
+class TestLoadTemplate(unittest.TestCase):
+    def test_cached_until_changed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as file:
+                file.write("{{ Content }}")
+            template = load_template(path)
+            self.assertIs(load_template(path), template)
+            self.assertIsNot(load_template(path, "/other/"), template)
+
+            with open(path, "w") as file:
+                file.write("<main>{{ Content }}</main>")
+            self.assertEqual(load_template(path).render(Content="x"), "<main>x</main>")
+
+    def test_shared_by_equal_options(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as file:
+                file.write("{{ Content }}")
+            template = load_template(path, "/", RenderOptions(minify=True))
+            self.assertIs(load_template(path, "/", RenderOptions(minify=True)), template)
+            self.assertIsNot(load_template(path, "/", RenderOptions()), template)
+            self.assertEqual(RenderOptions(minify=True).digest, ":minify")
+
+    def test_reloaded_when_inlined_css_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            css_path = os.path.join(tmp, "index.css")
+            with open(path, "w") as file:
+                file.write('<link href="/index.css" rel="stylesheet" />{{ Content }}')
+            with open(css_path, "w") as file:
+                file.write("p { color: red; }")
+            options = RenderOptions(inline_css=InlineCss(tmp))
+            template = load_template(path, options=options)
+            self.assertEqual(template.render(Content="x"), "<style>p{color:red}</style>x")
+            self.assertEqual(template.dependencies, [css_path])
+            self.assertIs(load_template(path, options=options), template)
+
+            with open(css_path, "w") as file:
+                file.write("p { color: blue; }")
+            self.assertEqual(load_template(path, options=options).render(Content="x"), "<style>p{color:blue}</style>x")
+
+    def test_find_template(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(find_template(tmp, "default.html"), "default.html")
+            override = os.path.join(tmp, "template.html")
+            with open(override, "w") as file:
+                file.write("{{ Content }}")
+            self.assertEqual(find_template(tmp, "default.html"), override)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,9 @@ from text_utils import (
     markdown_to_blocks,
     block_to_block_type,
     extract_title,
+    extract_title_from_lines,
+    Block,
+    BlockScanner,
 )
 
 
@@ -187,6 +190,46 @@ class TestExtractTitle(unittest.TestCase):
         text = "### Hello"
         with self.assertRaisesRegex(ValueError, "Missing h1 header"):
             extract_title(text)
+            
+    def test_stops_at_title(self):
+        lines = iter(["intro\n", "  # Hello \n", "never read\n"])
+        self.assertEqual(extract_title_from_lines(lines), "Hello")
+        self.assertEqual(list(lines), ["never read\n"])
+        
+        
+class TestBlockScanner(unittest.TestCase):
+    def test_blocks_and_title(self):
+        md = """
+Intro paragraph
+  on two lines
+
+# The Title
+
+- one
+- two
+"""
+        scanner = BlockScanner(md.split('\n'))
+        self.assertIsNone(scanner.title)
+        self.assertListEqual(
+            [
+                Block(BlockType.PARAGRAPH, ["Intro paragraph", "on two lines"], 1, 3),
+                Block(BlockType.HEADING, ["# The Title"], 4, 5),
+                Block(BlockType.UNORDERED_LIST, ["- one", "- two"], 6, 8),
+            ],
+            list(scanner),
+        )
+        self.assertEqual(scanner.title, "The Title")
+        
+    def test_matches_markdown_to_blocks(self):
+        md = "# h\n\n```\ncode\n```\n\n> a\n> b\n\n1. x\n3. y"
+        blocks = list(BlockScanner(md.split('\n')))
+        self.assertListEqual([block.text() for block in blocks], markdown_to_blocks(md))
+        self.assertListEqual([block.block_type for block in blocks], [block_to_block_type(block) for block in markdown_to_blocks(md)])
+        
+    def test_no_title(self):
+        scanner = BlockScanner(["## not a title", "text"])
+        list(scanner)
+        self.assertIsNone(scanner.title)
         
         
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+import abc
+import os
+import unittest
+
+from watch import InotifyWatcher, PollWatcher
+from fixtures import TempDirTestCase, write_file
+
+
+class WatcherTests(abc.ABC):
+    @abc.abstractmethod
+    def create_watcher(self, directories: list[str], files: list[str]):
+        pass
+
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(self.template, "{{ Content }}")
+        self.watcher = self.create_watcher([self.content], [self.template])
+
+    def tearDown(self):
+        self.watcher.close()
+
+    def test_modified_file(self):
+        path = os.path.join(self.content, "index.md")
+        write_file(path, "# Home again")
+        self.assertIn(path, self.watcher.wait(timeout=2))
+
+    def test_new_directory(self):
+        path = os.path.join(self.content, "blog", "post", "index.md")
+        write_file(path, "# Post")
+        self.assertIn(path, self.watcher.wait(timeout=2))
+
+    def test_deleted_file(self):
+        path = os.path.join(self.content, "index.md")
+        os.remove(path)
+        self.assertIn(path, self.watcher.wait(timeout=2))
+
+    def test_single_file(self):
+        write_file(os.path.join(self.tmp.name, "notes.txt"), "not watched")
+        write_file(self.template, "<main>{{ Content }}</main>")
+        self.assertEqual(self.watcher.wait(timeout=2), {self.template})
+
+    def test_timeout_without_changes(self):
+        self.assertEqual(self.watcher.wait(timeout=0.05), set())
+
+
+class TestInotifyWatcher(WatcherTests, TempDirTestCase):
+    def create_watcher(self, directories: list[str], files: list[str]):
+        try:
+            return InotifyWatcher(directories, files)
+        except (OSError, AttributeError):
+            self.skipTest("inotify is not available")
+
+
+class TestPollWatcher(WatcherTests, TempDirTestCase):
+    def create_watcher(self, directories: list[str], files: list[str]):
+        return PollWatcher(directories, files, interval=0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Iterable, Iterator
 
 
 class BlockType(Enum):
@@ -31,33 +32,37 @@ def markdown_to_blocks(markdown: str) -> list[str]:
 
 
 def block_to_block_type(block: str) -> BlockType:
-    lines = block.split('\n')
+    return lines_to_block_type(block.split('\n'))
+
+
+def lines_to_block_type(lines: list[str]) -> BlockType:
+    first = lines[0]
     
     # Headings start with 1-6 # characters, followed by a space and then the heading text.
-    if block.startswith(("#", "##", "###", "####", "#####", "######", "#######")):
+    if first.startswith(("#", "##", "###", "####", "#####", "######", "#######")):
         return BlockType.HEADING
     
     # Code blocks must start with 3 backticks and end with 3 backticks.
-    if len(lines) > 1 and block.startswith("```") and block.endswith("```"):
+    if len(lines) > 1 and first.startswith("```") and lines[-1].endswith("```"):
         return BlockType.CODE
     
     # Every line in a quote block must start with a > character.
-    if block.startswith('>'):
+    if first.startswith('>'):
         for line in lines:
             if not line.startswith('>'):
                 return BlockType.PARAGRAPH
         return BlockType.QUOTE
     
     # Every line in an unordered list block must start with a * or - character, followed by a space.
-    if block.startswith(("* ", "- ")):
-        start = block[:2]
+    if first.startswith(("* ", "- ")):
+        start = first[:2]
         for line in lines:
             if not line.startswith(start):
                 return BlockType.PARAGRAPH
         return BlockType.UNORDERED_LIST
     
     # Every line in an ordered list block must start with a number followed by a . character and a space. The number must start at 1 and increment by 1 for each line.
-    if block.startswith("1. "):
+    if first.startswith("1. "):
         for index, line in enumerate(lines, start=1):
             if not line.startswith(f"{index}. "):
                 return BlockType.PARAGRAPH
@@ -67,8 +72,61 @@ def block_to_block_type(block: str) -> BlockType:
     return BlockType.PARAGRAPH
 
 
+class Block():
+    def __init__(self, block_type: BlockType, lines: list[str], start: int, end: int) -> None:
+        self.block_type: BlockType = block_type
+        self.lines: list[str] = lines # stripped, as markdown_to_blocks leaves them
+        self.start: int = start # index of the first line in the document
+        self.end: int = end # index one past the last line
+        
+    def text(self) -> str:
+        return '\n'.join(self.lines)
+    
+    def __eq__(self, block: 'Block') -> bool:
+        return self.block_type == block.block_type and self.lines == block.lines and self.start == block.start and self.end == block.end
+    
+    def __repr__(self) -> str:
+        return f"Block({self.block_type.value}, {self.lines}, {self.start}, {self.end})"
+
+
+class BlockScanner():
+    """Reads markdown lines once, yielding typed blocks and picking up the title on the way.
+    
+    title is the text of the first "# " line seen so far, like extract_title, and is
+    complete once the blocks have been consumed.
+    """
+    def __init__(self, lines: Iterable[str]) -> None:
+        self.lines: Iterable[str] = lines
+        self.title: str = None
+        
+    def __iter__(self) -> Iterator[Block]:
+        block: list[str] = []
+        start = 0
+        index = 0
+        for index, line in enumerate(self.lines):
+            line = line.strip()
+            if not line:
+                if block:
+                    yield Block(lines_to_block_type(block), block, start, index)
+                    block = []
+                continue
+            
+            if not block:
+                start = index
+            if self.title is None and line.startswith("# "):
+                self.title = line[2:].strip()
+            block.append(line)
+            
+        if block:
+            yield Block(lines_to_block_type(block), block, start, index + 1)
+
+
 def extract_title(markdown: str) -> str:
-    lines = markdown.split('\n')
+    return extract_title_from_lines(markdown.split('\n'))
+
+
+def extract_title_from_lines(lines: Iterable[str]) -> str:
+    # stops at the title, an open file is only read up to it
     for line in lines:
         if line.strip().startswith("# "):
             return line.strip()[2:].strip()
@@ -11,6 +11,8 @@ class TextType(Enum):
     
      
 class TextNode():
+    __slots__ = ("text", "text_type", "url")
+    
     def __init__(self, text: str, text_type: TextType, url: str = None) -> None:
         self.text: str = text
         self.text_type: TextType = text_type
@@ -21,5 +23,36 @@ class TextNode():
     
     def __repr__(self) -> str:
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
+
+
+class TextSpan():
+    """A TextNode kept as offsets into the string it was parsed from.
+    
+    The text is source[start:end], the url of links and images is
+    source[url_start:url_end]. Nothing is copied until a caller asks for it.
+    """
+    __slots__ = ("start", "end", "text_type", "url_start", "url_end")
+    
+    def __init__(self, start: int, end: int, text_type: TextType, url_start: int = None, url_end: int = None) -> None:
+        self.start: int = start
+        self.end: int = end
+        self.text_type: TextType = text_type
+        self.url_start: int = url_start
+        self.url_end: int = url_end
+        
+    def text(self, source: str) -> str:
+        return source[self.start:self.end]
+    
+    def url(self, source: str) -> str:
+        if self.url_start is None:
+            return None
+        return source[self.url_start:self.url_end]
+    
+    def to_text_node(self, source: str) -> TextNode:
+        return TextNode(self.text(source), self.text_type, self.url(source))
     
-    
\ No newline at end of file
+    def __eq__(self, span: 'TextSpan') -> bool:
+        return self.start == span.start and self.end == span.end and self.text_type == span.text_type and self.url_start == span.url_start and self.url_end == span.url_end
+    
+    def __repr__(self) -> str:
+        return f"TextSpan({self.start}, {self.end}, {self.text_type.value}, {self.url_start}, {self.url_end})"
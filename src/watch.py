@@ -0,0 +1,192 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import time
+from typing import Callable
+
+
+logger = logging.getLogger(__name__)
+
+
+# from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher():
+    """Reports changed paths under the watched directories using inotify.
+
+    Directories are watched recursively, new ones get a watch as soon as they
+    appear. Single files are watched through their directory, since editors
+    usually replace a file instead of writing into it.
+    """
+    def __init__(self, directories: list[str], files: list[str] = None) -> None:
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd: int = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.directories: list[str] = [os.path.abspath(directory) for directory in directories]
+        self.files: set[str] = {os.path.abspath(file) for file in files or []}
+        # watch descriptor -> directory, and whether every file in it counts or only self.files
+        self.watches: dict[int, tuple[str, bool]] = {}
+        for directory in self.directories:
+            self.add_tree(directory)
+        for file in self.files:
+            self.add_watch(os.path.dirname(file), False)
+
+    def add_watch(self, path: str, recursive: bool) -> None:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            logger.warning("cannot watch %s: %s", path, os.strerror(ctypes.get_errno()))
+            return
+        # a directory holding a watched file can also be part of a watched tree
+        _, was_recursive = self.watches.get(wd, (path, False))
+        self.watches[wd] = (path, recursive or was_recursive)
+
+    def add_tree(self, path: str) -> list[str]:
+        """Watch path and everything below it, returning the files already there."""
+        found: list[str] = []
+        if not os.path.isdir(path):
+            return found
+        for dir_path, _, file_names in os.walk(path):
+            self.add_watch(dir_path, True)
+            found.extend(os.path.join(dir_path, name) for name in file_names)
+        return found
+
+    def read_events(self) -> set[str]:
+        changed: set[str] = set()
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # events were lost, everything counts as changed
+                changed.update(self.directories)
+                changed.update(self.files)
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            if wd not in self.watches:
+                continue
+
+            directory, recursive = self.watches[wd]
+            path = os.path.join(directory, name) if name else directory
+            if not recursive and path not in self.files:
+                continue
+            changed.add(path)
+            # files can land in a new directory before its watch exists
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                changed.update(self.add_tree(path))
+        return changed
+
+    def wait(self, timeout: float = None, settle: float = 0.02) -> set[str]:
+        """Block until something changes, then collect events until settle seconds pass quietly."""
+        changed: set[str] = set()
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        while readable:
+            changed.update(self.read_events())
+            readable, _, _ = select.select([self.fd], [], [], settle)
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollWatcher():
+    """Reports changed paths by comparing the size and mtime of every file on each scan."""
+    def __init__(self, directories: list[str], files: list[str] = None, interval: float = 0.25) -> None:
+        self.directories: list[str] = [os.path.abspath(directory) for directory in directories]
+        self.files: list[str] = [os.path.abspath(file) for file in files or []]
+        self.interval: float = interval
+        self.snapshot: dict[str, tuple[int, int]] = self.scan()
+
+    def scan(self) -> dict[str, tuple[int, int]]:
+        snapshot: dict[str, tuple[int, int]] = {}
+
+        def record(path: str) -> None:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                return
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+
+        for directory in self.directories:
+            for dir_path, _, file_names in os.walk(directory):
+                for name in file_names:
+                    record(os.path.join(dir_path, name))
+        for file in self.files:
+            record(file)
+        return snapshot
+
+    def wait(self, timeout: float = None) -> set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self.scan()
+            changed = {path for path in snapshot.keys() | self.snapshot.keys() if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+            time.sleep(self.interval)
+
+    def close(self) -> None:
+        pass
+
+
+def create_watcher(directories: list[str], files: list[str] = None, poll: bool = False) -> InotifyWatcher | PollWatcher:
+    if not poll:
+        try:
+            return InotifyWatcher(directories, files)
+        except (OSError, AttributeError) as error:
+            logger.info("inotify unavailable (%s), polling for changes", error)
+    return PollWatcher(directories, files)
+
+
+def watch(watcher: InotifyWatcher | PollWatcher, rebuild: Callable[[set[str]], None]) -> None:
+    """Call rebuild with the changed paths after every change, until interrupted."""
+    try:
+        while True:
+            changed = watcher.wait()
+            if not changed:
+                continue
+            start = time.perf_counter()
+            try:
+                rebuild(changed)
+            except Exception as error:
+                # a broken page should not end the session, the next save can fix it
+                logger.error("rebuild failed: %s", error)
+                continue
+            logger.info("rebuilt %d changed paths in %.1f ms", len(changed), (time.perf_counter() - start) * 1000)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()